@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
-import os, sys, json, sqlite3, datetime, subprocess, mimetypes
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import os, sys, io, re, csv, json, codecs, html, zlib, time, bisect, socket, sqlite3, datetime, subprocess, mimetypes, threading, queue, base64, heapq, gzip, hashlib, argparse, itertools
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -8,27 +12,444 @@ DB_PATH = os.path.join(APP_DIR, "pmp.db")
 STATIC_DIR = os.path.join(APP_DIR, "static")
 TPL_DIR = os.path.join(APP_DIR, "templates")
 AUTOMATIONS_DIR = os.path.join(APP_DIR, "automations")
+POOL_SIZE = int(os.environ.get("PMP_POOL_SIZE", "8"))
+WORKSPACE_DIR = os.environ.get("PMP_WORKSPACE_DIR", os.path.join(APP_DIR, "workspaces"))
+WORKSPACE_MEMORY = int(os.environ.get("PMP_WORKSPACE_MEMORY_MB", "512")) * 1024 * 1024
+CONN_CACHE = 16000 * 1024  # page cache ceiling per connection
+
+# applied to every connection (WAL is persistent and set once by init_db); WAL
+# lets readers run alongside the single writer
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    f"PRAGMA cache_size=-{CONN_CACHE // 1024}",
+    "PRAGMA mmap_size=134217728",
+)
+
+SLOW_QUERY_MS = float(os.environ.get("PMP_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_KEEP = 50
+PLAN_CACHE = 500
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ("conn", "sql", "json")
+PROFILE_INTERVAL = 0.005
+PROFILE_KEEP = 20
+PROFILE_DEPTH = 48
+METRIC_ROUTE = re.compile(r"^/api/[a-z/]+$")
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    # estimate by linear interpolation inside the bucket holding the q-th observation
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = LATENCY_BUCKETS[i - 1] if i else 0.0
+                hi = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return LATENCY_BUCKETS[-1]
+
+# Samples the stacks of threads that are serving a request; when a request
+# ends its stacks are kept if it is among the PROFILE_KEEP slowest so far.
+class SamplingProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL, keep=PROFILE_KEEP):
+        self.interval, self.keep = interval, keep
+        self._active = {}
+        self._slowest = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="pmp-profiler", daemon=True).start()
+
+    def start_request(self):
+        with self._lock:
+            self._active[threading.get_ident()] = defaultdict(int)
+
+    def end_request(self, method, path, seconds):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if not stacks:
+            return
+        profile = {
+            "method": method, "path": path, "ms": round(seconds * 1000, 3),
+            "samples": sum(stacks.values()),
+            # collapsed "root;...;leaf count" lines, ready for flamegraph tools
+            "stacks": [f"{k} {v}" for k, v in sorted(stacks.items(), key=lambda kv: -kv[1])],
+        }
+        with self._lock:
+            self._seq += 1
+            item = (seconds, self._seq, profile)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def profiles(self):
+        with self._lock:
+            return [p for _, _, p in sorted(self._slowest, reverse=True)]
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for ident, stacks in active:
+                frame = frames.get(ident)
+                if frame is None or ident == me:
+                    continue
+                names = []
+                while frame is not None and len(names) < PROFILE_DEPTH:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks[";".join(reversed(names))] += 1
+            # holding frames would keep their locals (open cursors included) alive
+            del frames, frame
+
+# Request, SQL and phase timings. Phase totals for the request being served
+# live in a thread-local so the pool, cursor and JSON hooks can add to them.
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.routes = {}
+        self.sql = Histogram()
+        self.slow_total = 0
+        self.slow_queries = deque(maxlen=SLOW_QUERY_KEEP)
+        self.profiler = None
+        self._lock = threading.Lock()
+        self._sql_lock = threading.Lock()  # statement histogram only, so route bookkeeping never waits on it
+        self._explain_lock = threading.Lock()
+        self._plans = {}  # (database, sql) -> plan, one EXPLAIN per distinct statement
+        self._local = threading.local()
+
+    def enable_profiler(self):
+        if self.profiler is None:
+            self.profiler = SamplingProfiler()
+
+    def begin(self):
+        self._local.phases = dict.fromkeys(PHASES, 0.0)
+        if self.profiler:
+            self.profiler.start_request()
+
+    def add(self, phase, seconds):
+        phases = getattr(self._local, "phases", None)
+        if phases is not None:
+            phases[phase] += seconds
+
+    def end(self, method, path, status, seconds, bytes_in, bytes_out):
+        phases = self._local.__dict__.pop("phases", None) or {}
+        if path.startswith("/static/"):
+            route = "/static/*"
+        elif path == "/" or (status != 404 and METRIC_ROUTE.match(path)):
+            route = path
+        else:
+            route = "other"
+        with self._lock:
+            r = self.routes.get((method, route))
+            if r is None:
+                r = self.routes[(method, route)] = {"latency": Histogram(), "status": defaultdict(int), "bytes_in": 0, "bytes_out": 0,
+                                                    "phases": dict.fromkeys(PHASES, 0.0)}
+            r["latency"].observe(seconds)
+            r["status"][status] += 1
+            r["bytes_in"] += bytes_in
+            r["bytes_out"] += bytes_out
+            for k, v in phases.items():
+                r["phases"][k] += v
+        if self.profiler:
+            self.profiler.end_request(method, path, seconds)
+
+    def query(self, sql, params, seconds, path):
+        self.add("sql", seconds)
+        with self._sql_lock:
+            self.sql.observe(seconds)
+        if seconds * 1000 < SLOW_QUERY_MS:
+            return
+        with self._sql_lock:
+            self.slow_total += 1
+        # the plan is worked out when the metrics are read, off the request path
+        self.slow_queries.append({
+            "at": now_iso(), "ms": round(seconds * 1000, 3), "sql": " ".join(sql.split()), "plan": None,
+            "explain": (path, sql, list(params) if isinstance(params, list) else params),
+        })
+
+    def _slow_queries(self):
+        queries = list(self.slow_queries)
+        with self._explain_lock:
+            for q in queries:
+                if "explain" in q:
+                    path, sql, params = q.pop("explain")
+                    if (path, sql) not in self._plans:
+                        if len(self._plans) >= PLAN_CACHE:
+                            self._plans.clear()
+                        self._plans[(path, sql)] = explain_plan(path, sql, params)
+                    q["plan"] = self._plans[(path, sql)]
+        return queries[::-1]
+
+    def snapshot(self):
+        with self._lock:
+            routes = []
+            for (method, route), r in sorted(self.routes.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+                h = r["latency"]
+                routes.append({
+                    "method": method, "route": route, "count": h.count, "status": dict(r["status"]),
+                    "mean_ms": round(h.sum / h.count * 1000, 3),
+                    **{f"p{int(q * 100)}_ms": round(h.quantile(q) * 1000, 3) for q in (0.5, 0.9, 0.99)},
+                    "bytes_in": r["bytes_in"], "bytes_out": r["bytes_out"],
+                    "phases_ms": {k: round(v * 1000, 3) for k, v in r["phases"].items()},
+                })
+        with self._sql_lock:
+            sql = {"count": self.sql.count, "total_ms": round(self.sql.sum * 1000, 3), "slow_total": self.slow_total,
+                   "slow_threshold_ms": SLOW_QUERY_MS}
+        return {"uptime_s": round(time.time() - self.started, 1), "routes": routes, "sql": sql,
+                "slow_queries": self._slow_queries(), "profiling": self.profiler is not None}
+
+    # Prometheus text exposition format
+    def prometheus(self):
+        out = []
+        def metric(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+        def histogram(name, h, labels=""):
+            cum = 0
+            for le, n in zip(LATENCY_BUCKETS + ("+Inf",), h.counts):
+                cum += n
+                out.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cum}')
+            labels = f"{{{labels}}}" if labels else ""
+            out.append(f"{name}_sum{labels} {h.sum:.6f}")
+            out.append(f"{name}_count{labels} {h.count}")
+        with self._lock:
+            routes = sorted(self.routes.items(), key=lambda kv: (kv[0][1], kv[0][0]))
+            metric("pmp_http_requests_total", "counter", "Requests served, by route and status.")
+            for (method, route), r in routes:
+                for status, n in sorted(r["status"].items()):
+                    out.append(f'pmp_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+            metric("pmp_http_request_duration_seconds", "histogram", "Time from parsing the request line to the end of the response.")
+            for (method, route), r in routes:
+                histogram("pmp_http_request_duration_seconds", r["latency"], f'method="{method}",route="{route}"')
+            metric("pmp_http_request_bytes_total", "counter", "Request body bytes.")
+            for (method, route), r in routes:
+                out.append(f'pmp_http_request_bytes_total{{method="{method}",route="{route}"}} {r["bytes_in"]}')
+            metric("pmp_http_response_bytes_total", "counter", "Response bytes written, headers included.")
+            for (method, route), r in routes:
+                out.append(f'pmp_http_response_bytes_total{{method="{method}",route="{route}"}} {r["bytes_out"]}')
+            metric("pmp_http_phase_seconds_total", "counter", "Time spent acquiring connections (conn), running SQL (sql) and encoding JSON (json).")
+            for (method, route), r in routes:
+                for phase, v in r["phases"].items():
+                    out.append(f'pmp_http_phase_seconds_total{{method="{method}",route="{route}",phase="{phase}"}} {v:.6f}')
+        with self._sql_lock:
+            metric("pmp_sql_query_duration_seconds", "histogram", "Statement time from execute until the cursor is finished.")
+            histogram("pmp_sql_query_duration_seconds", self.sql)
+            metric("pmp_sql_slow_queries_total", "counter", f"Statements slower than {SLOW_QUERY_MS:g} ms.")
+            out.append(f"pmp_sql_slow_queries_total {self.slow_total}")
+        metric("pmp_process_start_time_seconds", "gauge", "Start time of the process since the epoch.")
+        out.append(f"pmp_process_start_time_seconds {self.started:.3f}")
+        return "\n".join(out) + "\n"
+
+METRICS = Metrics()
+
+# EXPLAIN QUERY PLAN on a pooled reader of the open workspace that owns `path`;
+# a plain cursor, so the EXPLAIN itself is not timed
+def explain_plan(path, sql, params):
+    ws = WORKSPACES.by_path(path) if path else None
+    if ws is None or not isinstance(params, (tuple, list, dict)):
+        return None
+    try:
+        with ws.pool.reader() as conn:
+            return [r[3] for r in sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params)]
+    except sqlite3.Error:
+        return None
+
+# Times each statement from execute() until the cursor runs another one or is
+# released; rows are fetched at C speed, with no per-row bookkeeping.
+class TimedCursor(sqlite3.Cursor):
+    _sql = None
+    _params = ()
+    _started = 0.0
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            METRICS.query(sql, self._params, time.perf_counter() - self._started, getattr(self.connection, "path", None))
+
+    def execute(self, sql, params=()):
+        self._finish()
+        self._sql, self._params, self._started = sql, params, time.perf_counter()
+        super().execute(sql, params)
+        return self
+
+    def executemany(self, sql, seq):
+        self._finish()
+        self._sql, self._params, self._started = sql, None, time.perf_counter()
+        super().executemany(sql, seq)
+        return self
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class TimedConnection(sqlite3.Connection):
+    path = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+# counts response bytes, headers included
+class CountingWriter:
+    def __init__(self, raw):
+        self.raw, self.count = raw, 0
+
+    def write(self, data):
+        self.count += len(data)
+        return self.raw.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
 def now_iso():
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat()
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+def get_conn(path=None):
+    conn = sqlite3.connect(path or DB_PATH, timeout=30, check_same_thread=False, factory=TimedConnection)
+    conn.path = path or DB_PATH
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def ensure_column(table, col, decl):
-    conn = get_conn(); cur = conn.cursor()
+# bounded set of reusable read connections plus one serialized writer
+class ConnPool:
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._writer = None
+        self._wlock = threading.Lock()
+        self._commits = 0
+        self._committed = threading.Condition()
+        self.connections = 0
+
+    @contextmanager
+    def reader(self):
+        t = time.perf_counter()
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = get_conn(self.path)
+                conn.execute("PRAGMA query_only=1")
+                self.connections += 1
+            METRICS.add("conn", time.perf_counter() - t)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
+
+    @contextmanager
+    def writer(self):
+        t = time.perf_counter()
+        with self._wlock:
+            if self._writer is None:
+                self._writer = get_conn(self.path)
+                self.connections += 1
+            conn = self._writer
+            METRICS.add("conn", time.perf_counter() - t)
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        with self._committed:
+            self._commits += 1
+            self._committed.notify_all()
+
+    @property
+    def commits(self):
+        return self._commits
+
+    # block until a write commits after `seen` was read, or the timeout passes
+    def wait_for_commit(self, seen, timeout):
+        with self._committed:
+            return self._committed.wait_for(lambda: self._commits != seen, timeout)
+
+    def close(self):
+        with self._wlock:
+            if self._writer is not None:
+                try:
+                    self._writer.execute("PRAGMA optimize")
+                except sqlite3.Error:
+                    pass
+                self._writer.close()
+                self._writer = None
+                self.connections -= 1
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            self.connections -= 1
+
+_current = threading.local()
+
+# the workspace serving this thread's request; the default one outside requests
+def workspace():
+    return getattr(_current, "ws", None) or WORKSPACES.default()
+
+def db_pool():
+    return workspace().pool
+
+# A module-level name for state each workspace keeps for itself (its
+# dependency graph, its calendar), resolved per call against workspace().
+class WorkspaceState:
+    def __init__(self, attr):
+        self._attr = attr
+
+    def __getattr__(self, name):
+        return getattr(getattr(workspace(), self._attr), name)
+
+def read_conn():
+    return db_pool().reader()
+
+def write_conn():
+    return db_pool().writer()
+
+def ensure_column(cur, table, col, decl):
     cols = [r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()]
     if col not in cols:
         cur.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl}")
-        conn.commit()
-    conn.close()
-
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
 
+def init_tables(cur):
     cur.execute("""
     CREATE TABLE IF NOT EXISTS tasks (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -97,29 +518,2514 @@ def init_db():
     )
     """)
 
+def init_task_dates(cur):
+    ensure_column(cur, 'tasks','planned_start_date','TEXT')
+    ensure_column(cur, 'tasks','planned_end_date','TEXT')
+    ensure_column(cur, 'tasks','actual_end_date','TEXT')
+
+def init_time_off_assignee(cur):
+    ensure_column(cur, 'time_off','assignee','TEXT')
+
+# indexes behind the list endpoints and the sprint/calendar lookups
+def init_list_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pis_start ON program_increments(start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sprints_start ON sprints(start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sprints_end ON sprints(end_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sprints_pi ON sprints(pi_id, start_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_time_off_date ON time_off(date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_risks_status ON risks(status, review_date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_id)")
+
+# number of ids in a tasks.dependencies JSON array, 0 for anything malformed
+def _dep_count_sql(col):
+    return f"(CASE WHEN json_valid({col}) AND json_type({col})='array' THEN json_array_length({col}) ELSE 0 END)"
+
+def init_dashboard_stats(cur):
+    cur.execute("CREATE TABLE IF NOT EXISTS dashboard_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(COALESCE(due_date, planned_end_date))")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tasks_type_status ON tasks(type, status)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_risks_review ON risks(review_date)")
+
+    # keep per-status task counts and the dependency total current on every write
+    bump = "INSERT INTO dashboard_stats (name, value) VALUES ({name}, {delta}) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"
+    new_deps, old_deps = _dep_count_sql("NEW.dependencies"), _dep_count_sql("OLD.dependencies")
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_ins AFTER INSERT ON tasks BEGIN
+        {bump.format(name="'status:' || COALESCE(NEW.status, '')", delta=1)}
+        {bump.format(name="'dependencies'", delta=new_deps)}
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_del AFTER DELETE ON tasks BEGIN
+        {bump.format(name="'status:' || COALESCE(OLD.status, '')", delta=-1)}
+        {bump.format(name="'dependencies'", delta=f"-{old_deps}")}
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_upd AFTER UPDATE OF status, dependencies ON tasks BEGIN
+        {bump.format(name="'status:' || COALESCE(OLD.status, '')", delta=-1)}
+        {bump.format(name="'status:' || COALESCE(NEW.status, '')", delta=1)}
+        {bump.format(name="'dependencies'", delta=f"{new_deps} - {old_deps}")}
+    END
+    """)
+
+    if cur.execute("SELECT COUNT(*) FROM dashboard_stats").fetchone()[0] == 0:
+        rebuild_dashboard_stats(cur)
+
+def rebuild_dashboard_stats(cur):
+    cur.execute("DELETE FROM dashboard_stats")
+    cur.execute("INSERT INTO dashboard_stats (name, value) SELECT 'status:' || COALESCE(status, ''), COUNT(*) FROM tasks GROUP BY 1")
+    cur.execute(f"INSERT INTO dashboard_stats (name, value) SELECT 'dependencies', COALESCE(SUM({_dep_count_sql('dependencies')}), 0) FROM tasks")
+
+# keyset order for task listings; NULLs are folded to '' so cursors compare cleanly
+TASK_SORT = (("COALESCE(priority, '')", "DESC"), ("COALESCE(due_date, planned_end_date, '')", "ASC"), ("id", "ASC"))
+TASK_FILTERS = ("status", "sprint_id", "pi_id", "assignee", "type")
+TASK_RANGES = {
+    "due": "COALESCE(due_date, planned_end_date)",
+    "start": "COALESCE(start_date, planned_start_date)",
+}
+MAX_PAGE = 1000
+
+def init_task_indexes(cur):
+    sort = ", ".join(f"{expr} {order}" for expr, order in TASK_SORT)
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_page ON tasks({sort})")
+    for col in TASK_FILTERS:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_{col}_page ON tasks({col}, {sort})")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_start ON tasks({TASK_RANGES['start']})")
+
+# column names per table, cached on the current workspace
+def table_columns(conn, table):
+    cache = workspace().columns
+    if table not in cache:
+        cache[table] = [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+    return cache[table]
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token, size=None):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("bad cursor")
+    if not isinstance(key, list) or len(key) != (size or len(TASK_SORT)):
+        raise ValueError("bad cursor")
+    return key
+
+# filtered, projected, optionally keyset-paginated task listing -> (rows, next_cursor)
+def query_tasks(conn, qs):
+    cols = table_columns(conn, "tasks")
+    fields = [f for f in ",".join(qs.get("fields", [])).split(",") if f]
+    for f in fields:
+        if f not in cols:
+            raise ValueError(f"unknown field: {f}")
+    select = ", ".join(fields) if fields else "*"
+
+    where = []; params = []
+    for col in TASK_FILTERS:
+        values = [v for v in qs.get(col, []) if v != ""]
+        if values:
+            where.append(f"{col} IN ({','.join('?' * len(values))})")
+            params.extend(values)
+    for name, expr in TASK_RANGES.items():
+        if qs.get(f"{name}_from"):
+            where.append(f"{expr} >= ?"); params.append(qs[f"{name}_from"][0])
+        if qs.get(f"{name}_to"):
+            where.append(f"{expr} <= ?"); params.append(qs[f"{name}_to"][0])
+
+    limit = None
+    if qs.get("limit"):
+        try:
+            limit = max(1, min(int(qs["limit"][0]), MAX_PAGE))
+        except ValueError:
+            raise ValueError("limit must be an integer")
+    if limit:
+        select += ", " + ", ".join(f"{expr} AS _k{i}" for i, (expr, _) in enumerate(TASK_SORT))
+    if qs.get("cursor"):
+        (prio, _), (due, _), (tid, _) = TASK_SORT
+        kp, kd, kid = decode_cursor(qs["cursor"][0])
+        # leading range on priority keeps the seek on the index
+        where.append(f"{prio} <= ? AND ({prio} < ? OR {due} > ? OR ({due} = ? AND {tid} > ?))")
+        params.extend([kp, kp, kd, kd, kid])
+
+    q = f"SELECT {select} FROM tasks"
+    if where:
+        q += " WHERE " + " AND ".join(where)
+    q += " ORDER BY " + ", ".join(f"{expr} {order}" for expr, order in TASK_SORT)
+    if limit:
+        q += " LIMIT ?"; params.append(limit + 1)
+
+    if not limit:
+        # unpaged: hand back the cursor so the rows can be streamed
+        return conn.execute(q, params), None
+    rows = conn.execute(q, params).fetchall()
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[f"_k{i}"] for i in range(len(TASK_SORT)))
+    keys = [k for k in rows[0].keys() if not k.startswith("_k")] if rows else []
+    return [{k: r[k] for k in keys} for r in rows], next_cursor
+
+# tasks.dependencies as a JSON array, '[]' for anything malformed
+def _deps_array_sql(col):
+    return f"(CASE WHEN json_valid({col}) AND json_type({col})='array' THEN {col} ELSE '[]' END)"
+
+def init_task_deps(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS task_deps (
+        task_id INTEGER NOT NULL,
+        depends_on INTEGER NOT NULL,
+        PRIMARY KEY (task_id, depends_on)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_task_deps_rev ON task_deps(depends_on, task_id)")
+
+    # edges mirror tasks.dependencies on every write
+    insert_edges = f"""
+        INSERT OR IGNORE INTO task_deps (task_id, depends_on)
+        SELECT NEW.id, CAST(value AS INTEGER) FROM json_each({_deps_array_sql("NEW.dependencies")})
+        WHERE CAST(value AS INTEGER) > 0;
+    """
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_deps_ins AFTER INSERT ON tasks BEGIN {insert_edges} END")
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_deps_upd AFTER UPDATE OF dependencies ON tasks BEGIN
+        DELETE FROM task_deps WHERE task_id = OLD.id;
+        {insert_edges}
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_deps_del AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_deps WHERE task_id = OLD.id OR depends_on = OLD.id;
+    END
+    """)
+
+    if cur.execute("SELECT 1 FROM task_deps LIMIT 1").fetchone() is None:
+        cur.execute(f"""
+        INSERT OR IGNORE INTO task_deps (task_id, depends_on)
+        SELECT tasks.id, CAST(j.value AS INTEGER) FROM tasks, json_each({_deps_array_sql("tasks.dependencies")}) AS j
+        WHERE CAST(j.value AS INTEGER) > 0
+        """)
+
+def _ordinal(iso):
+    try:
+        return datetime.date.fromisoformat((iso or "")[:10]).toordinal()
+    except ValueError:
+        return None
+
+def _iso(ordinal):
+    return datetime.date.fromordinal(ordinal).isoformat()
+
+GRAPH_RELOAD_MAX = 5000
+
+# In-memory view of task_deps with cached closures and critical-path schedules.
+# It follows the change journal, so writes from any process are picked up and
+# a status edit costs nothing. A date or dependency edit reschedules only the
+# tasks downstream of it (earliest times) and upstream of it (latest times);
+# slack is measured against each weakly connected component's finish.
+class DepGraph:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    # tasks held in memory, for the workspace memory estimate
+    def size(self):
+        return len(self.info) if self._loaded else 0
+
+    def sync(self, conn):
+        with self._lock:
+            self._catch_up(conn)
+            self._refresh()
+
+    # edges and task info only, no rescheduling: cheap enough for a cycle
+    # check under the writer lock
+    def sync_edges(self, conn):
+        with self._lock:
+            self._catch_up(conn)
+
+    def _catch_up(self, conn):
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='changes'").fetchone()
+        latest = row[0] if row else 0
+        if self._loaded and latest == self._version:
+            return
+        ids = None
+        if self._loaded and latest > self._version:
+            # a journal that no longer reaches back to our version means a reload
+            oldest = conn.execute("SELECT MIN(version) FROM changes").fetchone()[0]
+            if oldest is not None and oldest <= self._version + 1:
+                ids = [r[0] for r in conn.execute("SELECT DISTINCT row_id FROM changes WHERE version > ? AND tbl = 'tasks' LIMIT ?",
+                                                  (self._version, GRAPH_RELOAD_MAX + 1))]
+        if ids is None or len(ids) > GRAPH_RELOAD_MAX:
+            self._load(conn)
+        elif ids:
+            self._reload_tasks(conn, ids)
+        self._version = latest
+
+    def _load(self, conn):
+        self.deps = defaultdict(set)
+        self.rdeps = defaultdict(set)
+        self.info = {}
+        for r in conn.execute("SELECT id, status, planned_start_date, planned_end_date FROM tasks"):
+            self.info[r[0]] = self._task_info(r)
+        for tid, dep in conn.execute("SELECT task_id, depends_on FROM task_deps"):
+            if tid in self.info and dep in self.info:
+                self.deps[tid].add(dep); self.rdeps[dep].add(tid)
+        self._es, self._ef, self._ls, self._lf = {}, {}, {}, {}
+        self._closures = {}
+        self._sched = {}
+        self._comp = {}
+        self._comps = {}
+        self._next_comp = 0
+        self._rebuild = set(self.info)  # nodes whose component must be found again
+        self._split = set()             # components that lost an edge or a node
+        self._full = set()              # components to schedule from scratch
+        self._early = set()             # nodes whose earliest times may move
+        self._late = set()              # nodes whose latest times may move
+        self._loaded = True
+
+    @staticmethod
+    def _task_info(r):
+        start, end = _ordinal(r[2]), _ordinal(r[3])
+        dur = max(1, end - start + 1) if start is not None and end is not None else 1
+        return {"status": r[1], "start": start, "dur": dur}
+
+    def _reload_tasks(self, conn, ids):
+        marks = ",".join("?" * len(ids))
+        rows = {r[0]: r for r in conn.execute(f"SELECT id, status, planned_start_date, planned_end_date FROM tasks WHERE id IN ({marks})", ids)}
+        for tid in ids:
+            if tid not in rows and tid in self.info:
+                self._remove(tid)
+        new = []
+        for tid, r in rows.items():
+            info, old = self._task_info(r), self.info.get(tid)
+            self.info[tid] = info
+            if old is None:
+                new.append(tid)
+                self._new_comp({tid})
+                self._early.add(tid); self._late.add(tid)
+            elif (old["start"], old["dur"]) != (info["start"], info["dur"]):
+                self._early.add(tid); self._late.add(tid)
+        edges = defaultdict(set)
+        for tid, dep in conn.execute(f"SELECT task_id, depends_on FROM task_deps WHERE task_id IN ({marks})", ids):
+            edges[tid].add(dep)
+        # tasks that were already waiting on a task that only now exists
+        if new:
+            for tid, dep in conn.execute(f"SELECT task_id, depends_on FROM task_deps WHERE depends_on IN ({','.join('?' * len(new))})", new):
+                if tid in self.info and tid not in rows:
+                    edges.setdefault(tid, set(self.deps[tid])).add(dep)
+        for tid in edges.keys() | rows.keys():
+            if tid in self.info:
+                self._set_deps(tid, {d for d in edges[tid] if d in self.info})
+
+    def _set_deps(self, tid, deps):
+        old = self.deps[tid]
+        if old == deps:
+            return
+        for d in old - deps:
+            self.rdeps[d].discard(tid); self._late.add(d)
+            if tid in self._comp:
+                self._split.add(self._comp[tid])
+        for d in deps - old:
+            self.rdeps[d].add(tid); self._late.add(d)
+            self._link(tid, d)
+        self.deps[tid] = deps
+        self._early.add(tid)
+        self._closures = {}
+
+    def _remove(self, tid):
+        for d in self.deps.pop(tid, ()):
+            self.rdeps[d].discard(tid); self._late.add(d)
+        for c in self.rdeps.pop(tid, ()):
+            self.deps[c].discard(tid); self._early.add(c)
+        del self.info[tid]
+        for m in (self._es, self._ef, self._ls, self._lf, self._sched):
+            m.pop(tid, None)
+        cid = self._comp.pop(tid, None)
+        if cid is not None:
+            comp = self._comps[cid]
+            comp["nodes"].discard(tid)
+            if comp["nodes"]:
+                self._split.add(cid)
+            else:
+                del self._comps[cid]
+                self._full.discard(cid)
+        self._closures = {}
+
+    def _new_comp(self, nodes):
+        cid = self._next_comp
+        self._next_comp += 1
+        self._comps[cid] = {"nodes": nodes, "base": None, "finish": None, "cycle": []}
+        for n in nodes:
+            self._comp[n] = cid
+        return cid
+
+    def _link(self, a, b):
+        ca, cb = self._comp.get(a), self._comp.get(b)
+        if ca is None or cb is None:
+            self._rebuild.update((a, b))
+            return
+        if ca == cb:
+            return
+        big, small = (ca, cb) if len(self._comps[ca]["nodes"]) >= len(self._comps[cb]["nodes"]) else (cb, ca)
+        into, comp = self._comps[big], self._comps.pop(small)
+        for n in comp["nodes"]:
+            self._comp[n] = big
+        into["nodes"] |= comp["nodes"]
+        into["cycle"] = sorted(into["cycle"] + comp["cycle"])
+        # a different base moves undated tasks, a different finish every latest time
+        if comp["base"] != into["base"]:
+            into["base"] = None
+        if comp["finish"] != into["finish"]:
+            into["finish"] = None
+        for flags in (self._split, self._full):
+            if small in flags:
+                flags.discard(small); flags.add(big)
+
+    def _dissolve(self, cid):
+        comp = self._comps.pop(cid)
+        for n in comp["nodes"]:
+            self._comp.pop(n, None)
+        self._rebuild |= comp["nodes"]
+        self._full.discard(cid)
+
+    def _component(self, seed):
+        comp = {seed}; todo = [seed]
+        while todo:
+            n = todo.pop()
+            for edges in (self.deps, self.rdeps):
+                for m in edges[n]:
+                    if m not in comp:
+                        comp.add(m); todo.append(m)
+        return comp
+
+    @staticmethod
+    def _reach(seeds, edges):
+        seen = set(seeds); todo = list(seen)
+        while todo:
+            for m in edges[todo.pop()]:
+                if m not in seen:
+                    seen.add(m); todo.append(m)
+        return seen
+
+    def _refresh(self):
+        # a component that lost edges may fall apart; each part keeps its times
+        # and only needs checking against its own base and finish
+        split, self._split = self._split, set()
+        check = set()
+        for cid in split:
+            comp = self._comps.get(cid)
+            if comp is None:
+                continue
+            rest = set(comp["nodes"])
+            part = self._component(next(iter(rest)))
+            if len(part) == len(rest):
+                continue
+            del self._comps[cid]
+            full = cid in self._full
+            self._full.discard(cid)
+            while rest:
+                part = part or self._component(next(iter(rest)))
+                rest -= part
+                new = self._new_comp(part)
+                self._comps[new].update(base=comp["base"], finish=comp["finish"], cycle=[n for n in comp["cycle"] if n in part])
+                (self._full if full else check).add(new)
+                part = None
+        while self._rebuild:
+            seed = self._rebuild.pop()
+            if seed not in self.info:
+                continue
+            nodes = self._component(seed)
+            for n in nodes:
+                if n in self._comp:
+                    self._dissolve(self._comp[n])
+            self._rebuild -= nodes
+            self._full.add(self._new_comp(nodes))
+        for cid in self._full:
+            self._schedule(self._comps[cid])
+        early, late = defaultdict(set), defaultdict(set)
+        for seeds, into in ((self._early, early), (self._late, late)):
+            for n in seeds:
+                cid = self._comp.get(n)
+                if cid is not None and cid not in self._full:
+                    into[cid].add(n)
+        for cid in (early.keys() | late.keys() | check & self._comps.keys()) - self._full:
+            comp = self._comps[cid]
+            if not self._reschedule(comp, early[cid], late[cid]):
+                self._schedule(comp)
+        self._full, self._early, self._late = set(), set(), set()
+
+    def _base(self, nodes):
+        starts = [self.info[n]["start"] for n in nodes if self.info[n]["start"] is not None]
+        return min(starts) if starts else datetime.date.today().toordinal()
+
+    def _set_early(self, n, base):
+        info = self.info[n]
+        es = max([info["start"] if info["start"] is not None else base] + [self._ef[d] for d in self.deps[n]])
+        if self._es.get(n) != es or self._ef.get(n) != es + info["dur"]:
+            self._es[n], self._ef[n] = es, es + info["dur"]
+            self._sched.pop(n, None)
+
+    def _set_late(self, n, finish):
+        lf = min([self._ls[c] for c in self.rdeps[n] if c in self._ls] or [finish])
+        if self._lf.get(n) != lf or self._ls.get(n) != lf - self.info[n]["dur"]:
+            self._lf[n], self._ls[n] = lf, lf - self.info[n]["dur"]
+            self._sched.pop(n, None)
+
+    def _schedule(self, comp):
+        # Kahn's algorithm, blockers first; whatever is left over sits on a cycle
+        nodes = comp["nodes"]
+        indeg = {n: len(self.deps[n]) for n in nodes}
+        ready = [n for n in nodes if indeg[n] == 0]
+        order = []
+        while ready:
+            n = ready.pop()
+            order.append(n)
+            for m in self.rdeps[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    ready.append(m)
+        comp["cycle"] = sorted(nodes - set(order))
+        for n in comp["cycle"]:
+            for m in (self._es, self._ef, self._ls, self._lf, self._sched):
+                m.pop(n, None)
+        comp["base"] = base = self._base(nodes)
+        for n in order:
+            self._set_early(n, base)
+        comp["finish"] = finish = max((self._ef[n] for n in order), default=base)
+        for n in reversed(order):
+            self._set_late(n, finish)
+
+    # Incremental pass: earliest times for everything downstream of `early`,
+    # latest times for everything upstream of `late`. False means a cycle and
+    # a full pass.
+    def _reschedule(self, comp, early, late):
+        if comp["cycle"]:
+            return False
+        base = self._base(comp["nodes"])
+        if base != comp["base"]:
+            comp["base"] = base
+            early = early | {n for n in comp["nodes"] if self.info[n]["start"] is None}
+        down = self._reach(early, self.rdeps)
+        indeg = {n: sum(1 for d in self.deps[n] if d in down) for n in down}
+        ready = [n for n in down if indeg[n] == 0]
+        done = 0
+        while ready:
+            n = ready.pop()
+            done += 1
+            self._set_early(n, comp["base"])
+            for m in self.rdeps[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    ready.append(m)
+        if done < len(down):
+            return False
+        finish = max(self._ef[n] for n in comp["nodes"])
+        up = self._reach(late, self.deps)
+        if finish != comp["finish"]:
+            comp["finish"], up = finish, comp["nodes"]
+        # a dependent always starts after its blocker, so earliest start
+        # descending visits dependents first
+        for n in sorted(up, key=self._es.__getitem__, reverse=True):
+            self._set_late(n, finish)
+        return True
+
+    def _closure(self, node, kind):
+        key = (node, kind)
+        if key not in self._closures:
+            edges = self.deps if kind == "blockers" else self.rdeps
+            seen = set(); todo = list(edges.get(node, ()))
+            while todo:
+                n = todo.pop()
+                if n not in seen:
+                    seen.add(n); todo.extend(edges.get(n, ()))
+            seen.discard(node)
+            self._closures[key] = sorted(seen)
+        return self._closures[key]
+
+    def blockers(self, node):
+        with self._lock:
+            return self._closure(node, "blockers")
+
+    def blocks(self, node):
+        with self._lock:
+            return self._closure(node, "blocks")
+
+    def open_blockers(self, node):
+        with self._lock:
+            return [n for n in self._closure(node, "blockers") if self.info[n]["status"] not in ("done", "cancelled")]
+
+    def _schedule_of(self, n):
+        if n not in self._es:
+            return {"cycle": True}
+        if n not in self._sched:
+            es, ef, ls, lf = self._es[n], self._ef[n], self._ls[n], self._lf[n]
+            self._sched[n] = {
+                "earliest_start": _iso(es), "earliest_finish": _iso(ef - 1),
+                "latest_start": _iso(ls), "latest_finish": _iso(lf - 1),
+                "slack": ls - es, "critical": ls == es,
+            }
+        return self._sched[n]
+
+    def schedule(self, ids=None):
+        with self._lock:
+            self._refresh()
+            return {n: self._schedule_of(n) for n in (self.info if ids is None else ids) if n in self.info}
+
+    def order(self):
+        with self._lock:
+            self._refresh()
+            result = {"order": [], "cycles": [], "critical_paths": []}
+            for comp in sorted(self._comps.values(), key=lambda c: min(c["nodes"])):
+                # earliest start is a topological order: durations are at least a day
+                order = sorted((n for n in comp["nodes"] if n in self._es), key=lambda n: (self._es[n], n))
+                result["order"].extend(order)
+                if comp["cycle"]:
+                    result["cycles"].append(comp["cycle"])
+                critical = [n for n in order if self._ls[n] == self._es[n]] if len(comp["nodes"]) > 1 else []
+                if critical:
+                    result["critical_paths"].append(critical)
+            return result
+
+    # path [node, dep, ..., node] if making node depend on new_deps closes a loop
+    # `overrides` maps task id -> dependency set for edits not yet in the graph
+    def find_cycle(self, node, new_deps, overrides=None):
+        overrides = overrides or {}
+        with self._lock:
+            return self._find_cycle(node, new_deps, lambda n: overrides.get(n, self.deps.get(n, ())))
+
+    @staticmethod
+    def _find_cycle(node, new_deps, deps):
+        for d in new_deps:
+            if d == node:
+                return [node, node]
+            prev = {d: None}; todo = [d]
+            while todo:
+                n = todo.pop()
+                if n == node:
+                    path = []
+                    while n is not None:
+                        path.append(n); n = prev[n]
+                    return [node] + path[::-1]
+                for m in deps(n):
+                    if m not in prev:
+                        prev[m] = n; todo.append(m)
+        return None
+
+    # find_cycle for many tasks at once (an import): `overrides` holds their
+    # dependency sets, and complete=True means they are the whole graph. One
+    # pass trims every task that cannot sit on a loop; only overridden tasks
+    # left over are searched.
+    def find_cycle_among(self, overrides, complete=False):
+        with self._lock:
+            def deps(n):
+                return overrides.get(n, ()) if complete else overrides.get(n, self.deps.get(n, ()))
+            seen = set(overrides); todo = list(seen)
+            while todo:
+                for m in deps(todo.pop()):
+                    if m not in seen:
+                        seen.add(m); todo.append(m)
+            dependents = dict.fromkeys(seen, 0)
+            for n in seen:
+                for m in deps(n):
+                    dependents[m] += 1
+            ready = [n for n, k in dependents.items() if k == 0]
+            while ready:
+                n = ready.pop()
+                del dependents[n]
+                for m in deps(n):
+                    dependents[m] -= 1
+                    if dependents[m] == 0:
+                        ready.append(m)
+            for n in sorted(dependents.keys() & overrides.keys()):
+                cycle = self._find_cycle(n, deps(n), deps)
+                if cycle:
+                    return cycle
+            return None
+
+DEP_GRAPH = WorkspaceState("graph")
+
+def parse_ids(values):
+    try:
+        return [int(v) for v in values if v not in (None, "")]
+    except (TypeError, ValueError):
+        raise ValueError("ids must be integers")
+
+# Gantt timeline: API name -> (table, R-tree, start columns, end columns, fields).
+# The first non-empty column wins, the same fallbacks the Gantt applies.
+TIMELINE_SPANS = {
+    "tasks": ("tasks", "task_span", ("start_date", "planned_start_date", "due_date"),
+              ("end_date", "planned_end_date", "due_date", "start_date", "planned_start_date"),
+              ("title", "status", "type", "priority", "assignee")),
+    "pis": ("program_increments", "pi_span", ("start_date",), ("end_date", "start_date"), ("name",)),
+    "sprints": ("sprints", "sprint_span", ("start_date",), ("end_date", "start_date"), ("pi_id", "name")),
+}
+ZOOM_STEPS = {"day": 1, "week": 7, "month": 30}
+ZOOM_WINDOW = {"day": 60, "week": 182, "month": 730}
+MAX_TIMELINE = 5000
+JD_OFFSET = 1721424  # CAST(julianday(d) AS INTEGER) - date.toordinal()
+
+def _day_sql(cols, prefix=""):
+    vals = [f"NULLIF({prefix}{c}, '')" for c in cols]
+    date = vals[0] if len(vals) == 1 else "COALESCE(" + ", ".join(vals) + ")"
+    return f"CAST(julianday({date}) AS INTEGER)"
+
+# (lo, hi) day-number expressions for a row; NULL when it has no usable start
+def _span_sql(starts, ends, prefix=""):
+    s, e = _day_sql(starts, prefix), _day_sql(ends, prefix)
+    return f"min({s}, COALESCE({e}, {s}))", f"max({s}, COALESCE({e}, {s}))"
+
+def init_timeline(cur):
+    for table, rtree, starts, ends, _ in TIMELINE_SPANS.values():
+        cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree_i32(id, lo, hi)")
+        lo, hi = _span_sql(starts, ends, "NEW.")
+        insert = f"INSERT INTO {rtree} (id, lo, hi) SELECT NEW.id, {lo}, {hi} WHERE {lo} IS NOT NULL;"
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_span_ins AFTER INSERT ON {table} BEGIN {insert} END")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_span_upd AFTER UPDATE OF {", ".join(sorted(set(starts + ends)))} ON {table} BEGIN
+            DELETE FROM {rtree} WHERE id = OLD.id;
+            {insert}
+        END
+        """)
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_span_del AFTER DELETE ON {table} BEGIN DELETE FROM {rtree} WHERE id = OLD.id; END")
+        # expression indexes answer the overall min/max without a scan
+        lo, hi = _span_sql(starts, ends)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_span_lo ON {table}({lo})")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_span_hi ON {table}({hi})")
+        if cur.execute(f"SELECT 1 FROM {rtree} LIMIT 1").fetchone() is None:
+            cur.execute(f"INSERT INTO {rtree} (id, lo, hi) SELECT id, {lo}, {hi} FROM {table} WHERE {lo} IS NOT NULL")
+
+def _timeline_day(qs, key):
+    raw = qs.get(key, [""])[0]
+    if not raw:
+        return None
+    ordinal = _ordinal(raw)
+    if ordinal is None:
+        raise ValueError(f"{key} must be a YYYY-MM-DD date")
+    return ordinal + JD_OFFSET
+
+# Items overlapping the from..to window plus the overall span and the tick
+# marks for the zoom level; day offsets are relative to the span start.
+def timeline(conn, qs):
+    zoom = qs.get("zoom", ["week"])[0]
+    if zoom not in ZOOM_STEPS:
+        raise ValueError("zoom must be day, week or month")
+    frm, to = _timeline_day(qs, "from"), _timeline_day(qs, "to")
+    los, his = [], []
+    for table, _, starts, ends, _ in TIMELINE_SPANS.values():
+        lo, hi = _span_sql(starts, ends)
+        row = conn.execute(f"SELECT (SELECT min({lo}) FROM {table}), (SELECT max({hi}) FROM {table})").fetchone()
+        if row[0] is not None:
+            los.append(row[0]); his.append(row[1])
+    out = {"zoom": zoom, "step": ZOOM_STEPS[zoom], "span": None, "ticks": [], "truncated": False}
+    out.update({name: [] for name in TIMELINE_SPANS})
+    if not los:
+        return out
+    start, end = min(los), max(his)
+    frm = start if frm is None else frm
+    to = frm + ZOOM_WINDOW[zoom] if to is None else to
+    if to < frm:
+        raise ValueError("to must not be before from")
+    out["span"] = {"start": _iso(start - JD_OFFSET), "end": _iso(end - JD_OFFSET), "days": end - start}
+    out["window"] = {"from": _iso(frm - JD_OFFSET), "to": _iso(to - JD_OFFSET)}
+    step = ZOOM_STEPS[zoom]
+    day = start + max(0, -(-(frm - start) // step)) * step
+    while day <= min(to, end):
+        out["ticks"].append({"day": day - start, "date": _iso(day - JD_OFFSET)})
+        day += step
+    for name, (table, rtree, _, _, fields) in TIMELINE_SPANS.items():
+        cols = ", ".join(f"t.{f}" for f in ("id",) + fields)
+        rows = conn.execute(f"""
+            SELECT {cols}, s.lo, s.hi FROM {rtree} s JOIN {table} t ON t.id = s.id
+            WHERE s.lo <= ? AND s.hi >= ? ORDER BY s.lo, s.id LIMIT ?
+        """, (to, frm, MAX_TIMELINE + 1)).fetchall()
+        if len(rows) > MAX_TIMELINE:
+            rows = rows[:MAX_TIMELINE]; out["truncated"] = True
+        items = []
+        for r in rows:
+            item = {k: r[k] for k in r.keys() if k not in ("lo", "hi")}
+            item.update(start=_iso(r["lo"] - JD_OFFSET), end=_iso(r["hi"] - JD_OFFSET), day=r["lo"] - start, days=r["hi"] - r["lo"])
+            items.append(item)
+        out[name] = items
+    return out
+
+# full-text search: API name -> (table, FTS5 table, indexed columns, extra fields returned)
+SEARCH_INDEXES = {
+    "tasks": ("tasks", "tasks_fts", ("title", "description"), ("status", "type", "priority", "assignee")),
+    "risks": ("risks", "risks_fts", ("title", "description", "mitigation"), ("status", "impact", "probability", "review_date")),
+}
+SEARCH_LIMIT = 20
+SEARCH_MAX = 200
+SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# external-content FTS5 tables over the source rows, kept in step by triggers
+def init_search(cur):
+    for table, fts, cols, _ in SEARCH_INDEXES.values():
+        exists = cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (fts,)).fetchone()
+        cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {", ".join(cols)}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """)
+        names = ", ".join(cols)
+        new = ", ".join(f"NEW.{c}" for c in cols)
+        old = ", ".join(f"OLD.{c}" for c in cols)
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ins AFTER INSERT ON {table} BEGIN INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new}); END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_fts_del AFTER DELETE ON {table} BEGIN INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old}); END")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_fts_upd AFTER UPDATE OF {names} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', OLD.id, {old});
+            INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new});
+        END
+        """)
+        if not exists:
+            cur.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+# every word of the input as a quoted prefix term, so user text is never parsed as FTS syntax
+def fts_query(text):
+    return " ".join(f'"{t}"*' for t in SEARCH_TOKEN.findall(text or ""))
+
+# Ranked hits across the requested indexes (bm25, titles weighted x10) with an
+# HTML-escaped snippet whose matches are wrapped in <mark>.
+def search(conn, q, names=None, limit=SEARCH_LIMIT):
+    match = fts_query(q)
+    if not match:
+        return []
+    hits = []
+    for name in names or SEARCH_INDEXES:
+        table, fts, cols, extra = SEARCH_INDEXES[name]
+        weights = ", ".join("10.0" if c == "title" else "1.0" for c in cols)
+        fields = ", ".join(f"t.{c}" for c in ("id", "title") + extra)
+        rows = conn.execute(f"""
+            SELECT {fields}, bm25({fts}, {weights}) AS rank,
+                   snippet({fts}, -1, char(2), char(3), '…', 12) AS snippet
+            FROM {fts} JOIN {table} t ON t.id = {fts}.rowid
+            WHERE {fts} MATCH ? ORDER BY rank LIMIT ?
+        """, (match, limit)).fetchall()
+        for r in rows:
+            hit = {"table": name, **{k: r[k] for k in r.keys()}}
+            hit["snippet"] = html.escape(r["snippet"] or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+            hit["rank"] = round(r["rank"], 4)
+            hits.append(hit)
+    hits.sort(key=lambda h: h["rank"])
+    return hits[:limit]
+
+WEEKEND = (5, 6)  # date.weekday()
+VELOCITY_SPRINTS = 3
+CALENDAR_MEMO_MAX = 100000
+# api scope -> (table, burndown_daily filter, tasks filter, number of times the id is bound)
+BURNDOWN_SCOPES = {
+    "sprint_id": ("sprints", "sprint_id = ?", "sprint_id = ?", 1),
+    "pi_id": ("program_increments", "pi_id = ? OR sprint_id IN (SELECT id FROM sprints WHERE pi_id = ?)",
+              "pi_id = ? OR sprint_id IN (SELECT id FROM sprints WHERE pi_id = ?)", 2),
+}
+
+# Working-day arithmetic over weekends and time_off. Entries without an assignee
+# are team-wide; the rest count against that person only. Days off are loaded
+# once per time_off version and counts are memoised until it changes.
+class WorkCalendar:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._off = {None: []}
+        self._sets = {None: set()}
+        self._memo = {}
+
+    def sync(self, conn):
+        version = table_versions(conn, ("time_off",)).get("time_off")
+        with self._lock:
+            if version == self._version:
+                return
+            off = defaultdict(set)
+            for date, who in conn.execute("SELECT date, assignee FROM time_off"):
+                day = _ordinal(date)
+                if day is not None and (day - 1) % 7 not in WEEKEND:
+                    off[who or None].add(day)
+            team = off.pop(None, set())
+            self._sets = {who: days | team for who, days in off.items()}
+            self._sets[None] = team
+            self._off = {who: sorted(days) for who, days in self._sets.items()}
+            self._memo = {}
+            self._version = version
+
+    @staticmethod
+    def weekdays(start, end):
+        if end < start:
+            return 0
+        weeks, rest = divmod(end - start + 1, 7)
+        first = (start - 1) % 7  # ordinal 1 is a Monday
+        return weeks * 5 + sum(1 for i in range(rest) if (first + i) % 7 not in WEEKEND)
+
+    def working_days(self, start, end, assignee=None):
+        key = (start, end, assignee)
+        with self._lock:
+            hit = self._memo.get(key)
+            if hit is None:
+                off = self._off.get(assignee, self._off[None])
+                hit = self.weekdays(start, end) - (bisect.bisect_right(off, end) - bisect.bisect_left(off, start))
+                if len(self._memo) >= CALENDAR_MEMO_MAX:
+                    self._memo.clear()
+                self._memo[key] = hit
+            return hit
+
+    def days_off(self, start, end, assignee=None):
+        with self._lock:
+            off = self._off.get(assignee, self._off[None])
+            return [_iso(d) for d in off[bisect.bisect_left(off, start):bisect.bisect_right(off, end)]]
+
+    def is_working(self, day, assignee=None):
+        return (day - 1) % 7 not in WEEKEND and day not in self._sets.get(assignee, self._sets[None])
+
+    def assignees(self, start, end):
+        with self._lock:
+            return [who for who, off in self._off.items()
+                    if who is not None and bisect.bisect_right(off, end) > bisect.bisect_left(off, start)]
+
+CALENDAR = WorkspaceState("calendar")
+
+# one task row's contribution to burndown_daily, signed for add/remove
+def _burndown_bump(x, sign):
+    key = f"COALESCE({x}.pi_id, 0), COALESCE({x}.sprint_id, 0)"
+    done = f"COALESCE({x}.completed_on, date('now'))"
+    added = f"COALESCE(substr({x}.created_at, 1, 10), '')"
+    points = f"{sign}COALESCE({x}.story_points, 0)"
+    upsert = "ON CONFLICT DO UPDATE SET points_added = points_added + excluded.points_added, tasks_added = tasks_added + excluded.tasks_added, " \
+             "points_done = points_done + excluded.points_done, tasks_done = tasks_done + excluded.tasks_done;"
+    return f"""
+        INSERT INTO burndown_daily (pi_id, sprint_id, day, points_added, tasks_added, points_done, tasks_done)
+        VALUES ({key}, {added}, {points}, {sign}1, 0, 0) {upsert}
+        INSERT INTO burndown_daily (pi_id, sprint_id, day, points_added, tasks_added, points_done, tasks_done)
+        SELECT {key}, {done}, 0, 0, {points}, {sign}1 WHERE {x}.status = 'done' {upsert}
+    """
+
+# Daily scope/completion deltas per (PI, sprint): a task adds its points on the
+# day it was created and burns them on its completed_on day. Triggers move the
+# contribution whenever a task is created, re-planned, finished or deleted, so
+# a burndown is a running sum over a few rows instead of a scan of history.
+def init_burndown(cur):
+    exists = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'burndown_daily'").fetchone()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS burndown_daily (
+        pi_id INTEGER NOT NULL,
+        sprint_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        points_added INTEGER NOT NULL DEFAULT 0,
+        tasks_added INTEGER NOT NULL DEFAULT 0,
+        points_done INTEGER NOT NULL DEFAULT 0,
+        tasks_done INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (pi_id, sprint_id, day)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_burndown_sprint ON burndown_daily(sprint_id, day)")
+    if not exists:
+        _fill_burndown(cur)
+    _burndown_triggers(cur)
+
+# completed_on is the day a task was finished, owned by the triggers: the day it
+# became done, or for a task inserted as done its actual_end_date if it has one.
+# Leaving done clears it. actual_end_date stays whatever the user entered.
+def _fill_burndown(cur):
+    ensure_column(cur, "tasks", "completed_on", "TEXT")
+    cur.execute("""
+    UPDATE tasks SET completed_on = substr(COALESCE(NULLIF(actual_end_date, ''), NULLIF(end_date, ''), updated_at, date('now')), 1, 10)
+    WHERE status = 'done' AND completed_on IS NULL
+    """)
+    cur.execute("DELETE FROM burndown_daily")
+    cur.execute("""
+    INSERT INTO burndown_daily (pi_id, sprint_id, day, points_added, tasks_added)
+    SELECT COALESCE(pi_id, 0), COALESCE(sprint_id, 0), COALESCE(substr(created_at, 1, 10), ''), SUM(COALESCE(story_points, 0)), COUNT(*)
+    FROM tasks GROUP BY 1, 2, 3
+    """)
+    cur.execute("""
+    INSERT INTO burndown_daily (pi_id, sprint_id, day, points_done, tasks_done)
+    SELECT COALESCE(pi_id, 0), COALESCE(sprint_id, 0), completed_on, SUM(COALESCE(story_points, 0)), COUNT(*)
+    FROM tasks WHERE status = 'done' GROUP BY 1, 2, 3 ORDER BY 1, 2, 3
+    ON CONFLICT DO UPDATE SET points_done = excluded.points_done, tasks_done = excluded.tasks_done
+    """)
+
+def _burndown_triggers(cur):
+    ensure_column(cur, "tasks", "completed_on", "TEXT")
+    for old in ("tasks_done_insert", "tasks_done_update", "tasks_reopen", "tasks_burndown_ins", "tasks_burndown_del", "tasks_burndown_upd"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {old}")
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_completed_ins AFTER INSERT ON tasks
+    WHEN NEW.status = 'done' AND NEW.completed_on IS NULL BEGIN
+        UPDATE tasks SET completed_on = substr(COALESCE(NULLIF(NEW.actual_end_date, ''), date('now')), 1, 10) WHERE id = NEW.id;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_completed_upd AFTER UPDATE OF status ON tasks
+    WHEN (NEW.status IS 'done') <> (OLD.status IS 'done') BEGIN
+        UPDATE tasks SET completed_on = CASE WHEN NEW.status = 'done' THEN date('now') END WHERE id = NEW.id;
+    END
+    """)
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_burndown_ins AFTER INSERT ON tasks BEGIN {_burndown_bump('NEW', '')} END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS tasks_burndown_del AFTER DELETE ON tasks BEGIN {_burndown_bump('OLD', '-')} END")
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_burndown_upd AFTER UPDATE OF status, story_points, pi_id, sprint_id, completed_on, created_at ON tasks BEGIN
+        {_burndown_bump('OLD', '-')}
+        {_burndown_bump('NEW', '')}
+    END
+    """)
+
+# Reopened tasks once had their actual_end_date cleared here; completed_on now
+# covers that, so the step is empty and only keeps the later steps numbered.
+def init_burndown_reopen(cur):
+    pass
+
+# Databases that ran the burndown step before completed_on existed: their
+# triggers kept the finish day in actual_end_date. Move it to completed_on and
+# rebuild the rollup from it.
+def init_task_completed_on(cur):
+    if "completed_on" not in [r[1] for r in cur.execute("PRAGMA table_info(tasks)").fetchall()]:
+        _fill_burndown(cur)
+    _burndown_triggers(cur)
+
+# the sprint or PI a capacity/burndown request is about; defaults to the current sprint
+def _plan_scope(conn, qs):
+    for key, (table, _, _, _) in BURNDOWN_SCOPES.items():
+        if key in qs:
+            try:
+                sid = int(qs[key][0])
+            except ValueError:
+                raise ValueError(f"{key} must be an integer")
+            row = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (sid,)).fetchone()
+            break
+    else:
+        key, today = "sprint_id", datetime.date.today().isoformat()
+        row = conn.execute("SELECT * FROM sprints WHERE start_date <= ? AND end_date >= ? ORDER BY start_date DESC LIMIT 1", (today, today)).fetchone()
+        if not row:
+            raise ValueError("sprint_id or pi_id required (no sprint is running today)")
+    if not row:
+        return None
+    start, end = _ordinal(row["start_date"]), _ordinal(row["end_date"])
+    if start is None or end is None or end < start:
+        raise ValueError(f"{row['name']} has no valid start/end dates")
+    CALENDAR.sync(conn)
+    return key, row, start, end
+
+def _scope_params(key, sid):
+    return (sid,) * BURNDOWN_SCOPES[key][3]
+
+# person-days available between start and end for the given assignees
+def _person_days(start, end, assignees):
+    return sum(CALENDAR.working_days(start, end, a) for a in assignees if a)
+
+# Points finished per sprint and per person-day over the sprints that ended
+# before `before`, from the burndown rollup.
+def velocity(conn, before, limit=VELOCITY_SPRINTS):
+    sprints = conn.execute("SELECT id, start_date, end_date FROM sprints WHERE end_date < ? ORDER BY end_date DESC LIMIT ?",
+                           (_iso(before), limit)).fetchall()
+    if not sprints:
+        return {"sprints": [], "points_per_sprint": None, "points_per_day": None}
+    ids = [s["id"] for s in sprints]
+    marks = ",".join("?" * len(ids))
+    done = dict(conn.execute(f"SELECT sprint_id, SUM(points_done) FROM burndown_daily WHERE sprint_id IN ({marks}) GROUP BY sprint_id", ids).fetchall())
+    people = defaultdict(list)
+    for sid, who in conn.execute(f"SELECT DISTINCT sprint_id, assignee FROM tasks WHERE sprint_id IN ({marks})", ids):
+        people[sid].append(who)
+    days = 0
+    for s in sprints:
+        start, end = _ordinal(s["start_date"]), _ordinal(s["end_date"])
+        if start is not None and end is not None:
+            days += _person_days(start, end, people[s["id"]])
+    total = sum(done.get(i) or 0 for i in ids)
+    return {"sprints": ids, "points_per_sprint": round(total / len(ids), 2),
+            "points_per_day": round(total / days, 3) if days else None}
+
+def capacity(conn, qs):
+    scope = _plan_scope(conn, qs)
+    if not scope:
+        return None
+    key, row, start, end = scope
+    sid = row["id"]
+    _, rollup, where, _ = BURNDOWN_SCOPES[key]
+    params = _scope_params(key, sid)
+    people = {}
+    for r in conn.execute(f"""
+        SELECT assignee, COUNT(*) AS tasks, SUM(COALESCE(story_points, 0)) AS points,
+               SUM(CASE WHEN status = 'done' THEN COALESCE(story_points, 0) ELSE 0 END) AS done
+        FROM tasks WHERE {where} GROUP BY assignee
+    """, params):
+        people[r["assignee"] or None] = {"tasks": r["tasks"], "points": r["points"], "done": r["done"]}
+    for who in CALENDAR.assignees(start, end):
+        people.setdefault(who, {"tasks": 0, "points": 0, "done": 0})
+    assignees = []
+    for who in sorted(people, key=lambda w: (w is None, w or "")):
+        item = {"assignee": who, **people[who]}
+        if who is not None:
+            item.update(working_days=CALENDAR.working_days(start, end, who), days_off=CALENDAR.days_off(start, end, who))
+        assignees.append(item)
+    totals = conn.execute(f"SELECT COALESCE(SUM(points_added), 0), COALESCE(SUM(points_done), 0) FROM burndown_daily WHERE {rollup}", params).fetchone()
+    person_days = _person_days(start, end, people)
+    vel = velocity(conn, start)
+    out = {
+        "scope": key[:-3], "id": sid, "name": row["name"], "start": row["start_date"], "end": row["end_date"],
+        "days": end - start + 1, "working_days": CALENDAR.working_days(start, end), "holidays": CALENDAR.days_off(start, end),
+        "capacity_days": person_days, "committed": totals[0], "done": totals[1],
+        "velocity": vel, "forecast": round(vel["points_per_day"] * person_days, 1) if vel["points_per_day"] else None,
+        "assignees": assignees,
+    }
+    if key == "pi_id":
+        done = {r[0]: r[1:] for r in conn.execute(
+            "SELECT sprint_id, SUM(points_added), SUM(points_done) FROM burndown_daily WHERE sprint_id IN (SELECT id FROM sprints WHERE pi_id = ?) GROUP BY sprint_id", (sid,))}
+        out["sprints"] = []
+        for s in conn.execute("SELECT id, name, start_date, end_date FROM sprints WHERE pi_id = ? ORDER BY start_date", (sid,)):
+            s_start, s_end = _ordinal(s["start_date"]), _ordinal(s["end_date"])
+            committed, finished = done.get(s["id"], (0, 0))
+            out["sprints"].append({"id": s["id"], "name": s["name"], "start": s["start_date"], "end": s["end_date"], "committed": committed, "done": finished,
+                                   "working_days": CALENDAR.working_days(s_start, s_end) if s_start is not None and s_end is not None else None})
+    return out
+
+# Daily burndown/burnup series: running sums of the burndown_daily deltas, an
+# ideal line that only drops on working days, and nothing past today. Work added
+# before the first day, or planned in after the last, counts from day one.
+def burndown(conn, qs):
+    scope = _plan_scope(conn, qs)
+    if not scope:
+        return None
+    key, row, start, end = scope
+    deltas = conn.execute(f"""
+        SELECT day, SUM(points_added), SUM(tasks_added), SUM(points_done), SUM(tasks_done)
+        FROM burndown_daily WHERE {BURNDOWN_SCOPES[key][1]} GROUP BY day ORDER BY day
+    """, _scope_params(key, row["id"])).fetchall()
+    today = datetime.date.today().toordinal()
+    total = CALENDAR.working_days(start, end)
+    last = _iso(end)
+    scope_pts = sum(d[1] for d in deltas if d[0] > last)
+    scope_tasks = sum(d[2] for d in deltas if d[0] > last)
+    done_pts = done_tasks = 0
+    i, elapsed, series, baseline = 0, 0, [], None
+    for day in range(start, end + 1):
+        iso = _iso(day)
+        while i < len(deltas) and deltas[i][0] <= iso:
+            scope_pts += deltas[i][1]; scope_tasks += deltas[i][2]; done_pts += deltas[i][3]; done_tasks += deltas[i][4]
+            i += 1
+        if baseline is None:
+            baseline = scope_pts
+        working = CALENDAR.is_working(day)
+        # the ideal line stands at the start of the day: working days before it
+        point = {"date": iso, "working": working, "ideal": round(baseline * (1 - elapsed / total), 2) if total else 0}
+        elapsed += working
+        if day <= today:
+            point.update(scope=scope_pts, done=done_pts, remaining=scope_pts - done_pts,
+                         tasks=scope_tasks, tasks_done=done_tasks, tasks_remaining=scope_tasks - done_tasks)
+        series.append(point)
+    # the close of the last day, where the ideal line reaches 0
+    series.append({"date": _iso(end + 1), "working": False, "ideal": 0})
+    return {"scope": key[:-3], "id": row["id"], "name": row["name"], "start": row["start_date"], "end": row["end_date"],
+            "working_days": total, "series": series}
+
+HIERARCHY_DEPTH = 256  # guards the backfill against parent_id loops already in the data
+HIERARCHY_MAX = 5000
+HIERARCHY_FIELDS = ("id", "title", "status", "type", "priority", "story_points", "assignee", "parent_id")
+PARENT_CYCLE = "parent cycle"
+
+# Closure of tasks.parent_id: one (ancestor, descendant, depth) row per pair,
+# including every task paired with itself at depth 0. A task whose parent does
+# not exist is a root. Triggers keep it current on insert, re-parent and delete,
+# and refuse to move a task under its own subtree.
+def init_task_tree(cur):
+    exists = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'task_tree'").fetchone()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS task_tree (
+        ancestor INTEGER NOT NULL,
+        descendant INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor, descendant)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_task_tree_descendant ON task_tree(descendant, depth)")
+    if not exists:
+        cur.execute(f"""
+        INSERT OR IGNORE INTO task_tree (ancestor, descendant, depth)
+        WITH RECURSIVE up(ancestor, descendant, depth) AS (
+            SELECT id, id, 0 FROM tasks
+            UNION ALL
+            SELECT p.id, up.descendant, up.depth + 1
+            FROM up JOIN tasks c ON c.id = up.ancestor JOIN tasks p ON p.id = c.parent_id
+            WHERE up.depth < {HIERARCHY_DEPTH}
+        )
+        SELECT ancestor, descendant, depth FROM up
+        """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_tree_ins AFTER INSERT ON tasks BEGIN
+        INSERT INTO task_tree (ancestor, descendant, depth)
+        SELECT NEW.id, NEW.id, 0
+        UNION ALL
+        SELECT ancestor, NEW.id, depth + 1 FROM task_tree WHERE descendant = NEW.parent_id;
+        -- children that arrived before their parent (imports keeping ids)
+        INSERT INTO task_tree (ancestor, descendant, depth)
+        SELECT a.ancestor, d.descendant, a.depth + d.depth + 1 FROM task_tree a, task_tree d
+        WHERE a.descendant = NEW.id AND d.ancestor IN (SELECT id FROM tasks WHERE parent_id = NEW.id AND id <> NEW.id);
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_tree_cycle BEFORE UPDATE OF parent_id ON tasks
+    WHEN NEW.parent_id IS NOT OLD.parent_id AND NEW.parent_id IN (SELECT descendant FROM task_tree WHERE ancestor = NEW.id) BEGIN
+        SELECT RAISE(ABORT, '{PARENT_CYCLE}');
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_tree_move AFTER UPDATE OF parent_id ON tasks
+    WHEN NEW.parent_id IS NOT OLD.parent_id BEGIN
+        DELETE FROM task_tree
+        WHERE descendant IN (SELECT descendant FROM task_tree WHERE ancestor = NEW.id)
+          AND ancestor IN (SELECT ancestor FROM task_tree WHERE descendant = NEW.id AND depth > 0);
+        INSERT INTO task_tree (ancestor, descendant, depth)
+        SELECT a.ancestor, d.descendant, a.depth + d.depth + 1 FROM task_tree a, task_tree d
+        WHERE a.descendant = NEW.parent_id AND d.ancestor = NEW.id;
+    END
+    """)
+    # the children of a deleted task become roots
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS tasks_tree_del AFTER DELETE ON tasks BEGIN
+        DELETE FROM task_tree
+        WHERE descendant IN (SELECT descendant FROM task_tree WHERE ancestor = OLD.id)
+          AND ancestor IN (SELECT ancestor FROM task_tree WHERE descendant = OLD.id);
+    END
+    """)
+
+def _first_date(cols):
+    return "substr(COALESCE(%s), 1, 10)" % ", ".join(f"NULLIF(t.{c}, '')" for c in cols)
+
+# Totals over each task in `ancestors` (an SQL subquery) and everything under
+# it: points and completion leave cancelled work out, dates span the whole
+# subtree. Dates are compared as ISO text, which is much cheaper than joining
+# the timeline R-tree row by row.
+def subtree_rollups(conn, ancestors, params=()):
+    _, _, starts, ends, _ = TIMELINE_SPANS["tasks"]
+    out = {}
+    for r in conn.execute(f"""
+        SELECT tt.ancestor, COUNT(*) - 1, SUM(tt.depth = 1),
+               SUM(COALESCE(t.status, '') <> 'cancelled'), SUM(t.status = 'done'),
+               SUM(CASE WHEN COALESCE(t.status, '') <> 'cancelled' THEN COALESCE(t.story_points, 0) ELSE 0 END),
+               SUM(CASE WHEN t.status = 'done' THEN COALESCE(t.story_points, 0) ELSE 0 END),
+               MIN({_first_date(starts)}), MAX({_first_date(ends)})
+        FROM task_tree tt JOIN tasks t ON t.id = tt.descendant
+        WHERE tt.ancestor IN ({ancestors}) GROUP BY tt.ancestor
+    """, params):
+        tid, descendants, children, tasks, done, points, done_points, start, end = r
+        if points:
+            pct = round(100 * done_points / points, 1)
+        else:
+            pct = round(100 * done / tasks, 1) if tasks else None
+        out[tid] = {
+            "children": children, "descendants": descendants, "tasks": tasks, "done": done,
+            "points": points, "done_points": done_points, "percent": pct,
+            "start": start, "end": end,
+        }
+    return out
+
+# Top-level tasks that have children, each with its rollup; the portfolio view.
+# Keyset-paginated on id like query_tasks -> (rows, next_cursor), and only the
+# page's roots are rolled up.
+def hierarchy_roots(conn, qs):
+    try:
+        limit = max(1, min(int(qs["limit"][0]), MAX_PAGE)) if qs.get("limit") else MAX_PAGE
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    after = decode_cursor(qs["cursor"][0], 1)[0] if qs.get("cursor") else 0
+    cols = ", ".join(f"p.{c}" for c in HIERARCHY_FIELDS)
+    rows = conn.execute(f"""
+        SELECT {cols} FROM tasks p WHERE p.id > ?
+        AND EXISTS (SELECT 1 FROM tasks c WHERE c.parent_id = p.id)
+        AND NOT EXISTS (SELECT 1 FROM task_tree WHERE descendant = p.id AND depth > 0)
+        ORDER BY p.id LIMIT ?
+    """, (after, limit + 1)).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]["id"]])
+    ids = [r["id"] for r in rows]
+    rollups = subtree_rollups(conn, ",".join("?" * len(ids)), ids) if ids else {}
+    return [dict(r, rollup=rollups.get(r["id"])) for r in rows], next_cursor
+
+# One task's subtree (down to `depth` levels) in depth-first order, each node
+# with its rollup, plus the path of ancestors above it. None if there is no such task.
+def hierarchy(conn, tid, depth=None):
+    depth = HIERARCHY_DEPTH if depth is None else depth
+    cols = ", ".join(f"t.{c}" for c in HIERARCHY_FIELDS)
+    rows = conn.execute(f"""
+        SELECT tt.depth, {cols} FROM task_tree tt JOIN tasks t ON t.id = tt.descendant
+        WHERE tt.ancestor = ? AND tt.depth <= ? ORDER BY tt.depth, t.id LIMIT ?
+    """, (tid, depth, HIERARCHY_MAX + 1)).fetchall()
+    if not rows:
+        return None
+    truncated = len(rows) > HIERARCHY_MAX
+    rows = rows[:HIERARCHY_MAX]
+    # rollups only for the rows returned, not every descendant within depth
+    ids = [r["id"] for r in rows]
+    rollups = subtree_rollups(conn, ",".join("?" * len(ids)), ids)
+    children = {}
+    for r in rows[1:]:
+        children.setdefault(r["parent_id"], []).append(r)
+    items, stack = [], [rows[0]]
+    while stack:
+        r = stack.pop()
+        items.append(dict(r, rollup=rollups.get(r["id"])))
+        stack.extend(reversed(children.get(r["id"], ())))
+    path = conn.execute("""
+        SELECT t.id, t.title FROM task_tree tt JOIN tasks t ON t.id = tt.ancestor
+        WHERE tt.descendant = ? AND tt.depth > 0 ORDER BY tt.depth DESC
+    """, (tid,)).fetchall()
+    return {"id": tid, "ancestors": [dict(r) for r in path], "rollup": items[0]["rollup"], "items": items, "truncated": truncated}
+
+GZIP_MIN = 1024
+COMPRESSIBLE = ("text/", "application/json", "application/javascript", "image/svg+xml")
+STATIC_MAX_AGE = 31536000
+VERSIONED_TABLES = ("tasks", "risks", "program_increments", "sprints", "time_off")
+
+def compressible(ctype):
+    return any(ctype.startswith(c) for c in COMPRESSIBLE)
+
+# per-table change counters bumped by triggers, so writes from automations count too
+def init_table_versions(cur):
+    cur.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)")
+    for table in VERSIONED_TABLES:
+        cur.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+            END
+            """)
+
+def table_versions(conn, tables):
+    marks = ",".join("?" * len(tables))
+    return dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({marks})", tables).fetchall())
+
+CHANGE_RETENTION = 50000
+CHANGE_PAGE = 1000
+
+# row-level journal of every write, pruned to the last CHANGE_RETENTION entries
+def init_change_journal(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS changes (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL
+    )
+    """)
+    for table in VERSIONED_TABLES:
+        for event, op, ref in (("INSERT", "upsert", "NEW"), ("UPDATE", "upsert", "NEW"), ("DELETE", "delete", "OLD")):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_journal_{event.lower()} AFTER {event} ON {table} BEGIN
+                INSERT INTO changes (tbl, row_id, op) VALUES ('{table}', {ref}.id, '{op}');
+            END
+            """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS changes_prune AFTER INSERT ON changes BEGIN
+        DELETE FROM changes WHERE version <= NEW.version - {CHANGE_RETENTION};
+    END
+    """)
+
+# Collapsed row deltas after `since`: the latest state of each touched row, or a
+# tombstone if it is gone. "reset" means the journal no longer reaches back that
+# far (or belongs to another database) and the client must reload.
+def changes_since(conn, since, limit=CHANGE_PAGE):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='changes'").fetchone()
+    latest = row[0] if row else 0
+    if since is None:
+        return {"version": latest, "changes": []}
+    oldest = conn.execute("SELECT MIN(version) FROM changes").fetchone()[0]
+    if since > latest or (oldest is not None and since < oldest - 1):
+        return {"version": latest, "reset": True, "changes": []}
+    rows = conn.execute("SELECT version, tbl, row_id, op FROM changes WHERE version > ? ORDER BY version LIMIT ?", (since, limit)).fetchall()
+    last = {}
+    for version, tbl, row_id, op in rows:
+        last.pop((tbl, row_id), None)
+        last[(tbl, row_id)] = version
+    wanted = defaultdict(list)
+    for tbl, row_id in last:
+        wanted[tbl].append(row_id)
+    current = {}
+    for tbl, ids in wanted.items():
+        for r in conn.execute(f"SELECT * FROM {tbl} WHERE id IN ({','.join('?' * len(ids))})", ids):
+            current[(tbl, r["id"])] = dict(r)
+    changes = []
+    for (tbl, row_id), version in last.items():
+        row = current.get((tbl, row_id))
+        changes.append({"version": version, "table": API_TABLES[tbl], "id": row_id, "op": "upsert" if row else "delete", "row": row})
+    return {"version": rows[-1][0] if rows else since, "more": len(rows) == limit, "changes": changes}
+
+# files read once and re-read only when their mtime or size changes
+class AssetCache:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        entry = self._entries.get(path)
+        if entry is None or entry["key"] != key:
+            with open(path, "rb") as f:
+                body = f.read()
+            entry = self._entry(key, body, mimetypes.guess_type(path)[0] or "application/octet-stream", st.st_mtime)
+            with self._lock:
+                self._entries[path] = entry
+        return entry
+
+    def derived(self, name, key, build):
+        entry = self._entries.get(name)
+        if entry is None or entry["key"] != key:
+            body, ctype, mtime = build()
+            entry = self._entry(key, body, ctype, mtime)
+            with self._lock:
+                self._entries[name] = entry
+        return entry
+
+    @staticmethod
+    def _entry(key, body, ctype, mtime):
+        if ctype.startswith("text/") and "charset" not in ctype:
+            ctype += "; charset=utf-8"
+        return {
+            "key": key,
+            "body": body,
+            "gzip": gzip.compress(body, 9) if compressible(ctype) and len(body) >= GZIP_MIN else None,
+            "ctype": ctype,
+            "etag": '"%s"' % hashlib.sha1(body).hexdigest()[:20],
+            "last_modified": formatdate(mtime, usegmt=True),
+        }
+
+ASSETS = AssetCache()
+STATIC_REF = re.compile(rb'(href|src)="(/static/[^"?#]+)"')
+
+# GET routes whose responses only change when these tables do
+API_ETAG_TABLES = {
+    "/api/tasks": ("tasks",),
+    "/api/risks": ("risks",),
+    "/api/pis": ("program_increments",),
+    "/api/sprints": ("sprints",),
+    "/api/timeoff": ("time_off",),
+    "/api/dashboard": ("tasks", "risks", "program_increments", "sprints"),
+    "/api/bootstrap": VERSIONED_TABLES,
+    "/api/graph": ("tasks",),
+    "/api/graph/schedule": ("tasks",),
+    "/api/timeline": ("tasks", "program_increments", "sprints"),
+    "/api/search": ("tasks", "risks"),
+    "/api/capacity": ("tasks", "sprints", "program_increments", "time_off"),
+    "/api/burndown": ("tasks", "sprints", "program_increments", "time_off"),
+    "/api/hierarchy": ("tasks",),
+}
+
+# bulk import/export names -> tables
+BULK_TABLES = {"tasks": "tasks", "risks": "risks", "pis": "program_increments", "sprints": "sprints", "timeoff": "time_off"}
+API_TABLES = {v: k for k, v in BULK_TABLES.items()}
+BULK_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+EXPORT_BATCH = 500
+IMPORT_BATCH = 1000
+IMPORT_CHUNK = 20000
+
+def export_chunks(conn, table, fmt):
+    cur = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+    cols = [d[0] for d in cur.description]
+    if fmt == "csv":
+        buf = io.StringIO(); writer = csv.writer(buf)
+        writer.writerow(cols)
+        yield buf.getvalue().encode("utf-8")
+    while True:
+        rows = cur.fetchmany(EXPORT_BATCH)
+        if not rows:
+            break
+        if fmt == "csv":
+            buf = io.StringIO(); writer = csv.writer(buf)
+            writer.writerows(["" if v is None else v for v in r] for r in rows)
+            yield buf.getvalue().encode("utf-8")
+        else:
+            yield "".join(json.dumps(dict(zip(cols, r))) + "\n" for r in rows).encode("utf-8")
+
+def parse_records(lines, fmt):
+    if fmt == "csv":
+        for rec in csv.DictReader(lines):
+            yield {k: (v if v != "" else None) for k, v in rec.items() if k}
+        return
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            raise ValueError(f"line {n}: invalid JSON")
+        if not isinstance(rec, dict):
+            raise ValueError(f"line {n}: expected an object")
+        yield rec
+
+def _insert_batch(conn, table, cols, batch, keep_ids, into=None):
+    # one executemany per distinct column set in the batch; `into` redirects the
+    # rows to a staging copy of table
+    groups = defaultdict(list)
+    now = now_iso()
+    for rec in batch:
+        row = {k: v for k, v in rec.items() if k in cols and (keep_ids or k != "id")}
+        if table == "tasks" and isinstance(row.get("dependencies"), list):
+            row["dependencies"] = json.dumps(row["dependencies"])
+        for stamp in ("created_at", "updated_at"):
+            if stamp in cols and not row.get(stamp):
+                row[stamp] = now
+        keys = tuple(sorted(row))
+        groups[keys].append([row[k] for k in keys])
+    for keys, rows in groups.items():
+        conn.executemany(f"INSERT INTO {into or table} ({','.join(keys)}) VALUES ({','.join('?' * len(keys))})", rows)
+
+# task id -> dependency ids, from task_deps, for the given tasks (all if None)
+def _task_edges(conn, ids=None):
+    edges = {} if ids is None else {i: set() for i in ids}
+    if ids is None:
+        edges.update((r[0], set()) for r in conn.execute("SELECT id FROM tasks"))
+        rows = conn.execute("SELECT task_id, depends_on FROM task_deps")
+    else:
+        marks = ",".join("?" * len(ids))
+        rows = conn.execute(f"SELECT task_id, depends_on FROM task_deps WHERE task_id IN ({marks})", list(ids))
+    for tid, dep in rows:
+        edges.setdefault(tid, set()).add(dep)
+    return edges
+
+# A loop closed by newly inserted tasks (all tasks if new_ids is None), read
+# inside the inserting transaction. The graph only holds edges between existing
+# tasks, so tasks already waiting on a new id are read from task_deps too;
+# `overrides` are dependency sets changed earlier in the same transaction.
+def new_task_cycle(conn, new_ids=None, overrides=None):
+    if new_ids is None:
+        return DEP_GRAPH.find_cycle_among(_task_edges(conn), complete=True)
+    if not new_ids:
+        return None
+    marks = ",".join("?" * len(new_ids))
+    waiting = {r[0] for r in conn.execute(f"SELECT task_id FROM task_deps WHERE depends_on IN ({marks})", list(new_ids))}
+    return DEP_GRAPH.find_cycle_among({**(overrides or {}), **_task_edges(conn, set(new_ids) | waiting)})
+
+def _check_import_cycles(conn, new_ids=None):
+    cycle = new_task_cycle(conn, new_ids)
+    if cycle:
+        raise ValueError(f"dependency cycle: {' -> '.join(map(str, cycle))}")
+
+_import_seq = itertools.count(1)
+
+# Streams records into table with IMPORT_BATCH-row executemany calls and one
+# transaction per IMPORT_CHUNK rows; parsing happens outside the writer lock.
+# replace=True keeps the incoming ids and stages the rows in a TEMP copy of the
+# table, swapped in by one transaction at the end, so a bad record leaves the
+# table as it was. Imported tasks get the same dependency-cycle check as edits.
+def import_records(records, table, replace=False):
+    with read_conn() as conn:
+        cols = set(table_columns(conn, table))
+    stage = f"import_stage_{next(_import_seq)}" if replace else None
+    state = {"committed": 0, "staged": 0}
+    pending = []; batch = []
+
+    def flush():
+        with write_conn() as conn:
+            if replace:
+                if not state["staged"]:
+                    schema = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+                    conn.execute(re.sub(r"^CREATE TABLE\s+\S+", f"CREATE TEMP TABLE {stage}", schema))
+                for b in pending:
+                    _insert_batch(conn, table, cols, b, True, into=f"temp.{stage}")
+            else:
+                if table == "tasks":
+                    DEP_GRAPH.sync_edges(conn)
+                    first = conn.execute("SELECT COALESCE(MAX(id), 0) FROM tasks").fetchone()[0]
+                for b in pending:
+                    _insert_batch(conn, table, cols, b, False)
+                if table == "tasks":
+                    _check_import_cycles(conn, [r[0] for r in conn.execute("SELECT id FROM tasks WHERE id > ?", (first,))])
+        rows = sum(len(b) for b in pending)
+        state["staged" if replace else "committed"] += rows
+        pending.clear()
+
+    try:
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= IMPORT_BATCH:
+                pending.append(batch); batch = []
+                if len(pending) * IMPORT_BATCH >= IMPORT_CHUNK:
+                    flush()
+        if batch:
+            pending.append(batch)
+        if pending or not replace:
+            flush()
+        if replace:
+            with write_conn() as conn:
+                conn.execute(f"DELETE FROM {table}")
+                if state["staged"]:
+                    conn.execute(f"INSERT INTO {table} SELECT * FROM temp.{stage}")
+                if table == "tasks":
+                    _check_import_cycles(conn)
+            state["committed"] = state["staged"]
+        if state["committed"] >= IMPORT_CHUNK:
+            with write_conn() as conn:
+                maintain(conn, tables=(table,))
+    except (ValueError, sqlite3.Error) as e:
+        if replace:
+            raise ValueError(f"{e} (nothing imported, {table} unchanged)")
+        raise ValueError(f"{e} ({state['committed']} rows imported before the error)")
+    finally:
+        if replace and state["staged"]:
+            with write_conn() as conn:
+                conn.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+        if table == "tasks":
+            DEP_GRAPH.invalidate()
+    return state["committed"]
+
+BATCH_MAX = 10000
+BATCH_OPS = ("create", "update", "delete")
+# defaults the single-row POST endpoints apply
+BATCH_DEFAULTS = {
+    "tasks": {"status": "backlog", "type": "task", "priority": "medium", "story_points": 0, "dependencies": []},
+    "risks": {"status": "open"},
+}
+
+class BatchError(ValueError):
+    def __init__(self, status, body):
+        super().__init__(body.get("error"))
+        self.status, self.body = status, body
+
+# Validates ops into (index, op, table, id, columns, values); raises BatchError
+# listing every invalid op so nothing is written unless the whole batch is sound.
+def _plan_batch(conn, ops):
+    if not isinstance(ops, list) or not ops:
+        raise BatchError(400, {"error": "ops must be a non-empty list"})
+    if len(ops) > BATCH_MAX:
+        raise BatchError(400, {"error": f"at most {BATCH_MAX} ops per batch"})
+    now, plan, errors = now_iso(), [], []
+    for i, o in enumerate(ops):
+        if not isinstance(o, dict):
+            errors.append({"index": i, "error": "op must be an object"}); continue
+        op, name, data = o.get("op"), o.get("table"), o.get("data") or {}
+        if op not in BATCH_OPS:
+            errors.append({"index": i, "error": "op must be create, update or delete"}); continue
+        if name not in BULK_TABLES:
+            errors.append({"index": i, "error": f"unknown table {name!r}"}); continue
+        table = BULK_TABLES[name]
+        cols = set(table_columns(conn, table)) - {"id"}
+        if not isinstance(data, dict) or set(data) - cols:
+            errors.append({"index": i, "error": f"unknown fields: {sorted(set(data) - cols) if isinstance(data, dict) else data!r}"}); continue
+        rid = None
+        if op != "create":
+            try:
+                rid = int(o.get("id"))
+            except (TypeError, ValueError):
+                errors.append({"index": i, "error": "id required"}); continue
+        if op == "delete":
+            plan.append((i, op, table, rid, (), ())); continue
+        row = dict(BATCH_DEFAULTS.get(table, {})) if op == "create" else {}
+        row.update(data)
+        if op == "update" and not row:
+            errors.append({"index": i, "error": "at least one field"}); continue
+        if "dependencies" in row:
+            try:
+                row["dependencies"] = json.dumps(parse_ids(row["dependencies"] or []))
+            except (TypeError, ValueError):
+                errors.append({"index": i, "error": "dependencies must be a list of ids"}); continue
+        if "updated_at" in cols:
+            row["updated_at"] = now
+            if op == "create":
+                row.setdefault("created_at", now)
+        keys = tuple(sorted(row))
+        plan.append((i, op, table, rid, keys, tuple(row[k] for k in keys)))
+    if errors:
+        raise BatchError(400, {"error": "invalid ops", "errors": errors})
+    return plan
+
+# Applies create/update/delete ops in one transaction. Consecutive ops with the
+# same kind, table and column set run as one executemany; results line up with ops.
+def apply_batch(ops):
+    results = [None] * (len(ops) if isinstance(ops, list) else 0)
+    with write_conn() as conn:
+        plan = _plan_batch(conn, ops)
+        # only dependency edits and task inserts/deletes feed the cycle check;
+        # edges only, rescheduling waits for the next reader
+        if any(p[2] == "tasks" and ("dependencies" in p[4] or p[1] != "update") for p in plan):
+            DEP_GRAPH.sync_edges(conn)
+        overrides = {}
+        for (op, table, keys), group in itertools.groupby(plan, key=lambda p: (p[1], p[2], p[4])):
+            group = list(group)
+            if table == "tasks" and "dependencies" in keys:
+                for i, _, _, rid, _, values in group:
+                    if rid is None:
+                        continue
+                    deps = set(json.loads(values[keys.index("dependencies")]))
+                    cycle = DEP_GRAPH.find_cycle(rid, deps, overrides)
+                    if cycle:
+                        raise BatchError(409, {"error": "dependency cycle", "index": i, "cycle": cycle})
+                    overrides[rid] = deps
+            ids = [g[3] for g in group if g[3] is not None]
+            found = set()
+            if ids:
+                marks = ",".join("?" * len(set(ids)))
+                found = {r[0] for r in conn.execute(f"SELECT id FROM {table} WHERE id IN ({marks})", list(set(ids)))}
+            try:
+                if op == "create":
+                    conn.executemany(f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({', '.join('?' * len(keys))})", [g[5] for g in group])
+                    # one writer, one statement: the new rowids are consecutive
+                    last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    for n, g in enumerate(group):
+                        results[g[0]] = {"id": last - len(group) + 1 + n}
+                        if table == "tasks" and "dependencies" in keys:
+                            new_id = results[g[0]]["id"]
+                            cycle = new_task_cycle(conn, [new_id], overrides)
+                            if cycle:
+                                raise BatchError(409, {"error": "dependency cycle", "index": g[0], "cycle": cycle})
+                            overrides[new_id] = set(json.loads(g[5][keys.index("dependencies")]))
+                elif op == "update":
+                    conn.executemany(f"UPDATE {table} SET {', '.join(f'{k}=?' for k in keys)} WHERE id=?", [g[5] + (g[3],) for g in group])
+                else:
+                    conn.executemany(f"DELETE FROM {table} WHERE id=?", [(g[3],) for g in group])
+                    if table == "tasks":
+                        overrides.update((g[3], set()) for g in group)
+            except sqlite3.Error as e:
+                raise BatchError(409 if str(e) == PARENT_CYCLE else 400, {"error": str(e), "ops": [group[0][0], group[-1][0]]})
+            for g in group:
+                if op != "create":
+                    results[g[0]] = {"id": g[3], "found": g[3] in found}
+    return results
+
+JOB_WORKERS = int(os.environ.get("PMP_JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = 64
+JOB_TIMEOUT = int(os.environ.get("PMP_JOB_TIMEOUT", "120"))
+JOB_OUTPUT_MAX = 4 * 1024 * 1024
+JOB_HISTORY = 100
+
+# a warm worker has already paid interpreter startup and waits on stdin for
+# "<script>\n<db path>\n", then runs the script exactly like `python script db`
+WARM_BOOT = (
+    "import os, sys, runpy\n"
+    "target = sys.stdin.readline().rstrip('\\n'); db = sys.stdin.readline().rstrip('\\n')\n"
+    "if target:\n"
+    "    sys.argv = [target, db]; sys.path[0] = os.path.dirname(target)\n"
+    "    runpy.run_path(target, run_name='__main__')\n"
+)
+
+def init_jobs(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        returncode INTEGER,
+        output TEXT,
+        created_at TEXT,
+        started_at TEXT,
+        finished_at TEXT
+    )
+    """)
+
+# anything still marked live belonged to a previous server process
+def recover_jobs(cur):
+    cur.execute("UPDATE jobs SET status='interrupted', finished_at=? WHERE status IN ('queued','running')", (now_iso(),))
+
+class Job:
+    def __init__(self, job_id, name, target, ws):
+        self.id = job_id
+        self.name = name
+        self.target = target
+        self.ws = ws
+        self.db_path = ws.path
+        self.status = "queued"
+        self.returncode = None
+        self.chunks = []
+        self.size = 0
+        self.proc = None
+        self.cancel_requested = None  # "cancelled" or "timeout"; the worker records it once output is drained
+        self.cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status not in ("queued", "running")
+
+    def append(self, text):
+        with self.cond:
+            if self.size < JOB_OUTPUT_MAX:
+                if self.size + len(text) >= JOB_OUTPUT_MAX:
+                    text = text[:JOB_OUTPUT_MAX - self.size] + "\n[output truncated]\n"
+                self.chunks.append(text)
+                self.size += len(text)
+            self.cond.notify_all()
+
+    def finish(self, status, returncode=None):
+        with self.cond:
+            self.status = status
+            self.returncode = returncode
+            self.cond.notify_all()
+
+# Runs automations on a bounded set of worker threads, each driving one warm
+# interpreter at a time; output is kept in memory for live streaming and
+# persisted to the jobs table when the run ends. Workers are shared by all
+# workspaces; a job keeps its workspace open and records into its jobs table.
+class JobRunner:
+    def __init__(self, workers=JOB_WORKERS, max_queue=JOB_QUEUE_MAX):
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(max_queue)
+        self._live = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, name, target, ws):
+        ws = WORKSPACES.acquire(ws.name)  # released by _record
+        with ws.pool.writer() as conn:
+            job_id = conn.execute("INSERT INTO jobs (name, status, created_at) VALUES (?, 'queued', ?)", (name, now_iso())).lastrowid
+        job = Job(job_id, name, target, ws)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._record(job, "rejected")
+            return None
+        with self._lock:
+            self._live[(ws.name, job_id)] = job
+            self._trim()
+            if len(self._threads) < self.workers:
+                t = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+        return job
+
+    def _trim(self):
+        finished = [j for j in self._live.values() if j.done]
+        for j in finished[:max(0, len(self._live) - JOB_HISTORY)]:
+            del self._live[(j.ws.name, j.id)]
+
+    @staticmethod
+    def _spawn():
+        return subprocess.Popen([sys.executable, "-u", "-c", WARM_BOOT], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    def _work(self):
+        proc = self._spawn()
+        while not self._stopping:
+            job = self._queue.get()
+            if job is None:
+                break
+            with job.cond:
+                if job.status != "queued" or job.cancel_requested:
+                    continue
+                job.status = "running"
+                job.proc = proc
+            with job.ws.pool.writer() as conn:
+                conn.execute("UPDATE jobs SET status='running', started_at=? WHERE id=?", (now_iso(), job.id))
+            timer = threading.Timer(JOB_TIMEOUT, self._timeout, (job,))
+            timer.start()
+            try:
+                proc.stdin.write(f"{job.target}\n{job.db_path}\n".encode("utf-8"))
+                proc.stdin.close()
+                fd = proc.stdout.fileno()
+                # one decoder per job so characters split across reads survive
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                while True:
+                    data = os.read(fd, 65536)
+                    text = decoder.decode(data, final=not data)
+                    if text:
+                        job.append(text)
+                    if not data:
+                        break
+                rc = proc.wait()
+            except OSError as e:
+                job.append(f"\n{e}\n")
+                rc = proc.poll()
+            finally:
+                timer.cancel()
+            status = job.cancel_requested or ("succeeded" if rc == 0 else "failed")
+            self._record(job, status, rc)
+            # start the next interpreter now so the following job skips startup
+            proc = self._spawn() if not self._stopping else None
+        if proc is not None:
+            proc.kill()
+
+    def _record(self, job, status, returncode=None):
+        output = "".join(job.chunks)
+        with job.ws.pool.writer() as conn:
+            conn.execute("UPDATE jobs SET status=?, returncode=?, output=?, finished_at=? WHERE id=?",
+                         (status, returncode, output, now_iso(), job.id))
+        job.finish(status, returncode)
+        WORKSPACES.release(job.ws)
+
+    def _timeout(self, job):
+        job.append(f"\n[timed out after {JOB_TIMEOUT}s]\n")
+        self._stop(job, "timeout")
+
+    def _stop(self, job, status):
+        with job.cond:
+            if job.done or job.cancel_requested:
+                return False
+            job.cancel_requested = status
+            proc = job.proc
+        if proc is None:
+            self._record(job, status)
+            return True
+        proc.terminate()
+        try:
+            proc.wait(5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        return True
+
+    def cancel(self, job_id):
+        job = self._live.get((workspace().name, job_id))
+        return bool(job) and self._stop(job, "cancelled")
+
+    def get(self, job_id):
+        job = self._live.get((workspace().name, job_id))
+        if job is not None:
+            with job.cond:
+                return {"id": job.id, "name": job.name, "status": job.status, "returncode": job.returncode, "output": "".join(job.chunks)}
+        with read_conn() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def history(self, limit=50):
+        with read_conn() as conn:
+            rows = conn.execute("SELECT id, name, status, returncode, created_at, started_at, finished_at FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    # yields output as it is produced until the job ends
+    def stream(self, job_id):
+        job = self._live.get((workspace().name, job_id))
+        if job is None:
+            row = self.get(job_id)
+            if row and row.get("output"):
+                yield row["output"].encode("utf-8")
+            return
+        sent = 0
+        while True:
+            with job.cond:
+                while sent == len(job.chunks) and not job.done:
+                    job.cond.wait(15)
+                chunks = job.chunks[sent:]
+                done = job.done
+            sent += len(chunks)
+            if chunks:
+                yield "".join(chunks).encode("utf-8")
+            if done and sent == len(job.chunks):
+                return
+
+    def shutdown(self):
+        self._stopping = True
+        for job in list(self._live.values()):
+            self._stop(job, "cancelled")
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+JOBS = JobRunner()
+
+# Schema history, applied in order; PRAGMA user_version counts the steps a
+# database has run. Steps are idempotent so files created before versioning
+# replay them safely. Only ever append.
+MIGRATIONS = (
+    ("base tables", init_tables),
+    ("planned/actual task dates", init_task_dates),
+    ("dashboard stats", init_dashboard_stats),
+    ("task list indexes", init_task_indexes),
+    ("dependency edges", init_task_deps),
+    ("table versions", init_table_versions),
+    ("jobs", init_jobs),
+    ("change journal", init_change_journal),
+    ("timeline r-trees", init_timeline),
+    ("full-text search", init_search),
+    ("time off assignee", init_time_off_assignee),
+    ("burndown rollup", init_burndown),
+    ("list indexes", init_list_indexes),
+    ("task hierarchy closure", init_task_tree),
+    ("reopened tasks", init_burndown_reopen),
+    ("task completion day", init_task_completed_on),
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+ANALYSIS_LIMIT = 1000
+OPTIMIZE_INTERVAL = float(os.environ.get("PMP_OPTIMIZE_INTERVAL", "3600"))
+
+# One user_version check on an up-to-date database; otherwise each pending step
+# runs in its own transaction and the planner statistics are refreshed after.
+def init_db(path=None):
+    conn = get_conn(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        conn.close()
+        raise RuntimeError(f"{path or DB_PATH} is at schema version {version}; this app only knows {SCHEMA_VERSION}")
+    cur = conn.cursor()
+    for number, (name, step) in enumerate(MIGRATIONS[version:], version + 1):
+        cur.execute("BEGIN")
+        try:
+            step(cur)
+            cur.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            conn.close()
+            raise
+    recover_jobs(cur)
     conn.commit()
+    if version < SCHEMA_VERSION:
+        # new tables and indexes start out without statistics
+        conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
     conn.close()
 
-    # lightweight migrations for new fields
-    ensure_column('tasks','planned_start_date','TEXT')
-    ensure_column('tasks','planned_end_date','TEXT')
-    ensure_column('tasks','actual_end_date','TEXT')
+# Keep planner statistics current: a full ANALYZE (plus merging the FTS
+# segments and truncating the WAL) on request, a sampled ANALYZE of `tables`
+# after bulk loads, else PRAGMA optimize, which only re-analyzes tables whose
+# statistics look stale.
+def maintain(conn, full=False, tables=()):
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"PRAGMA analysis_limit={0 if full else ANALYSIS_LIMIT}")
+    if full:
+        conn.execute("ANALYZE")
+        for _, fts, _, _ in SEARCH_INDEXES.values():
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return
+    for table in tables:
+        conn.execute(f"ANALYZE {table}")
+    if not tables:
+        conn.execute("PRAGMA optimize")
+    conn.commit()
+
+def maintenance_loop(stop, interval=OPTIMIZE_INTERVAL):
+    while not stop.wait(interval):
+        with WORKSPACES.held() as spaces:
+            for ws in spaces:
+                try:
+                    with ws.pool.writer() as conn:
+                        maintain(conn)
+                except sqlite3.Error as e:
+                    print(f"maintenance of {ws.name} failed: {e}", file=sys.stderr)
+        WORKSPACES.evict()
+
+DEFAULT_WORKSPACE = "default"
+WORKSPACE_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+WORKSPACE_HEADER = "X-Workspace"
+WORKSPACE_PREFIX = "/w/"
+CONN_OVERHEAD = 512 * 1024
+GRAPH_TASK_BYTES = 1024
+SUMMARY_WORKERS = 8
+
+class UnknownWorkspace(KeyError):
+    pass
+
+# One program's database plus everything cached from it. `users` counts the
+# requests and jobs currently inside it; only unused workspaces are evicted.
+# `memory` is the estimate from the last measure(), taken whenever eviction runs.
+class Workspace:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.pool = ConnPool(path)
+        self.graph = DepGraph()
+        self.calendar = WorkCalendar()
+        self.columns = {}
+        self.users = 0
+        self.memory = 0
+
+    # estimate: each open connection may fill its page cache up to the file size
+    def measure(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        self.memory = self.pool.connections * (min(CONN_CACHE, size) + CONN_OVERHEAD) + self.graph.size() * GRAPH_TASK_BYTES
+        return self.memory
+
+# Workspaces by name: the default one is DB_PATH, the others are <name>.db in
+# WORKSPACE_DIR. They are opened (and migrated) on first use and kept in LRU
+# order; when one opens, and on every maintenance pass, the least recently used
+# idle ones are closed while the estimated memory of the open ones is over the
+# budget. The default workspace stays open.
+class Workspaces:
+    def __init__(self, root=WORKSPACE_DIR, budget=WORKSPACE_MEMORY):
+        self.root = root
+        self.budget = budget
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._opening = threading.Lock()  # one open (and migration) at a time
+
+    def path(self, name):
+        return DB_PATH if name == DEFAULT_WORKSPACE else os.path.join(self.root, f"{name}.db")
+
+    def names(self):
+        found = {DEFAULT_WORKSPACE}
+        if os.path.isdir(self.root):
+            found.update(f[:-3] for f in os.listdir(self.root) if f.endswith(".db") and WORKSPACE_NAME.match(f[:-3]))
+        return sorted(found, key=lambda n: (n != DEFAULT_WORKSPACE, n))
+
+    def is_open(self, name):
+        return name in self._open
+
+    # the open workspace whose database is `path`, if any
+    def by_path(self, path):
+        with self._lock:
+            return next((ws for ws in self._open.values() if ws.path == path), None)
+
+    def default(self):
+        ws = self._open.get(DEFAULT_WORKSPACE)
+        if ws is None:
+            ws = self.acquire(DEFAULT_WORKSPACE)
+            self.release(ws)
+        return ws
+
+    # raises UnknownWorkspace for a bad name, or a missing one unless create is set
+    def acquire(self, name, create=False):
+        if not WORKSPACE_NAME.match(name or ""):
+            raise UnknownWorkspace(name)
+        with self._lock:
+            ws = self._open.get(name)
+            if ws is not None:
+                self._open.move_to_end(name)
+                ws.users += 1
+                return ws
+        with self._opening:
+            with self._lock:
+                ws = self._open.get(name)
+                if ws is not None:
+                    self._open.move_to_end(name)
+                    ws.users += 1
+                    return ws
+            path = self.path(name)
+            if not os.path.exists(path):
+                if not create:
+                    raise UnknownWorkspace(name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            init_db(path)
+            ws = Workspace(name, path)
+            with self._lock:
+                self._open[name] = ws
+                ws.users += 1
+        self.evict()
+        return ws
+
+    def release(self, ws):
+        with self._lock:
+            ws.users -= 1
+
+    # makes `name` the current workspace of this thread for the duration
+    @contextmanager
+    def use(self, name, create=False):
+        ws = self.acquire(name, create)
+        prev = getattr(_current, "ws", None)
+        _current.ws = ws
+        try:
+            yield ws
+        finally:
+            _current.ws = prev
+            self.release(ws)
+
+    # the open workspaces, held until the block ends
+    @contextmanager
+    def held(self):
+        with self._lock:
+            spaces = list(self._open.values())
+            for ws in spaces:
+                ws.users += 1
+        try:
+            yield spaces
+        finally:
+            for ws in spaces:
+                self.release(ws)
+
+    def memory(self):
+        with self._lock:
+            spaces = list(self._open.items())
+        return {name: ws.measure() for name, ws in spaces}
+
+    # sizes are measured outside the lock; the request path never pays for this
+    def evict(self):
+        with self._lock:
+            spaces = list(self._open.values())
+        for ws in spaces:
+            ws.measure()
+        closing = []
+        with self._lock:
+            used = sum(ws.memory for ws in self._open.values())
+            for name, ws in list(self._open.items()):
+                if used <= self.budget:
+                    break
+                if ws.users or name == DEFAULT_WORKSPACE:
+                    continue
+                used -= ws.memory
+                del self._open[name]
+                closing.append(ws)
+        for ws in closing:
+            ws.pool.close()
+
+    def close(self):
+        with self._lock:
+            spaces = list(self._open.values())
+            self._open.clear()
+        for ws in spaces:
+            ws.pool.close()
+
+WORKSPACES = Workspaces()
+
+def workspace_summary(conn):
+    stats = dict(conn.execute("SELECT name, value FROM dashboard_stats").fetchall())
+    return {
+        "version": changes_since(conn, None)["version"],
+        "task_load": {s: stats.get(f"status:{s}", 0) for s in TASK_STATUSES},
+        "dependency_count": stats.get("dependencies", 0),
+        "open_risks": conn.execute("SELECT COUNT(*) FROM risks WHERE COALESCE(status, '') <> 'closed'").fetchone()[0],
+        "pies": plan_pies(conn, datetime.date.today().isoformat()),
+    }
+
+# Summaries of every workspace, read in parallel (SQLite releases the GIL while
+# it works). Open workspaces use their pools; the others get a throwaway
+# read-only connection so a scan does not churn the LRU.
+def workspace_summaries():
+    def one(name):
+        out = {"name": name, "open": WORKSPACES.is_open(name)}
+        try:
+            if out["open"]:
+                with WORKSPACES.use(name):
+                    with read_conn() as conn:
+                        out.update(workspace_summary(conn))
+                return out
+            conn = sqlite3.connect(f"file:{WORKSPACES.path(name)}?mode=ro", uri=True, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            try:
+                out.update(workspace_summary(conn))
+            finally:
+                conn.close()
+        except (UnknownWorkspace, sqlite3.Error) as e:
+            out["error"] = str(e)
+        return out
+    names = WORKSPACES.names()
+    with ThreadPoolExecutor(max_workers=min(SUMMARY_WORKERS, len(names))) as pool:
+        return list(pool.map(one, names))
+
+JSON_TYPE ="application/json; charset=utf-8"
+JSON_BATCH = 500
+STREAM_MIN = 64 * 1024  # smaller bodies go out whole, with a Content-Length
+KEEPALIVE_TIMEOUT = 120
+DISCARD_MAX = 1024 * 1024  # larger unread request bodies close the connection instead
+
+# JSON array of rows, one chunk per JSON_BATCH rows; `rows` is a cursor or a list of dicts
+def json_array_chunks(rows):
+    if hasattr(rows, "fetchmany"):
+        batches = iter(lambda: rows.fetchmany(JSON_BATCH), [])
+    else:
+        batches = (rows[i:i + JSON_BATCH] for i in range(0, len(rows), JSON_BATCH))
+    sep = b"["
+    for batch in batches:
+        t = time.perf_counter()
+        text = json.dumps([r if isinstance(r, dict) else dict(r) for r in batch])
+        METRICS.add("json", time.perf_counter() - t)
+        yield sep + text[1:-1].encode("utf-8")
+        sep = b","
+    yield b"]" if sep == b"," else b"[]"
+
+TASK_STATUSES = ("backlog", "to-do", "in progress", "blocked", "done", "cancelled")
+LIST_QUERIES = {
+    "pis": "SELECT * FROM program_increments ORDER BY start_date ASC",
+    "sprints": "SELECT * FROM sprints ORDER BY start_date ASC",
+    "risks": "SELECT * FROM risks ORDER BY review_date ASC",
+    "timeoff": "SELECT * FROM time_off ORDER BY date ASC",
+}
+BOOTSTRAP_TABLES = ("tasks", "pis", "sprints", "risks", "timeoff")
+
+def list_automations():
+    items = []
+    if os.path.isdir(AUTOMATIONS_DIR):
+        for fname in os.listdir(AUTOMATIONS_DIR):
+            if fname.endswith(".py") and not fname.startswith("_"):
+                items.append({"name": fname[:-3], "file": fname})
+    return items
+
+# status counts for the PI and sprint running today (the earliest-starting one if they overlap)
+def plan_pies(conn, today):
+    out = {}
+    for key, table, col in (("pi", "program_increments", "pi_id"), ("sprint", "sprints", "sprint_id")):
+        row = conn.execute(f"SELECT id, name FROM {table} WHERE start_date <= ? AND end_date >= ? ORDER BY start_date ASC LIMIT 1",
+                           (today, today)).fetchone()
+        if not row:
+            out[key] = None
+            continue
+        counts = dict.fromkeys(TASK_STATUSES, 0)
+        for status, n in conn.execute(f"SELECT status, COUNT(*) FROM tasks WHERE {col} = ? GROUP BY status", (row["id"],)):
+            if status in counts:
+                counts[status] = n
+        out[key] = {"id": row["id"], "name": row["name"], "counts": counts}
+    return out
+
+# Dashboard lists for the current week; with ids=True the task and risk lists
+# carry only ids, for clients that already hold the rows.
+def dashboard(conn, ids=False):
+    today = datetime.date.today()
+    start_week = today - datetime.timedelta(days=today.weekday())
+    end_week = start_week + datetime.timedelta(days=6)
+    week = (start_week.isoformat(), end_week.isoformat())
+    cols = "id" if ids else "*"
+    due_this_week = conn.execute(f"""
+        SELECT {cols} FROM tasks WHERE COALESCE(due_date, planned_end_date) BETWEEN ? AND ?
+        ORDER BY COALESCE(due_date, planned_end_date) ASC
+    """, week).fetchall()
+    open_issues = conn.execute(f"""
+        SELECT {cols} FROM tasks WHERE type='bug' AND COALESCE(status, '') NOT IN ('done','cancelled')
+    """).fetchall()
+    risks_due = conn.execute(f"SELECT {cols} FROM risks WHERE review_date BETWEEN ? AND ? ORDER BY review_date ASC", week).fetchall()
+    stats = dict(conn.execute("SELECT name, value FROM dashboard_stats").fetchall())
+    rows = (lambda rs: [r[0] for r in rs]) if ids else (lambda rs: [dict(r) for r in rs])
+    return {
+        "week_start": start_week.isoformat(),
+        "week_end": end_week.isoformat(),
+        "due_this_week": rows(due_this_week),
+        "open_issues": rows(open_issues),
+        "dependency_count": stats.get("dependencies", 0),
+        "risks_due": rows(risks_due),
+        "task_load": {s: stats.get(f"status:{s}", 0) for s in TASK_STATUSES},
+        "pies": plan_pies(conn, today.isoformat()),
+    }
+
+# Everything the page needs on first load, read in one transaction so it is a
+# single snapshot: every table once, then the dashboard (lists as ids into
+# those tables), the first Gantt window (geometry only), the capacity and
+# burndown of the sprint running today and the automations. Streamed, since
+# the task list can be large.
+def bootstrap_chunks(conn, qs):
+    conn.execute("BEGIN")
+    yield b'{"version": %d, "tables": {' % changes_since(conn, None)["version"]
+    for i, name in enumerate(BOOTSTRAP_TABLES):
+        yield b'%s"%s": ' % (b", " if i else b"", name.encode())
+        yield from json_array_chunks(query_tasks(conn, {})[0] if name == "tasks" else conn.execute(LIST_QUERIES[name]))
+    board = dashboard(conn, ids=True)
+    gantt = timeline(conn, {"zoom": qs.get("zoom", ["week"])})
+    for name in TIMELINE_SPANS:
+        gantt[name] = [{k: item[k] for k in ("id", "start", "end", "day", "days")} for item in gantt[name]]
+    sprint = board["pies"]["sprint"]
+    scope = {"sprint_id": [str(sprint["id"])]} if sprint else None
+    try:
+        plan = {"capacity": capacity(conn, scope), "burndown": burndown(conn, scope)} if scope else {}
+    except ValueError:
+        plan = {}
+    rest = {"dashboard": board, "timeline": gantt, "capacity": plan.get("capacity"), "burndown": plan.get("burndown"),
+            "automations": list_automations()}
+    t = time.perf_counter()
+    text = json.dumps(rest)
+    METRICS.add("json", time.perf_counter() - t)
+    yield b"}, " + text[1:].encode("utf-8")
+
+# (method, path) -> (handler, whether it takes a JSON body); filled by @route on App methods
+API_ROUTES = {}
+
+def route(method, path, body=None):
+    def register(fn):
+        API_ROUTES[(method, path)] = (fn, method != "GET" if body is None else body)
+        return fn
+    return register
 
 class App(BaseHTTPRequestHandler):
-    def _send_raw(self, data: bytes, status=200, ctype="application/octet-stream"):
+    # keep-alive and chunked responses; idle connections are dropped after the timeout
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    _etag = None
+    _status = None
+    _t0 = None
+    _route = None
+
+    def setup(self):
+        super().setup()
+        # headers and body are separate writes; without this Nagle holds the body back
+        # for the client's delayed ACK on every kept-alive response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.wfile = CountingWriter(self.wfile)
+
+    def parse_request(self):
+        self._etag = None
+        self._status = None
+        self._route = None
+        self._t0 = time.perf_counter()
+        self._sent0 = self.wfile.count
+        METRICS.begin()
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def handle_one_request(self):
+        self._t0 = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._t0 is not None and self.command:
+                try:
+                    received = int(getattr(self, "headers", {}).get("Content-Length") or 0)
+                except (TypeError, ValueError):
+                    received = 0
+                METRICS.end(self.command, self._route or urlparse(self.path).path, self._status or 0, time.perf_counter() - self._t0,
+                            received, self.wfile.count - self._sent0)
+
+    def _accepts_gzip(self):
+        return "gzip" in (self.headers.get("Accept-Encoding") or "")
+
+    def _send_raw(self, data: bytes, status=200, ctype="application/octet-stream", headers=None):
+        headers = dict(headers or {})
+        if self._etag and status == 200:
+            headers.setdefault("ETag", self._etag)
+            headers.setdefault("Cache-Control", "no-cache")
+        headers.setdefault("Cache-Control", "no-store")
+        if "Content-Encoding" not in headers and len(data) >= GZIP_MIN and compressible(ctype):
+            headers["Vary"] = "Accept-Encoding"
+            if self._accepts_gzip():
+                data = gzip.compress(data, 5)
+                headers["Content-Encoding"] = "gzip"
         self.send_response(status)
         self.send_header("Content-Type", ctype)
-        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k, v)
         self.end_headers()
         self.wfile.write(data)
 
-    def _send_text(self, text: str, status=200, ctype="text/plain; charset=utf-8"):
-        self._send_raw(text.encode("utf-8"), status, ctype)
+    # Body of unknown length in chunked transfer encoding. Live streams flush the
+    # compressor after every chunk so it reaches the client as soon as it is made.
+    # If the producer fails part-way the connection is dropped without the final
+    # chunk, so the client sees a truncated body rather than a short valid one.
+    def _send_stream(self, chunks, ctype, headers=None, compress=True, live=False):
+        headers = dict(headers or {})
+        if self._etag:
+            headers.setdefault("ETag", self._etag)
+            headers.setdefault("Cache-Control", "no-cache")
+        headers.setdefault("Cache-Control", "no-store")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        gz = None
+        if compress and compressible(ctype):
+            self.send_header("Vary", "Accept-Encoding")
+            if self._accepts_gzip():
+                gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+                self.send_header("Content-Encoding", "gzip")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        write = self.wfile.write
+        try:
+            for chunk in chunks:
+                if gz is not None:
+                    chunk = gz.compress(chunk) + (gz.flush(zlib.Z_SYNC_FLUSH) if live else b"")
+                if chunk:
+                    write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            tail = gz.flush() if gz is not None else b""
+            write((b"%x\r\n%s\r\n" % (len(tail), tail) if tail else b"") + b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except BaseException:
+            self.close_connection = True
+            raise
+
+    # rows as a JSON array: small results in one piece, larger ones streamed as they are encoded
+    def _send_json_rows(self, rows, headers=None):
+        self._send_chunks(json_array_chunks(rows), JSON_TYPE, headers)
+
+    # whole if the chunks add up to less than STREAM_MIN, else streamed
+    def _send_chunks(self, chunks, ctype=JSON_TYPE, headers=None):
+        chunks = iter(chunks)
+        head, size = [], 0
+        for chunk in chunks:
+            head.append(chunk); size += len(chunk)
+            if size >= STREAM_MIN:
+                return self._send_stream(itertools.chain(head, chunks), ctype, headers)
+        self._send_raw(b"".join(head), 200, ctype, headers)
+
+    # server-sent events carrying change deltas; also polls so writes from other processes show up
+    def _change_events(self, since):
+        pool = db_pool()
+        yield b"retry: 3000\n\n"
+        while True:
+            seen = pool.commits
+            with read_conn() as conn:
+                delta = changes_since(conn, since)
+            if delta["changes"] or delta.get("reset"):
+                since = delta["version"]
+                yield f"id: {since}\nevent: change\ndata: {json.dumps(delta)}\n\n".encode("utf-8")
+                if delta.get("more"):
+                    continue
+            if not pool.wait_for_commit(seen, 15):
+                yield b": keepalive\n\n"
+
+    # request body as text lines, read incrementally
+    def _body_lines(self):
+        self._body_read = True
+        try:
+            remaining = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            remaining = 0
+        pending = b""
+        while remaining > 0:
+            chunk = self.rfile.readline(min(remaining, 65536))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            pending += chunk
+            if pending.endswith(b"\n"):
+                yield pending.decode("utf-8"); pending = b""
+        if pending:
+            yield pending.decode("utf-8")
+
+    def _not_modified(self, etag, last_modified=None):
+        inm = self.headers.get("If-None-Match")
+        if inm is not None:
+            return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+        ims = self.headers.get("If-Modified-Since")
+        if ims and last_modified:
+            try:
+                return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(ims)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _send_304(self, headers):
+        self.send_response(304)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def _send_asset(self, entry, cache_control):
+        headers = {"Cache-Control": cache_control, "ETag": entry["etag"], "Last-Modified": entry["last_modified"]}
+        if self._not_modified(entry["etag"], entry["last_modified"]):
+            return self._send_304(headers)
+        body = entry["body"]
+        if entry["gzip"] is not None:
+            headers["Vary"] = "Accept-Encoding"
+            if self._accepts_gzip():
+                body = entry["gzip"]
+                headers["Content-Encoding"] = "gzip"
+        self._send_raw(body, 200, entry["ctype"], headers)
+
+    def _api_etag(self, p, query):
+        tables = API_ETAG_TABLES.get(p)
+        if not tables:
+            return None
+        with read_conn() as conn:
+            versions = table_versions(conn, tables)
+        # the dashboard is relative to the current week, so the date is part of its identity
+        seed = [workspace().name, p, query, versions, datetime.date.today().isoformat()]
+        if p == "/api/bootstrap":  # it also lists automations/, which no table version covers
+            seed.append(list_automations())
+        seed = json.dumps(seed)
+        return 'W/"%s"' % hashlib.sha1(seed.encode("utf-8")).hexdigest()[:20]
+
+    def _send_text(self, text: str, status=200, ctype="text/plain; charset=utf-8", headers=None):
+        self._send_raw(text.encode("utf-8"), status, ctype, headers)
 
-    def _send_json(self, obj, status=200):
-        self._send_text(json.dumps(obj), status, "application/json; charset=utf-8")
+    def _send_json(self, obj, status=200, headers=None):
+        t = time.perf_counter()
+        text = json.dumps(obj)
+        METRICS.add("json", time.perf_counter() - t)
+        self._send_text(text, status, JSON_TYPE, headers)
 
     def _parse_json(self):
+        self._body_read = True
         try:
             length = int(self.headers.get("Content-Length", "0"))
         except ValueError:
@@ -134,121 +3040,331 @@ class App(BaseHTTPRequestHandler):
 
     def serve_index(self):
         path = os.path.join(TPL_DIR, "index.html")
-        with open(path, "rb") as f:
-            self._send_raw(f.read(), 200, "text/html; charset=utf-8")
+        tpl = ASSETS.get(path)
+        refs = {}
+        for m in STATIC_REF.finditer(tpl["body"]):
+            ref = m.group(2).decode("utf-8")
+            full = os.path.join(APP_DIR, ref.lstrip("/"))
+            if os.path.isfile(full):
+                refs[ref] = ASSETS.get(full)["etag"].strip('"')
 
-    def serve_static(self, path: str):
-        full = os.path.join(APP_DIR, path.lstrip("/"))
-        if not full.startswith(STATIC_DIR):
+        # stamp static URLs with their content hash so they can be cached forever
+        def stamp(m):
+            ref = m.group(2).decode("utf-8")
+            if ref not in refs:
+                return m.group(0)
+            return m.group(1) + b'="' + m.group(2) + b"?v=" + refs[ref].encode("ascii") + b'"'
+        def build():
+            return STATIC_REF.sub(stamp, tpl["body"]), "text/html; charset=utf-8", os.stat(path).st_mtime
+        entry = ASSETS.derived("index", (tpl["key"], tuple(sorted(refs.items()))), build)
+        self._send_asset(entry, "no-cache")
+
+    def serve_static(self, path: str, query=""):
+        full = os.path.normpath(os.path.join(APP_DIR, path.lstrip("/")))
+        if not full.startswith(STATIC_DIR + os.sep):
             self._send_text("Forbidden", 403)
             return
         if not os.path.isfile(full):
             self._send_text("Not found", 404)
             return
-        ctype = mimetypes.guess_type(full)[0] or "application/octet-stream"
-        with open(full, "rb") as f:
-            self._send_raw(f.read(), 200, ctype)
+        versioned = "v" in parse_qs(query or "")
+        self._send_asset(ASSETS.get(full), f"public, max-age={STATIC_MAX_AGE}, immutable" if versioned else "no-cache")
 
     def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    # /w/<name>/... or the X-Workspace header picks the workspace; static files are shared
+    def _dispatch(self, method):
         parsed = urlparse(self.path)
         p = parsed.path
+        name = self.headers.get(WORKSPACE_HEADER) or DEFAULT_WORKSPACE
+        if p.startswith(WORKSPACE_PREFIX):
+            name, _, rest = p[len(WORKSPACE_PREFIX):].partition("/")
+            p = "/" + rest
+        self._route = p
+        self._body_read = False
+        if method == "GET" and p.startswith("/static/"):
+            return self.serve_static(p, parsed.query)
+        handler, takes_json = API_ROUTES.get((method, p), (None, False))
+        if handler is None:
+            self._send_text("Not found", 404)
+        else:
+            try:
+                with WORKSPACES.use(name):
+                    if method == "GET":
+                        self._etag = self._api_etag(p, parsed.query)
+                        if self._etag and self._not_modified(self._etag):
+                            self._send_304({"ETag": self._etag, "Cache-Control": "no-cache"})
+                            return
+                    handler(self, parse_qs(parsed.query or ""), self._parse_json() if takes_json else None)
+            except UnknownWorkspace:
+                self._send_json({"error": f"unknown workspace {name!r}"}, 404)
+        # an unread request body would be taken for the next request on this connection
+        if not self._body_read:
+            self._discard_body()
 
-        if p == "/":
-            return self.serve_index()
-        if p.startswith("/static/"):
-            return self.serve_static(p)
-
-        if p == "/api/tasks":
-            qs = parse_qs(parsed.query or "")
-            status = qs.get("status", [None])[0]
-            conn = get_conn(); cur = conn.cursor()
-            q = "SELECT * FROM tasks"
-            params = []
-            if status:
-                q += " WHERE status=?"
-                params.append(status)
-            q += " ORDER BY priority DESC, COALESCE(due_date, planned_end_date) ASC"
-            rows = cur.execute(q, params).fetchall()
-            conn.close()
-            return self._send_json([dict(r) for r in rows])
+    def _discard_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if self.headers.get("Transfer-Encoding") or not 0 <= length <= DISCARD_MAX:
+            self.close_connection = True
+        elif length:
+            self.rfile.read(length)
 
-        if p == "/api/risks":
-            conn = get_conn(); cur = conn.cursor()
-            rows = cur.execute("SELECT * FROM risks ORDER BY review_date ASC").fetchall()
-            conn.close()
-            return self._send_json([dict(r) for r in rows])
+    @route("GET", "/")
+    def get_index(self, qs, data):
+        self.serve_index()
 
-        if p == "/api/pis":
-            conn = get_conn(); cur = conn.cursor()
-            rows = cur.execute("SELECT * FROM program_increments ORDER BY start_date ASC").fetchall()
-            conn.close()
-            return self._send_json([dict(r) for r in rows])
+    @route("GET", "/api/tasks")
+    def get_tasks(self, qs, data):
+        with read_conn() as conn:
+            try:
+                rows, next_cursor = query_tasks(conn, qs)
+            except ValueError as e:
+                return self._send_json({"error": str(e)}, 400)
+            self._send_json_rows(rows, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
-        if p == "/api/sprints":
-            conn = get_conn(); cur = conn.cursor()
-            rows = cur.execute("SELECT * FROM sprints ORDER BY start_date ASC").fetchall()
-            conn.close()
-            return self._send_json([dict(r) for r in rows])
+    @route("GET", "/api/risks")
+    def get_risks(self, qs, data):
+        with read_conn() as conn:
+            self._send_json_rows(conn.execute(LIST_QUERIES["risks"]))
 
-        if p == "/api/timeoff":
-            conn = get_conn(); cur = conn.cursor()
-            rows = cur.execute("SELECT * FROM time_off ORDER BY date ASC").fetchall()
-            conn.close()
-            return self._send_json([dict(r) for r in rows])
-
-        if p == "/api/dashboard":
-            conn = get_conn(); cur = conn.cursor()
-            today = datetime.date.today()
-            start_week = today - datetime.timedelta(days=today.weekday())
-            end_week = start_week + datetime.timedelta(days=6)
-
-            rows = cur.execute("SELECT * FROM tasks").fetchall()
-            tasks = [dict(r) for r in rows]
-            due_this_week = [t for t in tasks if (t.get("due_date") or t.get("planned_end_date")) and start_week.isoformat() <= (t.get("due_date") or t.get("planned_end_date")) <= end_week.isoformat()]
-            open_issues = [t for t in tasks if t.get("type") == "bug" and t.get("status") not in ("done", "cancelled")]
-            deps = 0
-            for t in tasks:
-                try: deps += len(json.loads(t.get("dependencies") or "[]"))
-                except Exception: pass
-
-            rrows = cur.execute("SELECT * FROM risks").fetchall()
-            risks = [dict(r) for r in rrows]
-            risks_due = [r for r in risks if r.get("review_date") and start_week.isoformat() <= r["review_date"] <= end_week.isoformat()]
-
-            statuses = ["backlog","to-do","in progress","blocked","done","cancelled"]
-            load = {s: 0 for s in statuses}
-            for t in tasks:
-                s = t.get("status")
-                if s in load: load[s] += 1
+    @route("GET", "/api/pis")
+    def get_pis(self, qs, data):
+        with read_conn() as conn:
+            self._send_json_rows(conn.execute(LIST_QUERIES["pis"]))
 
-            conn.close()
-            return self._send_json({
-                "week_start": start_week.isoformat(),
-                "week_end": end_week.isoformat(),
-                "due_this_week": due_this_week,
-                "open_issues": open_issues,
-                "dependency_count": deps,
-                "risks_due": risks_due,
-                "task_load": load
-            })
-
-        if p == "/api/automations":
-            items = []
-            if os.path.isdir(AUTOMATIONS_DIR):
-                for fname in os.listdir(AUTOMATIONS_DIR):
-                    if fname.endswith(".py") and not fname.startswith("_"):
-                        items.append({"name": fname[:-3], "file": fname})
-            return self._send_json(items)
-
-        return self._send_text("Not found", 404)
+    @route("GET", "/api/sprints")
+    def get_sprints(self, qs, data):
+        with read_conn() as conn:
+            self._send_json_rows(conn.execute(LIST_QUERIES["sprints"]))
 
-    def do_POST(self):
-        parsed = urlparse(self.path)
-        p = parsed.path
-        data = self._parse_json()
+    @route("GET", "/api/timeoff")
+    def get_timeoff(self, qs, data):
+        with read_conn() as conn:
+            self._send_json_rows(conn.execute(LIST_QUERIES["timeoff"]))
+
+    @route("GET", "/api/bootstrap")
+    def get_bootstrap(self, qs, data):
+        if qs.get("zoom", ["week"])[0] not in ZOOM_STEPS:
+            return self._send_json({"error": "zoom must be day, week or month"}, 400)
+        with read_conn() as conn:
+            self._send_chunks(bootstrap_chunks(conn, qs))
+
+    @route("GET", "/api/dashboard")
+    def get_dashboard(self, qs, data):
+        with read_conn() as conn:
+            self._send_json(dashboard(conn))
+
+    @route("GET", "/api/graph")
+    def get_graph(self, qs, data):
+        try:
+            ids = parse_ids(qs.get("id", []))
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        with read_conn() as conn:
+            DEP_GRAPH.sync(conn)
+        if not ids:
+            return self._send_json(DEP_GRAPH.order())
+        self._send_json([{
+            "id": tid,
+            "blockers": DEP_GRAPH.blockers(tid),
+            "blocks": DEP_GRAPH.blocks(tid),
+            "open_blockers": DEP_GRAPH.open_blockers(tid),
+            "schedule": DEP_GRAPH.schedule([tid]).get(tid),
+        } for tid in ids])
+
+    @route("GET", "/api/graph/schedule")
+    def get_graph_schedule(self, qs, data):
+        try:
+            ids = parse_ids(qs.get("id", []))
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        with read_conn() as conn:
+            DEP_GRAPH.sync(conn)
+        self._send_json(DEP_GRAPH.schedule(ids or None))
+
+    @route("GET", "/api/hierarchy")
+    def get_hierarchy(self, qs, data):
+        try:
+            ids = parse_ids(qs.get("id", []))
+            depth = int(qs["depth"][0]) if "depth" in qs else None
+        except ValueError:
+            return self._send_json({"error": "id and depth must be integers"}, 400)
+        with read_conn() as conn:
+            if not ids:
+                try:
+                    roots, next_cursor = hierarchy_roots(conn, qs)
+                except ValueError as e:
+                    return self._send_json({"error": str(e)}, 400)
+                return self._send_json(roots, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+            tree = hierarchy(conn, ids[0], depth)
+        if tree is None:
+            return self._send_json({"error": "Not found"}, 404)
+        self._send_json(tree)
 
-        if p == "/api/seed":
-            conn = get_conn(); cur = conn.cursor()
+    @route("GET", "/api/timeline")
+    def get_timeline(self, qs, data):
+        try:
+            with read_conn() as conn:
+                return self._send_json(timeline(conn, qs))
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+
+    def _send_report(self, report, qs):
+        try:
+            with read_conn() as conn:
+                out = report(conn, qs)
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        if out is None:
+            return self._send_json({"error": "Not found"}, 404)
+        self._send_json(out)
+
+    @route("GET", "/api/capacity")
+    def get_capacity(self, qs, data):
+        self._send_report(capacity, qs)
+
+    @route("GET", "/api/burndown")
+    def get_burndown(self, qs, data):
+        self._send_report(burndown, qs)
+
+    @route("GET", "/api/search")
+    def get_search(self, qs, data):
+        names = qs.get("table") or list(SEARCH_INDEXES)
+        if any(n not in SEARCH_INDEXES for n in names):
+            return self._send_json({"error": f"table must be one of {', '.join(SEARCH_INDEXES)}"}, 400)
+        try:
+            limit = max(1, min(int(qs.get("limit", [SEARCH_LIMIT])[0]), SEARCH_MAX))
+        except ValueError:
+            return self._send_json({"error": "limit must be an integer"}, 400)
+        q = qs.get("q", [""])[0]
+        with read_conn() as conn:
+            self._send_json({"q": q, "results": search(conn, q, names, limit)})
+
+    @route("GET", "/api/export")
+    def get_export(self, qs, data):
+        name = qs.get("table", [""])[0]
+        fmt = qs.get("format", ["ndjson"])[0]
+        if name not in BULK_TABLES or fmt not in BULK_FORMATS:
+            return self._send_json({"error": "table and format required"}, 400)
+        with read_conn() as conn:
+            self._send_stream(export_chunks(conn, BULK_TABLES[name], fmt), BULK_FORMATS[fmt],
+                              {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'})
+
+    @route("GET", "/api/jobs")
+    def get_jobs(self, qs, data):
+        try:
+            ids = parse_ids(qs.get("id", []))
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        if not ids:
+            return self._send_json(JOBS.history())
+        job = JOBS.get(ids[0])
+        if job is None:
+            return self._send_json({"error": "Not found"}, 404)
+        self._send_json(job)
+
+    @route("GET", "/api/jobs/stream")
+    def get_job_stream(self, qs, data):
+        try:
+            ids = parse_ids(qs.get("id", []))
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        if not ids:
+            return self._send_json({"error": "id required"}, 400)
+        self._send_stream(JOBS.stream(ids[0]), "text/plain; charset=utf-8", live=True)
+
+    def _since(self, qs):
+        raw = self.headers.get("Last-Event-ID") or qs.get("since", [""])[0]
+        try:
+            return int(raw) if raw != "" else None
+        except ValueError:
+            raise ValueError("since must be an integer")
+
+    @route("GET", "/api/changes")
+    def get_changes(self, qs, data):
+        try:
+            since = self._since(qs)
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        with read_conn() as conn:
+            self._send_json(changes_since(conn, since))
+
+    @route("GET", "/api/changes/stream")
+    def get_change_stream(self, qs, data):
+        try:
+            since = self._since(qs)
+        except ValueError as e:
+            return self._send_json({"error": str(e)}, 400)
+        if since is None:
+            with read_conn() as conn:
+                since = changes_since(conn, None)["version"]
+        self._send_stream(self._change_events(since), "text/event-stream", {"X-Accel-Buffering": "no"}, compress=False, live=True)
+
+    @route("GET", "/api/metrics")
+    def get_metrics(self, qs, data):
+        if qs.get("format", [""])[0] == "json":
+            return self._send_json(METRICS.snapshot())
+        self._send_text(METRICS.prometheus(), ctype="text/plain; version=0.0.4; charset=utf-8")
+
+    @route("GET", "/api/metrics/profiles")
+    def get_profiles(self, qs, data):
+        if METRICS.profiler is None:
+            return self._send_json({"error": "profiling is off; start the server with --profile"}, 404)
+        self._send_json(METRICS.profiler.profiles())
+
+    @route("GET", "/api/workspaces")
+    def get_workspaces(self, qs, data):
+        if qs.get("summary", ["1"])[0] == "0":
+            spaces = [{"name": n, "open": WORKSPACES.is_open(n)} for n in WORKSPACES.names()]
+        else:
+            spaces = workspace_summaries()
+        self._send_json({"current": workspace().name, "budget": WORKSPACES.budget, "memory": WORKSPACES.memory(), "workspaces": spaces})
+
+    @route("POST", "/api/workspaces")
+    def post_workspace(self, qs, data):
+        name = (data.get("name") or "").strip()
+        if not WORKSPACE_NAME.match(name):
+            return self._send_json({"error": "name must be up to 64 lowercase letters, digits, '-' or '_'"}, 400)
+        if name in WORKSPACES.names():
+            return self._send_json({"error": "workspace exists"}, 409)
+        with WORKSPACES.use(name, create=True):
+            pass
+        self._send_json({"name": name, "url": f"{WORKSPACE_PREFIX}{name}/"})
+
+    @route("GET", "/api/automations")
+    def get_automations(self, qs, data):
+        self._send_json(list_automations())
+
+    @route("POST", "/api/import", body=False)
+    def post_import(self, qs, data):
+        name = qs.get("table", [""])[0]
+        fmt = qs.get("format", ["ndjson"])[0]
+        if name not in BULK_TABLES or fmt not in BULK_FORMATS:
+            return self._send_json({"error": "table and format required"}, 400)
+        try:
+            count = import_records(parse_records(self._body_lines(), fmt), BULK_TABLES[name], qs.get("mode", [""])[0] == "replace")
+        except ValueError as e:
+            self.close_connection = True
+            return self._send_json({"error": str(e)}, 400)
+        self._send_json({"imported": count})
+
+    @route("POST", "/api/seed")
+    def post_seed(self, qs, data):
+        with write_conn() as conn:
+            cur = conn.cursor()
             for t in ("program_increments","sprints","tasks","risks","time_off"):
                 cur.execute(f"DELETE FROM {t}")
                 cur.execute(f"DELETE FROM sqlite_sequence WHERE name='{t}'")
@@ -286,32 +3402,46 @@ class App(BaseHTTPRequestHandler):
                 ("2025-11-28", "holiday", "Thanksgiving Friday"),
                 ("2025-11-27", "holiday", "Thanksgiving Day")
             ])
+        DEP_GRAPH.invalidate()
+        return self._send_json({"ok": True})
 
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/tasks":
-            conn = get_conn(); cur = conn.cursor()
-            now = now_iso()
-            cur.execute("""
-                INSERT INTO tasks (title,description,status,type,priority,story_points,parent_id,due_date,start_date,end_date,planned_start_date,planned_end_date,actual_end_date,pi_id,sprint_id,assignee,dependencies,created_at,updated_at)
-                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
-            """, [
-                data.get("title"), data.get("description"), data.get("status", "backlog"), data.get("type","task"),
-                data.get("priority","medium"), data.get("story_points",0), data.get("parent_id"),
-                data.get("due_date"), data.get("start_date"), data.get("end_date"),
-                data.get("planned_start_date"), data.get("planned_end_date"), data.get("actual_end_date"),
-                data.get("pi_id"), data.get("sprint_id"), data.get("assignee"),
-                json.dumps(data.get("dependencies", [])), now, now
-            ])
-            tid = cur.lastrowid
-            conn.commit(); conn.close()
-            return self._send_json({"id": tid})
+    @route("POST", "/api/tasks")
+    def post_task(self, qs, data):
+        now = now_iso()
+        try:
+            new_deps = parse_ids(data.get("dependencies") or [])
+        except (TypeError, ValueError):
+            new_deps = []
+        try:
+            with write_conn() as conn:
+                if new_deps:
+                    DEP_GRAPH.sync_edges(conn)
+                cur = conn.execute("""
+                    INSERT INTO tasks (title,description,status,type,priority,story_points,parent_id,due_date,start_date,end_date,planned_start_date,planned_end_date,actual_end_date,pi_id,sprint_id,assignee,dependencies,created_at,updated_at)
+                    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                """, [
+                    data.get("title"), data.get("description"), data.get("status", "backlog"), data.get("type","task"),
+                    data.get("priority","medium"), data.get("story_points",0), data.get("parent_id"),
+                    data.get("due_date"), data.get("start_date"), data.get("end_date"),
+                    data.get("planned_start_date"), data.get("planned_end_date"), data.get("actual_end_date"),
+                    data.get("pi_id"), data.get("sprint_id"), data.get("assignee"),
+                    json.dumps(data.get("dependencies", [])), now, now
+                ])
+                tid = cur.lastrowid
+                # existing tasks may already list the new id, so it can close a
+                # loop; raising rolls the insert back
+                cycle = new_task_cycle(conn, [tid]) if new_deps else None
+                if cycle:
+                    raise BatchError(409, {"error": "dependency cycle", "cycle": cycle})
+        except BatchError as e:
+            return self._send_json(e.body, e.status)
+        return self._send_json({"id": tid})
 
-        if p == "/api/risks":
-            conn = get_conn(); cur = conn.cursor()
-            now = now_iso()
-            cur.execute("""
+    @route("POST", "/api/risks")
+    def post_risk(self, qs, data):
+        now = now_iso()
+        with write_conn() as conn:
+            cur = conn.execute("""
             INSERT INTO risks (title, description, impact, probability, mitigation, owner, status, review_date, resolved_date, project, created_at, updated_at)
             VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
             """, [
@@ -320,169 +3450,246 @@ class App(BaseHTTPRequestHandler):
                 data.get("review_date"), data.get("resolved_date"), data.get("project"), now, now
             ])
             rid = cur.lastrowid
-            conn.commit(); conn.close()
-            return self._send_json({"id": rid})
+        return self._send_json({"id": rid})
 
-        if p == "/api/pis":
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("INSERT INTO program_increments (name,start_date,end_date) VALUES (?,?,?)",
-                        (data.get("name"), data.get("start_date"), data.get("end_date")))
+    @route("POST", "/api/pis")
+    def post_pi(self, qs, data):
+        with write_conn() as conn:
+            cur = conn.execute("INSERT INTO program_increments (name,start_date,end_date) VALUES (?,?,?)",
+                               (data.get("name"), data.get("start_date"), data.get("end_date")))
             pid = cur.lastrowid
-            conn.commit(); conn.close()
-            return self._send_json({"id": pid})
+        self._send_json({"id": pid})
 
-        if p == "/api/sprints":
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("INSERT INTO sprints (pi_id,name,start_date,end_date) VALUES (?,?,?,?)",
-                        (data.get("pi_id"), data.get("name"), data.get("start_date"), data.get("end_date")))
+    @route("POST", "/api/sprints")
+    def post_sprint(self, qs, data):
+        with write_conn() as conn:
+            cur = conn.execute("INSERT INTO sprints (pi_id,name,start_date,end_date) VALUES (?,?,?,?)",
+                               (data.get("pi_id"), data.get("name"), data.get("start_date"), data.get("end_date")))
             sid = cur.lastrowid
-            conn.commit(); conn.close()
-            return self._send_json({"id": sid})
+        self._send_json({"id": sid})
 
-        if p == "/api/timeoff":
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("INSERT INTO time_off (date,category,note) VALUES (?,?,?)",
-                        (data.get("date"), data.get("category"), data.get("note")))
+    @route("POST", "/api/timeoff")
+    def post_timeoff(self, qs, data):
+        with write_conn() as conn:
+            cur = conn.execute("INSERT INTO time_off (date,category,note,assignee) VALUES (?,?,?,?)",
+                               (data.get("date"), data.get("category"), data.get("note"), data.get("assignee")))
             tid = cur.lastrowid
-            conn.commit(); conn.close()
-            return self._send_json({"id": tid})
-
-        if p == "/api/automations/run":
-            name = (data.get("name") or "").strip()
-            target = os.path.join(AUTOMATIONS_DIR, f"{name}.py")
-            if not os.path.isfile(target):
-                return self._send_json({"error":"Not found"}, 404)
-            try:
-                proc = subprocess.run([sys.executable, target, DB_PATH], capture_output=True, text=True, timeout=120)
-                return self._send_json({"returncode": proc.returncode, "stdout": proc.stdout, "stderr": proc.stderr})
-            except Exception as e:
-                return self._send_json({"error": str(e)}, 500)
+        self._send_json({"id": tid})
 
-        return self._send_text("Not found", 404)
+    @route("POST", "/api/batch")
+    def post_batch(self, qs, data):
+        try:
+            results = apply_batch(data if isinstance(data, list) else data.get("ops"))
+        except BatchError as e:
+            return self._send_json(e.body, e.status)
+        self._send_json({"ok": True, "results": results})
 
-    def do_PUT(self):
-        parsed = urlparse(self.path)
-        p = parsed.path
-        data = self._parse_json()
-
-        if p == "/api/tasks":
-            tid = data.get("id")
-            if not tid:
-                return self._send_json({"error":"id required"}, 400)
-            fields = [k for k in data.keys() if k != "id"]
-            if not fields:
-                return self._send_json({"error":"at least one field"}, 400)
-
-            sets = []; params = []
-            for f in fields:
-                v = data[f]
-                if f == "dependencies":
-                    v = json.dumps(v)
-                sets.append(f"{f}=?")
-                params.append(v)
-            params.append(tid)
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute(f"UPDATE tasks SET {', '.join(sets)}, updated_at=? WHERE id=?", params[:-1] + [now_iso(), params[-1]])
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/risks":
-            rid = data.get("id")
-            if not rid:
-                return self._send_json({"error":"id required"}, 400)
-            fields = [k for k in data.keys() if k != "id"]
-            sets = []; params = []
-            for f in fields:
+    @route("POST", "/api/automations/run")
+    def post_automation(self, qs, data):
+        name = (data.get("name") or "").strip()
+        target = os.path.join(AUTOMATIONS_DIR, f"{name}.py")
+        if not name or os.path.basename(name) != name or name.startswith("_") or not os.path.isfile(target):
+            return self._send_json({"error":"Not found"}, 404)
+        job = JOBS.submit(name, target, workspace())
+        if job is None:
+            return self._send_json({"error": "job queue full"}, 429)
+        self._send_json({"job_id": job.id, "status": job.status}, 202)
+
+    @route("POST", "/api/jobs/cancel")
+    def post_job_cancel(self, qs, data):
+        try:
+            job_id = int(data.get("id"))
+        except (TypeError, ValueError):
+            return self._send_json({"error":"id required"}, 400)
+        self._send_json({"ok": JOBS.cancel(job_id)})
+
+    @route("PUT", "/api/tasks")
+    def put_task(self, qs, data):
+        tid = data.get("id")
+        if not tid:
+            return self._send_json({"error":"id required"}, 400)
+        try:
+            tid = int(tid)
+        except (TypeError, ValueError):
+            return self._send_json({"error":"id must be an integer"}, 400)
+        fields = [k for k in data.keys() if k != "id"]
+        if not fields:
+            return self._send_json({"error":"at least one field"}, 400)
+
+        sets = []; params = []
+        for f in fields:
+            v = data[f]
+            if f == "dependencies":
+                v = json.dumps(v)
+            sets.append(f"{f}=?")
+            params.append(v)
+        params.append(tid)
+        cycle, loop = None, False
+        with write_conn() as conn:
+            if "dependencies" in data:
+                try:
+                    new_deps = parse_ids(data["dependencies"] or [])
+                except (TypeError, ValueError):
+                    new_deps = []
+                # checked under the writer lock so concurrent edits cannot race into a
+                # loop; edges only, rescheduling waits for the next reader
+                DEP_GRAPH.sync_edges(conn)
+                cycle = DEP_GRAPH.find_cycle(tid, new_deps)
+            if not cycle:
+                try:
+                    conn.execute(f"UPDATE tasks SET {', '.join(sets)}, updated_at=? WHERE id=?", params[:-1] + [now_iso(), params[-1]])
+                except sqlite3.IntegrityError as e:
+                    if str(e) != PARENT_CYCLE:
+                        raise
+                    loop = True
+        if loop:
+            return self._send_json({"error": PARENT_CYCLE}, 409)
+        if cycle:
+            return self._send_json({"error": "dependency cycle", "cycle": cycle}, 409)
+        return self._send_json({"ok": True})
+
+    @route("PUT", "/api/risks")
+    def put_risk(self, qs, data):
+        rid = data.get("id")
+        if not rid:
+            return self._send_json({"error":"id required"}, 400)
+        fields = [k for k in data.keys() if k != "id"]
+        sets = []; params = []
+        for f in fields:
+            sets.append(f"{f}=?")
+            params.append(data[f])
+        params.append(rid)
+        with write_conn() as conn:
+            conn.execute(f"UPDATE risks SET {', '.join(sets)}, updated_at=? WHERE id=?", params[:-1] + [now_iso(), params[-1]])
+        return self._send_json({"ok": True})
+
+    @route("PUT", "/api/pis")
+    def put_pi(self, qs, data):
+        self._update_fields("program_increments", ("name","start_date","end_date"), data)
+
+    @route("PUT", "/api/sprints")
+    def put_sprint(self, qs, data):
+        self._update_fields("sprints", ("pi_id","name","start_date","end_date"), data)
+
+    def _update_fields(self, table, fields, data):
+        rid = data.get("id")
+        if not rid: return self._send_json({"error":"id required"}, 400)
+        sets = []; params = []
+        for f in fields:
+            if f in data:
                 sets.append(f"{f}=?")
                 params.append(data[f])
-            params.append(rid)
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute(f"UPDATE risks SET {', '.join(sets)}, updated_at=? WHERE id=?", params[:-1] + [now_iso(), params[-1]])
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/pis":
-            pid = data.get("id")
-            if not pid: return self._send_json({"error":"id required"}, 400)
-            sets = []; params = []
-            for f in ("name","start_date","end_date"):
-                if f in data:
-                    sets.append(f"{f}=?")
-                    params.append(data[f])
-            params.append(pid)
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute(f"UPDATE program_increments SET {', '.join(sets)} WHERE id=?", params)
-            conn.commit(); conn.close()
-            return self._send_json({"ok":True})
-
-        if p == "/api/sprints":
-            sid = data.get("id")
-            if not sid: return self._send_json({"error":"id required"}, 400)
-            sets = []; params = []
-            for f in ("pi_id","name","start_date","end_date"):
-                if f in data:
-                    sets.append(f"{f}=?")
-                    params.append(data[f])
-            params.append(sid)
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute(f"UPDATE sprints SET {', '.join(sets)} WHERE id=?", params)
-            conn.commit(); conn.close()
-            return self._send_json({"ok":True})
-
-        return self._send_text("Not found", 404)
+        if not sets:
+            return self._send_json({"error":"at least one field"}, 400)
+        params.append(rid)
+        with write_conn() as conn:
+            conn.execute(f"UPDATE {table} SET {', '.join(sets)} WHERE id=?", params)
+        self._send_json({"ok":True})
+
+    @route("DELETE", "/api/tasks")
+    def delete_task(self, qs, data):
+        with write_conn() as conn:
+            conn.execute("DELETE FROM tasks WHERE id=?", (data.get("id"),))
+        self._send_json({"ok": True})
+
+    @route("DELETE", "/api/risks")
+    def delete_risk(self, qs, data):
+        self._delete_row("risks", data)
+
+    @route("DELETE", "/api/pis")
+    def delete_pi(self, qs, data):
+        self._delete_row("program_increments", data)
+
+    @route("DELETE", "/api/sprints")
+    def delete_sprint(self, qs, data):
+        self._delete_row("sprints", data)
+
+    @route("DELETE", "/api/timeoff")
+    def delete_timeoff(self, qs, data):
+        self._delete_row("time_off", data)
+
+    def _delete_row(self, table, data):
+        with write_conn() as conn:
+            conn.execute(f"DELETE FROM {table} WHERE id=?", (data.get("id"),))
+        self._send_json({"ok": True})
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+
+def run_command(args):
+    if args.command == "export":
+        out = open(args.out, "wb") if args.out else sys.stdout.buffer
+        with read_conn() as conn:
+            for chunk in export_chunks(conn, BULK_TABLES[args.table], args.format):
+                out.write(chunk)
+        out.flush()
+    elif args.command == "import":
+        fmt = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+        src = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+        try:
+            count = import_records(parse_records(src, fmt), BULK_TABLES[args.table], args.replace)
+        except ValueError as e:
+            sys.exit(f"import failed: {e}")
+        print(f"imported {count} rows into {BULK_TABLES[args.table]}", file=sys.stderr)
+    elif args.command == "maintain":
+        with write_conn() as conn:
+            maintain(conn, full=True)
+
+def main(argv=None):
+    global DB_PATH
+    parser = argparse.ArgumentParser(description="Personal PMP Tool")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database file of the default workspace")
+    parser.add_argument("--workspace-dir", default=WORKSPACE_DIR, help="directory holding the other workspaces' databases")
+    parser.add_argument("--workspace", default=DEFAULT_WORKSPACE, help="workspace for export/import/maintain (import creates it)")
+    parser.add_argument("--port", type=int, default=5050, help="port to serve on (0 picks a free one)")
+    parser.add_argument("--profile", action="store_true", help="sample stacks of in-flight requests and keep the slowest (GET /api/metrics/profiles)")
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("serve", help="run the web app (default)")
+    ex = sub.add_parser("export", help="stream a table as NDJSON or CSV")
+    ex.add_argument("table", choices=sorted(BULK_TABLES))
+    ex.add_argument("--format", choices=sorted(BULK_FORMATS), default="ndjson")
+    ex.add_argument("--out", help="output file (default: stdout)")
+    im = sub.add_parser("import", help="load NDJSON or CSV rows into a table")
+    im.add_argument("table", choices=sorted(BULK_TABLES))
+    im.add_argument("file", help="input file, or - for stdin")
+    im.add_argument("--format", choices=sorted(BULK_FORMATS), help="default: from the file extension")
+    im.add_argument("--replace", action="store_true", help="empty the table first and keep incoming ids")
+    sub.add_parser("maintain", help="refresh planner statistics, merge the search indexes and checkpoint the WAL")
+    args = parser.parse_args(argv)
+    DB_PATH = args.db
+    WORKSPACES.root = args.workspace_dir
 
-    def do_DELETE(self):
-        parsed = urlparse(self.path)
-        p = parsed.path
-        data = self._parse_json()
-
-        if p == "/api/tasks":
-            tid = data.get("id")
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("DELETE FROM tasks WHERE id=?", (tid,))
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/risks":
-            rid = data.get("id")
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("DELETE FROM risks WHERE id=?", (rid,))
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/pis":
-            pid = data.get("id")
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("DELETE FROM program_increments WHERE id=?", (pid,))
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/sprints":
-            sid = data.get("id")
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("DELETE FROM sprints WHERE id=?", (sid,))
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        if p == "/api/timeoff":
-            tid = data.get("id")
-            conn = get_conn(); cur = conn.cursor()
-            cur.execute("DELETE FROM time_off WHERE id=?", (tid,))
-            conn.commit(); conn.close()
-            return self._send_json({"ok": True})
-
-        return self._send_text("Not found", 404)
-
-
-def main():
     os.makedirs(STATIC_DIR, exist_ok=True)
     os.makedirs(TPL_DIR, exist_ok=True)
     os.makedirs(AUTOMATIONS_DIR, exist_ok=True)
     init_db()
-    port = 5050
-    httpd = HTTPServer(("127.0.0.1", port), App)
-    print(f"Serving on http://127.0.0.1:{port}")
-    httpd.serve_forever()
+
+    if args.command in ("export", "import", "maintain"):
+        try:
+            with WORKSPACES.use(args.workspace, create=args.command == "import"):
+                run_command(args)
+        except UnknownWorkspace:
+            sys.exit(f"unknown workspace {args.workspace!r}")
+        finally:
+            WORKSPACES.close()
+        return
+
+    if args.profile:
+        METRICS.enable_profiler()
+    httpd = Server(("127.0.0.1", args.port), App)
+    print(f"Serving on http://127.0.0.1:{httpd.server_address[1]}", flush=True)
+    stop = threading.Event()
+    if OPTIMIZE_INTERVAL > 0:
+        threading.Thread(target=maintenance_loop, args=(stop,), name="maintenance", daemon=True).start()
+    try:
+        httpd.serve_forever()
+    finally:
+        stop.set()
+        JOBS.shutdown()
+        WORKSPACES.close()
 
 if __name__ == "__main__":
     main()
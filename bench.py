@@ -0,0 +1,515 @@
+"""Synthetic data generator and HTTP benchmark for the PMP tool.
+
+    python bench.py generate --tasks 100000            # fills bench.db
+    python bench.py run --tasks 100000 --out report.json
+    python bench.py compare old.json new.json
+    python bench.py verify --tasks 5000 --edits 2000
+
+`run` starts `app.py serve` in a child process on a free port, times every
+route one request at a time, then runs mixed read/write workloads with
+several concurrent clients, and writes a JSON report. `verify` makes random
+edits to a scratch database and checks after each round that the app's
+incremental dependency graph matches one loaded from scratch.
+"""
+import os, sys, json, time, random, sqlite3, datetime, subprocess, threading, argparse, platform
+import http.client
+from urllib.parse import quote
+
+import app
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCH_DB = os.path.join(APP_DIR, "bench.db")
+BATCH = 5000
+
+STATUSES = ("backlog", "to-do", "in progress", "blocked", "done", "cancelled")
+STATUS_WEIGHTS = (25, 20, 15, 5, 30, 5)
+TYPES = ("task", "bug", "story", "dep")
+TYPE_WEIGHTS = (70, 15, 10, 5)
+PRIORITIES = ("low", "medium", "high")
+IMPACTS = ("low", "medium", "high", "severe")
+RISK_STATUSES = ("open", "monitoring", "closed")
+ASSIGNEES = tuple(f"user{i:02d}" for i in range(25))
+HOLIDAYS = (("01-01", "New Year"), ("05-26", "Memorial Day"), ("07-04", "Independence Day"),
+            ("09-01", "Labor Day"), ("11-27", "Thanksgiving Day"), ("11-28", "Thanksgiving Friday"),
+            ("12-24", "Christmas Eve"), ("12-25", "Christmas Day"))
+PI_DAYS = 56
+SPRINT_DAYS = 14
+
+# ------------------------------------------------------------------ generate
+
+def _day(base, n):
+    return (base + datetime.timedelta(days=n)).isoformat()
+
+def _flush(conn, sql, rows):
+    if rows:
+        conn.executemany(sql, rows)
+        conn.commit()
+        rows.clear()
+
+# Replaces the contents of db with a synthetic program of `tasks` items spread
+# over consecutive 8-week PIs of four 2-week sprints. Dependencies only point
+# at earlier ids, so the graph is acyclic; stories parent later items in the PI.
+def generate(db, tasks, pis=None, risks=None, start="2024-01-06", seed=1, log=print):
+    rnd = random.Random(seed)
+    pis = pis or max(1, tasks // 2500)
+    risks = tasks // 20 if risks is None else risks
+    base = datetime.date.fromisoformat(start)
+    app.DB_PATH = db
+    app.init_db()
+    conn = app.get_conn(db)
+    for t in ("program_increments", "sprints", "tasks", "risks", "time_off", "changes"):
+        conn.execute(f"DELETE FROM {t}")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (t,))
+    conn.commit()
+    now = app.now_iso()
+    t0 = time.time()
+
+    sprints = []
+    for p in range(pis):
+        s = p * PI_DAYS
+        conn.execute("INSERT INTO program_increments (id, name, start_date, end_date) VALUES (?,?,?,?)",
+                     (p + 1, f"PI-{p + 1}", _day(base, s), _day(base, s + PI_DAYS - 1)))
+        for k in range(PI_DAYS // SPRINT_DAYS):
+            ss = s + k * SPRINT_DAYS
+            sprints.append((len(sprints) + 1, p + 1, f"PI-{p + 1} Sprint {k + 1}", _day(base, ss), _day(base, ss + SPRINT_DAYS - 1)))
+    conn.executemany("INSERT INTO sprints (id, pi_id, name, start_date, end_date) VALUES (?,?,?,?,?)", sprints)
+    conn.commit()
+
+    sql = """
+    INSERT INTO tasks (id,title,description,status,type,priority,story_points,parent_id,due_date,start_date,end_date,
+                       planned_start_date,planned_end_date,actual_end_date,pi_id,sprint_id,assignee,dependencies,created_at,updated_at)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+    """
+    rows, story, story_pi = [], None, None
+    per_sprint = PI_DAYS // SPRINT_DAYS
+    for i in range(1, tasks + 1):
+        pi = (i - 1) * pis // tasks + 1
+        sprint = (pi - 1) * per_sprint + rnd.randrange(per_sprint) + 1
+        s = (pi - 1) * PI_DAYS + (sprint - 1) % per_sprint * SPRINT_DAYS + rnd.randrange(SPRINT_DAYS)
+        e = s + rnd.randint(0, 9)
+        status = rnd.choices(STATUSES, STATUS_WEIGHTS)[0]
+        kind = rnd.choices(TYPES, TYPE_WEIGHTS)[0]
+        if story_pi != pi:
+            story, story_pi = None, pi
+        parent = story if kind != "story" and story and rnd.random() < 0.5 else None
+        deps = []
+        if i > 1 and rnd.random() < 0.4:
+            deps = sorted(rnd.sample(range(max(1, i - 200), i), min(i - 1, rnd.randint(1, 3))))
+        rows.append((i, f"{kind.title()} {i}", f"Synthetic {kind} #{i}", status, kind, rnd.choice(PRIORITIES),
+                     rnd.choice((1, 2, 3, 5, 8)), parent, _day(base, e), _day(base, s), _day(base, e),
+                     _day(base, s), _day(base, e), _day(base, e) if status == "done" else None,
+                     pi, sprint, rnd.choice(ASSIGNEES), json.dumps(deps), now, now))
+        if kind == "story":
+            story = i
+        if len(rows) >= BATCH:
+            _flush(conn, sql, rows)
+            if i % (BATCH * 20) == 0:
+                log(f"  {i} tasks ({time.time() - t0:.0f}s)")
+    _flush(conn, sql, rows)
+
+    span = pis * PI_DAYS
+    conn.executemany("""
+    INSERT INTO risks (title,description,impact,probability,mitigation,owner,status,review_date,project,created_at,updated_at)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?)
+    """, [(f"Risk {i}", f"Synthetic risk #{i}", rnd.choice(IMPACTS), rnd.choice(PRIORITIES), "Monitor", rnd.choice(ASSIGNEES),
+           rnd.choice(RISK_STATUSES), _day(base, rnd.randrange(span)), "Synthetic", now, now) for i in range(1, risks + 1)])
+    offs = []
+    for year in range(base.year, (base + datetime.timedelta(days=span)).year + 1):
+        offs += [(f"{year}-{md}", "holiday", note) for md, note in HOLIDAYS]
+    offs = [(d, c, n, None) for d, c, n in offs]
+    offs += [(_day(base, rnd.randrange(span)), rnd.choice(("vacation", "pto")), None, rnd.choice(ASSIGNEES)) for _ in range(span // 30)]
+    conn.executemany("INSERT INTO time_off (date, category, note, assignee) VALUES (?,?,?,?)", offs)
+    conn.commit()
+    conn.close()
+    log(f"generated {tasks} tasks, {pis} PIs, {len(sprints)} sprints, {risks} risks, {len(offs)} days off in {time.time() - t0:.1f}s")
+
+# ------------------------------------------------------------------ measure
+
+def percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(pct / 100 * (len(sorted_vals) - 1))))]
+
+def summarize(samples, elapsed):
+    lat = sorted(ms for ms, _, ok in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, _, ok in samples if not ok),
+        "rps": round(len(samples) / elapsed, 1) if elapsed else None,
+        "bytes": sum(n for _, n, _ in samples),
+        "mean_ms": round(sum(lat) / len(lat), 3) if lat else None,
+        **{f"p{p}_ms": (round(percentile(lat, p), 3) if lat else None) for p in (50, 90, 95, 99)},
+        "max_ms": round(lat[-1], 3) if lat else None,
+    }
+
+class Client:
+    def __init__(self, port, gzip=True):
+        self.port, self.gzip = port, gzip
+        self.local = threading.local()
+
+    # -> (status, headers, body bytes, elapsed ms); one kept-alive connection per thread,
+    # reopened when the server has closed it
+    def request(self, method, path, body=None, headers=None):
+        hdrs = {"Accept-Encoding": "gzip"} if self.gzip else {}
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+            hdrs["Content-Type"] = "application/json"
+        hdrs.update(headers or {})
+        t = time.perf_counter()
+        for attempt in (0, 1):
+            conn = getattr(self.local, "conn", None)
+            if conn is None:
+                conn = self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=300)
+            try:
+                conn.request(method, path, body=body, headers=hdrs)
+                res = conn.getresponse()
+                data = res.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError):
+                conn.close(); self.local.conn = None
+                if attempt:
+                    raise
+                t = time.perf_counter()
+        return res.status, res, data, (time.perf_counter() - t) * 1000
+
+class Context:
+    def __init__(self, db, seed):
+        self.rnd = random.Random(seed)
+        self.lock = threading.Lock()
+        conn = sqlite3.connect(db)
+        q = lambda sql: conn.execute(sql).fetchone()[0] or 0
+        self.max_task = q("SELECT max(id) FROM tasks")
+        self.pis = [r[0] for r in conn.execute("SELECT id FROM program_increments")]
+        self.sprints = [r[0] for r in conn.execute("SELECT id FROM sprints")]
+        self.max_risk = q("SELECT max(id) FROM risks")
+        self.span = conn.execute("SELECT min(start_date), max(end_date) FROM program_increments").fetchone()
+        self.counts = {t: q(f"SELECT count(*) FROM {t}") for t in app.BULK_TABLES.values()}
+        conn.close()
+        self.created = {"tasks": [], "risks": [], "pis": [], "sprints": [], "timeoff": []}
+        self.etag = None
+
+    def pick(self, seq):
+        with self.lock:
+            return self.rnd.choice(seq) if seq else None
+
+    def task_id(self):
+        with self.lock:
+            return self.rnd.randint(1, max(1, self.max_task))
+
+    def take(self, kind):
+        with self.lock:
+            return self.created[kind].pop() if self.created[kind] else None
+
+    def window(self, days):
+        with self.lock:
+            lo = datetime.date.fromisoformat(self.span[0] or "2024-01-01")
+            hi = datetime.date.fromisoformat(self.span[1] or "2024-12-31")
+            start = lo + datetime.timedelta(days=self.rnd.randrange(max(1, (hi - lo).days - days)))
+        return start.isoformat(), (start + datetime.timedelta(days=days)).isoformat()
+
+def _new_task(ctx):
+    deps = [ctx.task_id() for _ in range(2)] if ctx.max_task else []
+    return {"title": "bench task", "status": "backlog", "type": "task", "priority": "medium", "dependencies": deps,
+            "planned_start_date": "2025-01-06", "planned_end_date": "2025-01-10", "start_date": "2025-01-06", "end_date": "2025-01-10"}
+
+def _import_body(ctx):
+    return "".join(json.dumps({"title": f"imported {i}", "status": "backlog", "type": "task", "dependencies": "[]"}) + "\n"
+                   for i in range(100)).encode("utf-8")
+
+def _timeline(ctx, zoom, days):
+    frm, to = ctx.window(days)
+    return f"/api/timeline?zoom={zoom}&from={frm}&to={to}"
+
+# (name, method, path(ctx), body(ctx) or None, kind, statuses). kind "heavy"
+# routes walk a whole table and get --heavy-requests iterations; "create"
+# routes remember the new id so the PUT/DELETE routes have rows to work on.
+ROUTES = (
+    ("GET /", "GET", lambda c: "/", None, "read", (200,)),
+    ("GET /static/main.js", "GET", lambda c: "/static/main.js", None, "read", (200,)),
+    ("GET /api/tasks (all)", "GET", lambda c: "/api/tasks", None, "heavy", (200,)),
+    ("GET /api/tasks page", "GET", lambda c: "/api/tasks?limit=100", None, "read", (200,)),
+    ("GET /api/tasks filtered", "GET", lambda c: f"/api/tasks?status={quote(c.pick(STATUSES))}&sprint_id={c.pick(c.sprints)}&fields=id,title,status", None, "read", (200,)),
+    ("GET /api/tasks 304", "GET", lambda c: "/api/tasks?limit=100", None, "revalidate", (304,)),
+    ("GET /api/risks", "GET", lambda c: "/api/risks", None, "read", (200,)),
+    ("GET /api/pis", "GET", lambda c: "/api/pis", None, "read", (200,)),
+    ("GET /api/sprints", "GET", lambda c: "/api/sprints", None, "read", (200,)),
+    ("GET /api/timeoff", "GET", lambda c: "/api/timeoff", None, "read", (200,)),
+    ("GET /api/dashboard", "GET", lambda c: "/api/dashboard", None, "read", (200,)),
+    ("GET /api/bootstrap", "GET", lambda c: "/api/bootstrap", None, "heavy", (200,)),
+    ("GET /api/graph (all)", "GET", lambda c: "/api/graph", None, "heavy", (200,)),
+    ("GET /api/hierarchy (roots)", "GET", lambda c: "/api/hierarchy", None, "heavy", (200,)),
+    ("GET /api/hierarchy?id", "GET", lambda c: f"/api/hierarchy?id={c.task_id()}", None, "read", (200, 404)),
+    ("GET /api/graph?id", "GET", lambda c: f"/api/graph?id={c.task_id()}", None, "read", (200,)),
+    ("GET /api/graph/schedule", "GET", lambda c: f"/api/graph/schedule?id={c.task_id()}&id={c.task_id()}", None, "read", (200,)),
+    ("GET /api/timeline week", "GET", lambda c: _timeline(c, "week", 120), None, "read", (200,)),
+    ("GET /api/timeline month", "GET", lambda c: _timeline(c, "month", 730), None, "read", (200,)),
+    ("GET /api/capacity sprint", "GET", lambda c: f"/api/capacity?sprint_id={c.pick(c.sprints)}", None, "read", (200,)),
+    ("GET /api/capacity pi", "GET", lambda c: f"/api/capacity?pi_id={c.pick(c.pis)}", None, "read", (200,)),
+    ("GET /api/burndown sprint", "GET", lambda c: f"/api/burndown?sprint_id={c.pick(c.sprints)}", None, "read", (200,)),
+    ("GET /api/burndown pi", "GET", lambda c: f"/api/burndown?pi_id={c.pick(c.pis)}", None, "read", (200,)),
+    ("GET /api/search prefix", "GET", lambda c: f"/api/search?q={str(c.task_id())[:3]}", None, "read", (200,)),
+    ("GET /api/search words", "GET", lambda c: "/api/search?q=synthetic%20bug&table=tasks", None, "read", (200,)),
+    ("GET /api/changes", "GET", lambda c: "/api/changes", None, "read", (200,)),
+    ("GET /api/export tasks", "GET", lambda c: "/api/export?table=tasks&format=ndjson", None, "heavy", (200,)),
+    ("GET /api/jobs", "GET", lambda c: "/api/jobs", None, "read", (200,)),
+    ("GET /api/automations", "GET", lambda c: "/api/automations", None, "read", (200,)),
+    ("GET /api/workspaces", "GET", lambda c: "/api/workspaces", None, "read", (200,)),
+    ("GET /api/metrics", "GET", lambda c: "/api/metrics", None, "read", (200,)),
+    ("GET /api/metrics json", "GET", lambda c: "/api/metrics?format=json", None, "read", (200,)),
+    ("POST /api/tasks", "POST", lambda c: "/api/tasks", _new_task, "create:tasks", (200,)),
+    ("POST /api/risks", "POST", lambda c: "/api/risks", lambda c: {"title": "bench risk", "impact": "low", "probability": "low", "review_date": "2025-02-01"}, "create:risks", (200,)),
+    ("POST /api/pis", "POST", lambda c: "/api/pis", lambda c: {"name": "bench PI", "start_date": "2030-01-01", "end_date": "2030-02-25"}, "create:pis", (200,)),
+    ("POST /api/sprints", "POST", lambda c: "/api/sprints", lambda c: {"pi_id": c.pick(c.pis), "name": "bench sprint", "start_date": "2030-01-01", "end_date": "2030-01-14"}, "create:sprints", (200,)),
+    ("POST /api/timeoff", "POST", lambda c: "/api/timeoff", lambda c: {"date": "2030-01-02", "category": "pto", "note": "bench", "assignee": c.pick(ASSIGNEES)}, "create:timeoff", (200,)),
+    ("POST /api/import", "POST", lambda c: "/api/import?table=tasks&format=ndjson", _import_body, "write", (200,)),
+    ("POST /api/jobs/cancel", "POST", lambda c: "/api/jobs/cancel", lambda c: {"id": 0}, "write", (200,)),
+    ("POST /api/batch", "POST", lambda c: "/api/batch", lambda c: [{"op": "update", "table": "tasks", "id": c.task_id(), "data": {"status": c.pick(STATUSES)}} for _ in range(50)], "write", (200,)),
+    ("PUT /api/tasks", "PUT", lambda c: "/api/tasks", lambda c: {"id": c.task_id(), "status": c.pick(STATUSES)}, "write", (200,)),
+    ("PUT /api/risks", "PUT", lambda c: "/api/risks", lambda c: {"id": c.pick(range(1, c.max_risk + 1)) or 1, "status": "monitoring"}, "write", (200,)),
+    ("PUT /api/pis", "PUT", lambda c: "/api/pis", lambda c: {"id": c.pick(c.pis), "name": "PI renamed"}, "write", (200,)),
+    ("PUT /api/sprints", "PUT", lambda c: "/api/sprints", lambda c: {"id": c.pick(c.sprints), "name": "Sprint renamed"}, "write", (200,)),
+    ("DELETE /api/tasks", "DELETE", lambda c: "/api/tasks", lambda c: {"id": c.take("tasks")}, "delete:tasks", (200,)),
+    ("DELETE /api/risks", "DELETE", lambda c: "/api/risks", lambda c: {"id": c.take("risks")}, "delete:risks", (200,)),
+    ("DELETE /api/pis", "DELETE", lambda c: "/api/pis", lambda c: {"id": c.take("pis")}, "delete:pis", (200,)),
+    ("DELETE /api/sprints", "DELETE", lambda c: "/api/sprints", lambda c: {"id": c.take("sprints")}, "delete:sprints", (200,)),
+    ("DELETE /api/timeoff", "DELETE", lambda c: "/api/timeoff", lambda c: {"id": c.take("timeoff")}, "delete:timeoff", (200,)),
+)
+SKIPPED = {
+    "POST /api/seed": "replaces the dataset being measured",
+    "POST /api/automations/run": "runs arbitrary user scripts",
+    "GET /api/changes/stream": "long-lived event stream",
+    "GET /api/jobs/stream": "long-lived output stream",
+    "GET /api/metrics/profiles": "only served with --profile",
+}
+# name -> weight for the concurrent workloads
+MIXES = {
+    "read-heavy": {"GET /api/tasks page": 30, "GET /api/tasks filtered": 15, "GET /api/dashboard": 15, "GET /api/timeline week": 15,
+                   "GET /api/graph?id": 10, "GET /api/changes": 5, "PUT /api/tasks": 7, "POST /api/tasks": 3},
+    "write-heavy": {"GET /api/tasks page": 20, "GET /api/dashboard": 10, "GET /api/timeline week": 10, "GET /api/graph?id": 10,
+                    "PUT /api/tasks": 30, "POST /api/tasks": 10, "PUT /api/risks": 10},
+}
+
+def run_route(client, ctx, route):
+    name, method, path, body, kind, statuses = route
+    payload = body(ctx) if body else None
+    headers = {"If-None-Match": ctx.etag} if kind == "revalidate" and ctx.etag else None
+    status, res, data, ms = client.request(method, path(ctx), payload, headers)
+    if kind.startswith("create:") and status == 200:
+        with ctx.lock:
+            ctx.created[kind.split(":")[1]].append(json.loads(data)["id"])
+    return ms, len(data), status in statuses
+
+def bench_routes(client, ctx, args, log):
+    # prime the ETag used by the revalidation route
+    _, res, _, _ = client.request("GET", "/api/tasks?limit=100")
+    ctx.etag = res.getheader("ETag")
+    results = []
+    for route in ROUTES:
+        n = args.heavy_requests if route[4] == "heavy" else args.requests
+        if route[4].startswith("delete:"):
+            n = min(n, len(ctx.created[route[4].split(":")[1]]))
+        for _ in range(min(args.warmup, n)):
+            run_route(client, ctx, route)
+        t = time.perf_counter()
+        samples = [run_route(client, ctx, route) for _ in range(n)]
+        stats = summarize(samples, time.perf_counter() - t)
+        results.append({"route": route[0], **stats})
+        log(f"  {route[0]:<28} n={n:<5} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms errors={stats['errors']}")
+    return results
+
+def bench_mix(client, ctx, mix, concurrency, duration):
+    routes = {r[0]: r for r in ROUTES}
+    names = list(MIXES[mix])
+    weights = [MIXES[mix][n] for n in names]
+    samples, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rnd, mine = random.Random(seed), []
+        while time.perf_counter() < deadline:
+            try:
+                mine.append(run_route(client, ctx, routes[rnd.choices(names, weights)[0]]))
+            except OSError:
+                mine.append((0.0, 0, False))
+        with lock:
+            samples.extend(mine)
+
+    t = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    return {"mix": mix, "concurrency": concurrency, "duration_s": duration, **summarize(samples, time.perf_counter() - t)}
+
+def start_server(db, app_path):
+    proc = subprocess.Popen([sys.executable, "-u", app_path, "--db", db, "--port", "0", "serve"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = proc.stdout.readline()
+    if "http://" not in line:
+        proc.kill()
+        raise RuntimeError(f"server did not start: {line!r}")
+    return proc, int(line.rsplit(":", 1)[1])
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run(args, log=print):
+    if args.tasks is not None:
+        generate(args.db, args.tasks, seed=args.seed, log=log)
+    elif not os.path.exists(args.db):
+        sys.exit(f"{args.db} does not exist; pass --tasks N to generate it")
+    ctx = Context(args.db, args.seed)
+    proc, port = start_server(args.db, args.app)
+    client = Client(port, gzip=not args.no_gzip)
+    try:
+        log(f"benchmarking {args.app} on port {port} ({ctx.counts['tasks']} tasks)")
+        routes = bench_routes(client, ctx, args, log)
+        mixes = []
+        for mix in MIXES:
+            for c in args.concurrency:
+                m = bench_mix(client, ctx, mix, c, args.duration)
+                mixes.append(m)
+                log(f"  {mix:<12} c={c:<3} {m['rps']} req/s p50={m['p50_ms']}ms p95={m['p95_ms']}ms errors={m['errors']}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "dataset": {"db": os.path.abspath(args.db), **ctx.counts},
+        "config": {"requests": args.requests, "heavy_requests": args.heavy_requests, "warmup": args.warmup,
+                   "concurrency": args.concurrency, "duration_s": args.duration, "gzip": not args.no_gzip},
+        "routes": routes,
+        "mixes": mixes,
+        "skipped": SKIPPED,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    log(f"report written to {args.out}")
+    return report
+
+# ------------------------------------------------------------------ verify
+
+# One random write as another process would make it: dependency rewires (loops
+# included), date and status edits, inserts that close loops through ids other
+# tasks already wait on, deletes.
+def _random_edit(conn, rnd, ids):
+    t = rnd.choice(ids); op = rnd.random()
+    if op < 0.35:
+        conn.execute("UPDATE tasks SET dependencies = ? WHERE id = ?", (json.dumps(rnd.sample(ids, rnd.randint(0, 3))), t))
+    elif op < 0.5:
+        conn.execute("UPDATE tasks SET status = ? WHERE id = ?", (rnd.choice(STATUSES), t))
+    elif op < 0.7:
+        col = rnd.choice(("planned_start_date", "planned_end_date", "start_date", "end_date"))
+        day = _day(datetime.date(2024, 1, 6), rnd.randrange(365)) if rnd.random() < 0.9 else None
+        conn.execute(f"UPDATE tasks SET {col} = ? WHERE id = ?", (day, t))
+    elif op < 0.8:
+        ids.remove(t)
+        conn.execute("DELETE FROM tasks WHERE id = ?", (t,))
+    else:
+        new = max(ids) + 1
+        conn.execute("UPDATE tasks SET dependencies = ? WHERE id = ?", (json.dumps([new]), t))
+        conn.execute("INSERT INTO tasks (id, title, planned_start_date, dependencies) VALUES (?, 'verify', ?, ?)",
+                     (new, _day(datetime.date(2024, 1, 6), rnd.randrange(365)), json.dumps(rnd.sample(ids, rnd.randint(0, 2)))))
+        ids.append(new)
+
+def _graph_state(graph, sample):
+    return (graph.order(), graph.schedule(),
+            [(graph.blockers(i), graph.blocks(i), graph.open_blockers(i), graph.schedule([i])) for i in sample])
+
+# Applies `edits` random writes to db in rounds of `every`, syncing one
+# long-lived DepGraph after each round and comparing it with a fresh load.
+# Returns the number of rounds that differed.
+def verify(db, tasks, edits, every=20, seed=1, log=print):
+    generate(db, tasks, seed=seed, log=log)
+    rnd = random.Random(seed)
+    conn = app.get_conn(db)
+    ids = [r[0] for r in conn.execute("SELECT id FROM tasks")]
+    graph = app.DepGraph(); graph.sync(conn)
+    bad = rounds = 0
+    t0 = time.time()
+    for done in range(0, edits, every):
+        with conn:
+            for _ in range(min(every, edits - done)):
+                _random_edit(conn, rnd, ids)
+        graph.sync(conn)
+        fresh = app.DepGraph(); fresh.sync(conn)
+        sample = rnd.sample(ids, min(10, len(ids)))
+        rounds += 1
+        if _graph_state(graph, sample) != _graph_state(fresh, sample):
+            bad += 1
+            log(f"  mismatch after {done + every} edits")
+            graph = app.DepGraph(); graph.sync(conn)
+    conn.close()
+    log(f"{rounds} rounds, {bad} mismatched, {len(ids)} tasks in {time.time() - t0:.1f}s")
+    return bad
+
+# prints p50/p95 and throughput changes between two reports
+def compare(old_path, new_path, out=sys.stdout):
+    old, new = (json.load(open(p, encoding="utf-8")) for p in (old_path, new_path))
+    def pct(a, b):
+        return f"{(b - a) / a * 100:+.0f}%" if a and b is not None else "n/a"
+    prev = {r["route"]: r for r in old["routes"]}
+    print(f"{'route':<28} {'p50 ms':>18} {'p95 ms':>18}", file=out)
+    for r in new["routes"]:
+        o = prev.get(r["route"])
+        if o:
+            print(f"{r['route']:<28} {o['p50_ms']:>8} → {r['p50_ms']:<8} {pct(o['p50_ms'], r['p50_ms']):>5}"
+                  f" {o['p95_ms']:>8} → {r['p95_ms']:<8} {pct(o['p95_ms'], r['p95_ms']):>5}", file=out)
+    prev = {(m["mix"], m["concurrency"]): m for m in old["mixes"]}
+    for m in new["mixes"]:
+        o = prev.get((m["mix"], m["concurrency"]))
+        if o:
+            print(f"{m['mix']} c={m['concurrency']}: {o['rps']} → {m['rps']} req/s ({pct(o['rps'], m['rps'])})", file=out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PMP tool data generator and benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="fill a database with synthetic data")
+    gen.add_argument("--db", default=BENCH_DB, help="database to (re)fill (default: bench.db)")
+    gen.add_argument("--tasks", type=int, default=1000)
+    gen.add_argument("--pis", type=int, help="default: one per 2500 tasks")
+    gen.add_argument("--risks", type=int, help="default: one per 20 tasks")
+    gen.add_argument("--start", default="2024-01-06", help="first PI start date")
+    gen.add_argument("--seed", type=int, default=1)
+    rn = sub.add_parser("run", help="benchmark every route against a local server")
+    rn.add_argument("--db", default=BENCH_DB)
+    rn.add_argument("--tasks", type=int, help="regenerate the database with this many tasks first")
+    rn.add_argument("--app", default=os.path.join(APP_DIR, "app.py"), help="app.py to run, e.g. from another checkout")
+    rn.add_argument("--requests", type=int, default=200, help="requests per route")
+    rn.add_argument("--heavy-requests", type=int, default=5, help="requests per full-table route")
+    rn.add_argument("--warmup", type=int, default=5)
+    rn.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    rn.add_argument("--duration", type=float, default=10.0, help="seconds per mixed workload")
+    rn.add_argument("--no-gzip", action="store_true", help="do not send Accept-Encoding: gzip")
+    rn.add_argument("--seed", type=int, default=1)
+    rn.add_argument("--out", default="bench_report.json")
+    cmp = sub.add_parser("compare", help="diff two reports")
+    cmp.add_argument("old")
+    cmp.add_argument("new")
+    ver = sub.add_parser("verify", help="check the incremental dependency graph against a fresh load")
+    ver.add_argument("--db", default=os.path.join(APP_DIR, "verify.db"), help="scratch database, overwritten")
+    ver.add_argument("--tasks", type=int, default=2000)
+    ver.add_argument("--edits", type=int, default=1000)
+    ver.add_argument("--every", type=int, default=20, help="edits between comparisons")
+    ver.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate(args.db, args.tasks, args.pis, args.risks, args.start, args.seed)
+    elif args.command == "run":
+        run(args)
+    elif args.command == "verify":
+        sys.exit(1 if verify(args.db, args.tasks, args.edits, args.every, args.seed) else 0)
+    else:
+        compare(args.old, args.new)
+
+if __name__ == "__main__":
+    main()
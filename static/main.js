@@ -1,55 +1,106 @@
 const $ = (q)=>document.querySelector(q); const $$=(q)=>Array.from(document.querySelectorAll(q));
 function h(tag,attrs={},...children){const el=document.createElement(tag); for(const [k,v] of Object.entries(attrs)){ if(k.startsWith('on')&&typeof v==='function') el.addEventListener(k.slice(2),v); else if(v!==undefined&&v!==null) el.setAttribute(k,v);} for(const c of children){ if(Array.isArray(c)) c.forEach(x=>el.append(x)); else if(c instanceof Node) el.append(c); else if(c!==undefined&&c!==null) el.append(String(c)); } return el;}
-async function api(path,opts={}){ const res=await fetch(path,{headers:{'Content-Type':'application/json'},...opts}); if(!res.ok) throw new Error(`API ${path} -> ${res.status}`); return res.json(); }
+// pages under /w/<name>/ talk to that workspace's API
+const WS=location.pathname.match(/^\/w\/[^/]+/)?.[0]||'';
+async function api(path,opts={}){ const res=await fetch(WS+path,{headers:{'Content-Type':'application/json'},...opts}); if(!res.ok) throw new Error(`API ${path} -> ${res.status}`); return res.json(); }
 function show(view){ const tgt=document.querySelector(`#view-${view}`); if(!tgt) return; $$('.nav-btn').forEach(b=>b.classList.toggle('active',b.dataset.view===view)); $$('.view').forEach(v=>v.classList.remove('visible')); tgt.classList.add('visible'); }
 function safe(el){ return el||document.createElement('div'); }
+// ------ Store / change feed ------
+// local copy of every table; /api/changes deltas keep it current so edits never refetch whole views
+const store={version:null, tasks:new Map(), pis:new Map(), sprints:new Map(), risks:new Map(), timeoff:new Map()};
+const cmp=(a,b)=> a<b?-1:a>b?1:0;
+// same orderings the list endpoints use
+const STORE_SORT={ tasks:(a,b)=> cmp(b.priority||'',a.priority||'') || cmp(a.due_date||a.planned_end_date||'',b.due_date||b.planned_end_date||'') || a.id-b.id, pis:(a,b)=> cmp(a.start_date||'',b.start_date||'') || a.id-b.id, sprints:(a,b)=> cmp(a.start_date||'',b.start_date||'') || a.id-b.id, risks:(a,b)=> cmp(a.review_date||'',b.review_date||'') || a.id-b.id, timeoff:(a,b)=> cmp(a.date||'',b.date||'') || a.id-b.id };
+function rows(table){ return Array.from(store[table].values()).sort(STORE_SORT[table]); }
+const VIEWS={ tasks:['backlog','dashboard','gantt','pis'], pis:['pis','dashboard','gantt'], sprints:['pis','dashboard','gantt'], risks:['risks','dashboard'], timeoff:['pis'] };
+const RENDER={ backlog:()=>renderBacklog(), pis:()=>renderPI(), risks:()=>renderRisks(), gantt:()=>renderGantt(), dashboard:()=>loadDashboard() };
+const dirtyViews=new Set(); let renderTimer=null;
+function scheduleRender(tables){ tables.forEach(t=> (VIEWS[t]||[]).forEach(v=>dirtyViews.add(v))); clearTimeout(renderTimer); renderTimer=setTimeout(()=>{ const views=[...dirtyViews]; dirtyViews.clear(); views.forEach(v=>RENDER[v]()); },50); }
+// one snapshot of every table plus the dashboard, first Gantt window, current sprint capacity and automations
+async function loadStore(){ const boot=await api(`/api/bootstrap?zoom=${$('#ganttZoom')?.value||'week'}`); Object.keys(VIEWS).forEach(t=>{ store[t]=new Map(boot.tables[t].map(r=>[r.id,r])); }); store.version=boot.version; return boot; }
+function applyChanges(delta){ if(delta.reset) return loadAll(); const touched=new Set(); delta.changes.forEach(c=>{ const m=store[c.table]; if(!m || c.version<=store.version) return; if(c.op==='delete') m.delete(c.id); else m.set(c.id,c.row); touched.add(c.table); }); store.version=Math.max(store.version,delta.version); if(touched.size) scheduleRender(touched); }
+async function syncChanges(){ let d; do { d=await api(`/api/changes?since=${store.version}`); await applyChanges(d); } while(d.more && !d.reset); }
+let feed=null;
+function connectFeed(){ feed?.close(); if(!window.EventSource) return; feed=new EventSource(`${WS}/api/changes/stream?since=${store.version}`); feed.addEventListener('change',e=>applyChanges(JSON.parse(e.data))); }
+async function loadAll(){ const boot=await loadStore(); renderBacklog(); renderRisks(); renderPI(boot); renderDashboard(boot.dashboard); renderGantt(false,boot.timeline); renderAutomations(boot.automations); connectFeed(); }
 // NAV
 $$('.nav-btn').forEach(b=>b.addEventListener('click',()=>show(b.dataset.view)));
+// ------ Search ------
+const searchHits={}; const searchSeq={}; const searchTimers={};
+function searchTable(key,table,q,done){ clearTimeout(searchTimers[key]); const seq=(searchSeq[key]||0)+1; searchSeq[key]=seq; if(!q.trim()){ searchHits[key]=null; return done(); } searchTimers[key]=setTimeout(async()=>{ const res=await api(`/api/search?table=${table}&limit=200&q=${encodeURIComponent(q)}`); if(searchSeq[key]!==seq) return; searchHits[key]=res.results.map(r=>r.id); done(); },150); }
+function searchRows(key,table){ return searchHits[key] ? searchHits[key].map(id=>store[table].get(id)).filter(Boolean) : rows(table); }
+
 // ------ Dashboard ------
-async function loadDashboard(){ try{ const data=await api('/api/dashboard'); const tl=safe($('#taskLoad')); tl.innerHTML=''; for(const [k,v] of Object.entries(data.task_load)){ tl.append(h('span',{class:'badge'},`${k}: ${v}`),' ');} const due=safe($('#dueList')); due.innerHTML=''; data.due_this_week.forEach(t=> due.append(h('li',{},h('span',{},t.title),h('span',{class:'badge'},t.due_date||t.planned_end_date)))); const issues=safe($('#issueList')); issues.innerHTML=''; data.open_issues.forEach(t=> issues.append(h('li',{},h('span',{},t.title),h('span',{class:'badge'},t.priority)))); const risks=safe($('#riskList')); risks.innerHTML=''; data.risks_due.forEach(r=> risks.append(h('li',{},h('span',{},r.title),h('span',{class:'badge'},r.review_date)))); renderWeeklyGantt(data.due_this_week, data.week_start, data.week_end); await renderDashboardPies(); }catch(e){ console.error('dashboard',e);} }
-async function renderDashboardPies(){ const [tasks,pis,sprints]=await Promise.all([api('/api/tasks'), api('/api/pis'), api('/api/sprints')]); const today=new Date().toISOString().slice(0,10); const currentPI=pis.find(p=> p.start_date<=today && today<=p.end_date); const currentSprint=sprints.find(s=> s.start_date<=today && today<=s.end_date); const statuses=['backlog','to-do','in progress','blocked','done','cancelled']; const makeCounts=()=>Object.fromEntries(statuses.map(s=>[s,0])); const piCounts=makeCounts(); const spCounts=makeCounts(); tasks.forEach(t=>{ if(currentPI && t.pi_id===currentPI.id && piCounts[t.status]!==undefined) piCounts[t.status]++; if(currentSprint && t.sprint_id===currentSprint.id && spCounts[t.status]!==undefined) spCounts[t.status]++; }); drawPie($('#piPie'), piCounts, 'PI'); drawPie($('#sprintPie'), spCounts, 'Sprint'); }
+async function loadDashboard(){ try{ renderDashboard(await api('/api/dashboard')); }catch(e){ console.error('dashboard',e);} }
+// dashboard lists hold rows, or (from /api/bootstrap) ids into the store
+const refs=(t,xs)=>xs.map(x=> typeof x==='object'?x:store[t].get(x)).filter(Boolean);
+function renderDashboard(data){ const dueRows=refs('tasks',data.due_this_week); const tl=safe($('#taskLoad')); tl.innerHTML=''; for(const [k,v] of Object.entries(data.task_load)){ tl.append(h('span',{class:'badge'},`${k}: ${v}`),' ');} const due=safe($('#dueList')); due.innerHTML=''; dueRows.forEach(t=> due.append(h('li',{},h('span',{},t.title),h('span',{class:'badge'},t.due_date||t.planned_end_date)))); const issues=safe($('#issueList')); issues.innerHTML=''; refs('tasks',data.open_issues).forEach(t=> issues.append(h('li',{},h('span',{},t.title),h('span',{class:'badge'},t.priority)))); const risks=safe($('#riskList')); risks.innerHTML=''; refs('risks',data.risks_due).forEach(r=> risks.append(h('li',{},h('span',{},r.title),h('span',{class:'badge'},r.review_date)))); renderWeeklyGantt(dueRows, data.week_start, data.week_end); renderDashboardPies(data.pies); }
+function renderDashboardPies(pies){ drawPie($('#piPie'), pies.pi?.counts||{}, 'PI'); drawPie($('#sprintPie'), pies.sprint?.counts||{}, 'Sprint'); }
 function drawPie(container, counts, label){ container.innerHTML=''; const total=Object.values(counts).reduce((a,b)=>a+b,0)||1; const size=180,r=size/2; const svg=h('svg',{width:size,height:size,viewBox:`0 0 ${size} ${size}`}); let angle=0; const palette=['#22d3ee','#a78bfa','#f59e0b','#ef4444','#10b981','#9ca3af']; Object.entries(counts).forEach(([k,v],i)=>{ const a2=angle+(v/total)*Math.PI*2; const x1=r+r*Math.cos(angle), y1=r+r*Math.sin(angle); const x2=r+r*Math.cos(a2), y2=r+r*Math.sin(a2); const large=a2-angle>Math.PI?1:0; const path=`M ${r} ${r} L ${x1} ${y1} A ${r} ${r} 0 ${large} 1 ${x2} ${y2} Z`; svg.append(h('path',{d:path,fill:palette[i%palette.length],opacity:0.9,stroke:'rgba(0,0,0,.4)'})); angle=a2;}); svg.append(h('text',{x:r,y:r,dominantBaseline:'middle',textAnchor:'middle',fill:'#111',fontSize:'14',fontWeight:'700'},label)); container.append(svg);}
 function renderWeeklyGantt(tasks,startISO,endISO){ const wrap=safe($('#weeklyGantt')); wrap.innerHTML=''; if(!startISO||!endISO) return; const start=new Date(startISO); const end=new Date(endISO); const totalDays=(end-start)/86400000+1; tasks.slice(0,8).forEach(t=>{ const due=new Date(t.due_date||t.planned_end_date||startISO); const offset=Math.max(0,Math.floor((due-start)/86400000)); const bar=h('div',{class:'gantt-bar',style:`width:${Math.max(10,100/totalDays)}%; margin-left:${(offset/totalDays)*100}%`}, h('span',{class:'label'},t.title)); wrap.append(h('div',{class:'gantt-row'},bar));}); }
 // ------ Backlog ------
 let backlogMode='list'; let editingId=null;
 const modalEl = ()=> $('#taskModal');
-$('#toggleBacklogMode')?.addEventListener('click',()=>{ backlogMode=backlogMode==='list'?'kanban':'list'; $('#backlogListMode').classList.toggle('hidden',backlogMode!=='list'); $('#kanbanMode').classList.toggle('hidden',backlogMode!=='kanban'); loadBacklog();});
+$('#toggleBacklogMode')?.addEventListener('click',()=>{ backlogMode=backlogMode==='list'?'kanban':'list'; $('#backlogListMode').classList.toggle('hidden',backlogMode!=='list'); $('#kanbanMode').classList.toggle('hidden',backlogMode!=='kanban'); renderBacklog();});
+$('#backlogSearch')?.addEventListener('input',e=>searchTable('backlog','tasks',e.target.value,renderBacklog));
 $('#addTaskBtn')?.addEventListener('click',()=>openTaskModal());
 $('#taskCancel')?.addEventListener('click',()=>closeTaskModal());
 $('#taskSave')?.addEventListener('click',saveTaskFromModal);
-async function populateDepsSelect(selected=[]){ const tasks=await api('/api/tasks'); const sel=safe($('#m_deps_sel')); sel.innerHTML=''; tasks.forEach(t=>{ const opt=h('option',{value:String(t.id)},`${t.id} · ${t.title}`); if(selected.includes(t.id)) opt.setAttribute('selected','selected'); sel.append(opt); }); }
-function openTaskModal(t=null){ editingId=t?.id||null; $('#taskModalTitle').textContent=t?'Edit Item':'New Item'; $('#m_title').value=t?.title||''; $('#m_type').value=t?.type||'task'; $('#m_status').value=t?.status||'backlog'; $('#m_priority').value=t?.priority||'medium'; $('#m_planned_start').value=t?.planned_start_date||t?.start_date||''; $('#m_planned_end').value=t?.planned_end_date||t?.end_date||''; $('#m_actual_end').value=t?.actual_end_date||''; let deps=[]; try{ deps=t?.dependencies?JSON.parse(t.dependencies):[];}catch{} populateDepsSelect(deps); modalEl().classList.remove('hidden'); }
+function populateDepsSelect(selected=[]){ const tasks=rows('tasks'); const sel=safe($('#m_deps_sel')); sel.innerHTML=''; tasks.forEach(t=>{ const opt=h('option',{value:String(t.id)},`${t.id} · ${t.title}`); if(selected.includes(t.id)) opt.setAttribute('selected','selected'); sel.append(opt); }); }
+function populateParentSelect(t){ const sel=safe($('#m_parent')); sel.replaceChildren(h('option',{value:''},'None'), ...rows('tasks').filter(x=>x.id!==t?.id).map(x=>h('option',{value:String(x.id)},`${x.id} · ${x.title}`))); sel.value=t?.parent_id?String(t.parent_id):''; }
+// rolled-up points, completion and dates of everything under the task
+async function loadRollup(t){ const el=safe($('#m_rollup')); el.textContent=''; if(!t) return; try{ const r=(await api(`/api/hierarchy?id=${t.id}&depth=0`)).rollup; if(r.descendants) el.textContent=`${r.descendants} sub-items · ${r.done_points}/${r.points} pts · ${r.percent??0}% done · ${r.start||'?'} → ${r.end||'?'}`; }catch(e){ console.error('rollup',e); } }
+function openTaskModal(t=null){ editingId=t?.id||null; $('#taskModalTitle').textContent=t?'Edit Item':'New Item'; $('#m_title').value=t?.title||''; $('#m_type').value=t?.type||'task'; $('#m_status').value=t?.status||'backlog'; $('#m_priority').value=t?.priority||'medium'; $('#m_planned_start').value=t?.planned_start_date||t?.start_date||''; $('#m_planned_end').value=t?.planned_end_date||t?.end_date||''; $('#m_actual_end').value=t?.actual_end_date||''; let deps=[]; try{ deps=t?.dependencies?JSON.parse(t.dependencies):[];}catch{} populateDepsSelect(deps); populateParentSelect(t); loadRollup(t); modalEl().classList.remove('hidden'); }
 function closeTaskModal(){ modalEl().classList.add('hidden'); }
-async function saveTaskFromModal(){ const sel=safe($('#m_deps_sel')); const deps=Array.from(sel.selectedOptions||[]).map(o=>Number(o.value)); const payload={ title:$('#m_title').value, type:$('#m_type').value, status:$('#m_status').value, priority:$('#m_priority').value, planned_start_date:$('#m_planned_start').value||null, planned_end_date:$('#m_planned_end').value||null, actual_end_date:$('#m_actual_end').value||null, dependencies:deps }; payload.start_date=payload.planned_start_date; payload.end_date=payload.planned_end_date; if(editingId){ payload.id=editingId; await api('/api/tasks',{method:'PUT', body:JSON.stringify(payload)});} else { await api('/api/tasks',{method:'POST', body:JSON.stringify(payload)});} closeTaskModal(); loadBacklog(); loadDashboard(); }
-async function loadBacklog(){ const tasks=await api('/api/tasks'); if(backlogMode==='list'){ const tbody=safe($('#backlogTableBody')); tbody.innerHTML=''; tasks.forEach(t=>{ const tr=h('tr',{}, h('td',{},t.title), h('td',{},t.type||''), h('td',{},t.status||''), h('td',{},t.priority||''), h('td',{},`${t.planned_start_date||''} → ${t.planned_end_date||''}`), h('td',{},t.actual_end_date||''), h('td',{}, h('button',{class:'link',onclick:()=>openTaskModal(t)},'Edit'),' · ', h('button',{class:'link',onclick:()=>delTask(t.id)},'Delete')) ); tbody.append(tr);}); } else { const cols=['backlog','to-do','in progress','blocked','done','cancelled']; cols.forEach(s=> safe($(`#col-${s}`)).innerHTML=''); tasks.forEach(t=>{ const card=h('div',{class:'card-item',draggable:'true'}, h('div',{class:'title'},t.title), h('div',{class:'meta'},h('span',{},t.type||''), h('span',{},t.priority||''), t.planned_end_date?h('span',{},t.planned_end_date):'')); card.addEventListener('dragstart',e=>{ e.dataTransfer.setData('text/plain',String(t.id)); card.classList.add('dragging');}); card.addEventListener('dragend',()=>card.classList.remove('dragging')); safe($(`#col-${t.status}`)).append(card);}); }}
-$$('.kanban-drop').forEach(box=>{ box.addEventListener('dragover',e=>{e.preventDefault()}); box.addEventListener('drop',async e=>{ e.preventDefault(); const id=Number(e.dataTransfer.getData('text/plain')); const status=box.parentElement.dataset.status; await api('/api/tasks',{method:'PUT', body:JSON.stringify({id,status})}); loadBacklog(); loadDashboard(); }); });
-async function delTask(id){ if(!confirm('Delete item?')) return; await api('/api/tasks',{method:'DELETE', body:JSON.stringify({id})}); loadBacklog(); loadDashboard(); }
+async function saveTaskFromModal(){ const sel=safe($('#m_deps_sel')); const deps=Array.from(sel.selectedOptions||[]).map(o=>Number(o.value)); const payload={ title:$('#m_title').value, type:$('#m_type').value, status:$('#m_status').value, priority:$('#m_priority').value, planned_start_date:$('#m_planned_start').value||null, planned_end_date:$('#m_planned_end').value||null, actual_end_date:$('#m_actual_end').value||null, dependencies:deps, parent_id:Number($('#m_parent').value)||null }; payload.start_date=payload.planned_start_date; payload.end_date=payload.planned_end_date; try{ if(editingId){ payload.id=editingId; await api('/api/tasks',{method:'PUT', body:JSON.stringify(payload)});} else { await api('/api/tasks',{method:'POST', body:JSON.stringify(payload)});} }catch(e){ alert(e.message.endsWith('409')?'Those dependencies or that parent would create a cycle.':e.message); return; } closeTaskModal(); syncChanges(); }
+function renderBacklog(){ const tasks=searchRows('backlog','tasks'); if(backlogMode==='list'){ const tbody=safe($('#backlogTableBody')); tbody.innerHTML=''; tasks.forEach(t=>{ const tr=h('tr',{}, h('td',{},t.title), h('td',{},t.type||''), h('td',{},t.status||''), h('td',{},t.priority||''), h('td',{},`${t.planned_start_date||''} → ${t.planned_end_date||''}`), h('td',{},t.actual_end_date||''), h('td',{}, h('button',{class:'link',onclick:()=>openTaskModal(t)},'Edit'),' · ', h('button',{class:'link',onclick:()=>delTask(t.id)},'Delete')) ); tbody.append(tr);}); } else { const cols=['backlog','to-do','in progress','blocked','done','cancelled']; cols.forEach(s=> safe($(`#col-${s}`)).innerHTML=''); tasks.forEach(t=>{ const card=h('div',{class:'card-item',draggable:'true'}, h('div',{class:'title'},t.title), h('div',{class:'meta'},h('span',{},t.type||''), h('span',{},t.priority||''), t.planned_end_date?h('span',{},t.planned_end_date):'')); card.addEventListener('dragstart',e=>{ e.dataTransfer.setData('text/plain',String(t.id)); card.classList.add('dragging');}); card.addEventListener('dragend',()=>card.classList.remove('dragging')); safe($(`#col-${t.status}`)).append(card);}); }}
+$$('.kanban-drop').forEach(box=>{ box.addEventListener('dragover',e=>{e.preventDefault()}); box.addEventListener('drop',async e=>{ e.preventDefault(); const id=Number(e.dataTransfer.getData('text/plain')); const status=box.parentElement.dataset.status; await api('/api/tasks',{method:'PUT', body:JSON.stringify({id,status})}); syncChanges(); }); });
+async function delTask(id){ if(!confirm('Delete item?')) return; await api('/api/tasks',{method:'DELETE', body:JSON.stringify({id})}); syncChanges(); }
 // ------ PI/Sprints/Time Off ------
-$('#addPIBtn')?.addEventListener('click',async()=>{ const name=prompt('PI name?'); if(!name) return; const start_date=prompt('Start YYYY-MM-DD?'); const end_date=prompt('End YYYY-MM-DD?'); await api('/api/pis',{method:'POST', body:JSON.stringify({name,start_date,end_date})}); loadPI(); });
-$('#addSprintBtn')?.addEventListener('click',async()=>{ const pi_id=Number(prompt('PI id?')); if(!pi_id) return; const name=prompt('Sprint name?'); const start_date=prompt('Start YYYY-MM-DD?'); const end_date=prompt('End YYYY-MM-DD?'); await api('/api/sprints',{method:'POST', body:JSON.stringify({pi_id,name,start_date,end_date})}); loadPI(); });
-$('#addTimeOffBtn')?.addEventListener('click',async()=>{ const date=prompt('Date YYYY-MM-DD?'); if(!date) return; const category=prompt('Category (holiday/vacation/pto)?')||'holiday'; const note=prompt('Note?')||''; await api('/api/timeoff',{method:'POST', body:JSON.stringify({date,category,note})}); loadPI(); });
-async function loadPI(){ const [pis,sprints,offs]=await Promise.all([api('/api/pis'), api('/api/sprints'), api('/api/timeoff')]); const piTable=safe($('#piTable')); piTable.innerHTML=''; pis.forEach(p=>{ const tr=h('tr',{}, h('td',{},p.name), h('td',{},p.start_date||''), h('td',{},p.end_date||''), h('td',{}, h('button',{class:'link',onclick:async()=>{ const name=prompt('Name',p.name)||p.name; const start_date=prompt('Start YYYY-MM-DD',p.start_date||'')||p.start_date; const end_date=prompt('End YYYY-MM-DD',p.end_date||'')||p.end_date; await api('/api/pis',{method:'PUT', body:JSON.stringify({id:p.id,name,start_date,end_date})}); loadPI(); }},'Edit')) ); piTable.append(tr); }); const sprintTable=safe($('#sprintTable')); sprintTable.innerHTML=''; sprints.forEach(s=>{ const tr=h('tr',{}, h('td',{},s.pi_id), h('td',{},s.name), h('td',{},s.start_date||''), h('td',{},s.end_date||''), h('td',{},h('button',{class:'link',onclick:async()=>{ const name=prompt('Name',s.name)||s.name; const start_date=prompt('Start',s.start_date||'')||s.start_date; const end_date=prompt('End',s.end_date||'')||s.end_date; await api('/api/sprints',{method:'PUT', body:JSON.stringify({id:s.id,name,start_date,end_date})}); loadPI(); }},'Edit')) ); sprintTable.append(tr); }); const toTable=safe($('#timeoffTable')); toTable.innerHTML=''; offs.forEach(o=>{ const tr=h('tr',{}, h('td',{},o.date), h('td',{},o.category||''), h('td',{},o.note||''), h('td',{}, h('button',{class:'link',onclick:async()=>{ if(!confirm('Delete?')) return; await api('/api/timeoff',{method:'DELETE', body:JSON.stringify({id:o.id})}); loadPI(); }},'Delete')) ); toTable.append(tr); }); }
+$('#addPIBtn')?.addEventListener('click',async()=>{ const name=prompt('PI name?'); if(!name) return; const start_date=prompt('Start YYYY-MM-DD?'); const end_date=prompt('End YYYY-MM-DD?'); await api('/api/pis',{method:'POST', body:JSON.stringify({name,start_date,end_date})}); syncChanges(); });
+$('#addSprintBtn')?.addEventListener('click',async()=>{ const pi_id=Number(prompt('PI id?')); if(!pi_id) return; const name=prompt('Sprint name?'); const start_date=prompt('Start YYYY-MM-DD?'); const end_date=prompt('End YYYY-MM-DD?'); await api('/api/sprints',{method:'POST', body:JSON.stringify({pi_id,name,start_date,end_date})}); syncChanges(); });
+$('#addTimeOffBtn')?.addEventListener('click',async()=>{ const date=prompt('Date YYYY-MM-DD?'); if(!date) return; const category=prompt('Category (holiday/vacation/pto)?')||'holiday'; const assignee=prompt('Whose? (blank for the whole team)')||null; const note=prompt('Note?')||''; await api('/api/timeoff',{method:'POST', body:JSON.stringify({date,category,assignee,note})}); syncChanges(); });
+function renderPI(pre){ const pis=rows('pis'), sprints=rows('sprints'), offs=rows('timeoff'); const piTable=safe($('#piTable')); piTable.innerHTML=''; pis.forEach(p=>{ const tr=h('tr',{}, h('td',{},p.name), h('td',{},p.start_date||''), h('td',{},p.end_date||''), h('td',{}, h('button',{class:'link',onclick:async()=>{ const name=prompt('Name',p.name)||p.name; const start_date=prompt('Start YYYY-MM-DD',p.start_date||'')||p.start_date; const end_date=prompt('End YYYY-MM-DD',p.end_date||'')||p.end_date; await api('/api/pis',{method:'PUT', body:JSON.stringify({id:p.id,name,start_date,end_date})}); syncChanges(); }},'Edit')) ); piTable.append(tr); }); const sprintTable=safe($('#sprintTable')); sprintTable.innerHTML=''; sprints.forEach(s=>{ const tr=h('tr',{}, h('td',{},s.pi_id), h('td',{},s.name), h('td',{},s.start_date||''), h('td',{},s.end_date||''), h('td',{},h('button',{class:'link',onclick:async()=>{ const name=prompt('Name',s.name)||s.name; const start_date=prompt('Start',s.start_date||'')||s.start_date; const end_date=prompt('End',s.end_date||'')||s.end_date; await api('/api/sprints',{method:'PUT', body:JSON.stringify({id:s.id,name,start_date,end_date})}); syncChanges(); }},'Edit')) ); sprintTable.append(tr); }); const toTable=safe($('#timeoffTable')); toTable.innerHTML=''; offs.forEach(o=>{ const tr=h('tr',{}, h('td',{},o.date), h('td',{},o.category||''), h('td',{},o.assignee||'Team'), h('td',{},o.note||''), h('td',{}, h('button',{class:'link',onclick:async()=>{ if(!confirm('Delete?')) return; await api('/api/timeoff',{method:'DELETE', body:JSON.stringify({id:o.id})}); syncChanges(); }},'Delete')) ); toTable.append(tr); }); loadCapacity(pre); }
+// ------ Capacity / burndown ------
+function fillCapacityScope(){ const sel=$('#capacityScope'); if(!sel) return ''; const prev=sel.value; const today=new Date().toISOString().slice(0,10); const opts=[...rows('sprints').map(s=>[`sprint_id=${s.id}`,`Sprint · ${s.name}`]), ...rows('pis').map(p=>[`pi_id=${p.id}`,`PI · ${p.name}`])]; sel.replaceChildren(...opts.map(([v,l])=>h('option',{value:v},l))); const current=rows('sprints').find(s=>s.start_date<=today && today<=s.end_date); sel.value=opts.some(o=>o[0]===prev)?prev:(current?`sprint_id=${current.id}`:(opts[0]||[''])[0]); return sel.value; }
+let capacitySeq=0;
+async function loadCapacity(pre){ const q=fillCapacityScope(); if(!q){ safe($('#capacitySummary')).innerHTML=''; safe($('#burndownChart')).innerHTML=''; return; } const seq=++capacitySeq; let cap, burn; try{ [cap,burn]=pre?.capacity && q===`sprint_id=${pre.capacity.id}` ? [pre.capacity,pre.burndown] : await Promise.all([api(`/api/capacity?${q}`),api(`/api/burndown?${q}`)]); } catch(e){ safe($('#capacitySummary')).textContent='No valid dates for this sprint/PI'; safe($('#burndownChart')).innerHTML=''; return; } if(seq!==capacitySeq) return; renderCapacity(cap); drawBurndown(safe($('#burndownChart')),burn); }
+$('#capacityScope')?.addEventListener('change',()=>loadCapacity());
+function renderCapacity(c){ const v=c.velocity; const box=safe($('#capacitySummary')); box.replaceChildren(h('p',{}, `${c.working_days} working days (${c.days} calendar), ${c.capacity_days} person-days. Committed ${c.committed} pts, done ${c.done} pts.`), h('p',{class:'muted'}, v.points_per_sprint===null?'No finished sprints yet for velocity.':`Velocity ${v.points_per_sprint} pts/sprint over the last ${v.sprints.length}; forecast ${c.forecast??'–'} pts.`), h('table',{class:'table'}, h('thead',{},h('tr',{},h('th',{},'Assignee'),h('th',{},'Days'),h('th',{},'Off'),h('th',{},'Points'),h('th',{},'Done'))), h('tbody',{}, c.assignees.map(a=> h('tr',{}, h('td',{},a.assignee||'Unassigned'), h('td',{},a.working_days??''), h('td',{},a.days_off?a.days_off.length:''), h('td',{},a.points), h('td',{},a.done))))) ); }
+function drawBurndown(el,b){ const W=420,H=200,P=24; const pts=b.series; const max=Math.max(1,...pts.map(p=>Math.max(p.scope||0,p.ideal||0))); const x=i=>P+i*(W-2*P)/Math.max(1,pts.length-1), y=v=>H-P-v*(H-2*P)/max; const line=(key,color,dash='')=>{ const xy=pts.map((p,i)=>p[key]===undefined?null:`${x(i).toFixed(1)},${y(p[key]).toFixed(1)}`).filter(Boolean).join(' '); return xy?`<polyline fill="none" stroke="${color}" stroke-width="2" ${dash?`stroke-dasharray="${dash}"`:''} points="${xy}"/>`:''; }; el.innerHTML=`<svg width="${W}" height="${H}" viewBox="0 0 ${W} ${H}"><line x1="${P}" y1="${H-P}" x2="${W-P}" y2="${H-P}" stroke="rgba(255,255,255,.2)"/>${line('ideal','#9ca3af','4 4')}${line('scope','#a78bfa')}${line('done','#10b981')}${line('remaining','#22d3ee')}<text x="${P}" y="14" fill="#9ca3af" font-size="11">${max} pts · remaining (cyan), done (green), scope (violet), ideal (dashed)</text></svg>`; }
 // ------ Gantt ------
-$('#refreshGantt')?.addEventListener('click',loadGantt); $('#ganttSearch')?.addEventListener('input',()=>highlightGantt($('#ganttSearch').value)); $('#ganttZoom')?.addEventListener('change',loadGantt);
-async function loadGantt(){ const [tasks,pis,sprints]=await Promise.all([api('/api/tasks'), api('/api/pis'), api('/api/sprints')]); renderGanttFull(tasks,pis,sprints);}
-function renderGanttFull(tasks,pis,sprints){ const canvas=safe($('#ganttCanvas')); const bandPI=safe($('#band-pi')); const bandSprint=safe($('#band-sprint')); canvas.innerHTML=''; bandPI.innerHTML=''; bandSprint.innerHTML=''; if(!tasks.length){ canvas.textContent='No tasks yet'; return;} const zoom=$('#ganttZoom')?.value||'week'; const pxPerDay = zoom==='day' ? 40 : zoom==='week' ? 18 : 8; const datesStart=tasks.map(t=> t.start_date||t.planned_start_date||t.due_date).filter(Boolean).map(d=>new Date(d)); const datesEnd=tasks.map(t=> t.end_date||t.planned_end_date||t.due_date||t.start_date).filter(Boolean).map(d=>new Date(d)); const min=new Date(Math.min(...datesStart)); const max=new Date(Math.max(...datesEnd)); const spanDays=Math.max(1,Math.ceil((max-min)/86400000)+7); const innerWidth=spanDays*pxPerDay; const inner=h('div',{style:`position:relative; width:${innerWidth}px`}); canvas.append(inner); // time ticks
- for(let d=0; d<spanDays; d+= (zoom==='month'?30: (zoom==='week'?7:1))){ inner.append(h('div',{style:`position:absolute; left:${d*pxPerDay}px; width:1px; height:24px; background:rgba(255,255,255,.15); top:0;`}), h('div',{style:`position:absolute; left:${d*pxPerDay+4}px; top:4px; font-size:11px; color:#9ca3af;`}, toISO(addDays(min,d)))); }
- // bands
- function placeBand(container, start, end, label){ if(!start||!end) return; const s=new Date(start), e=new Date(end); const left=((s-min)/86400000)*pxPerDay; const width=Math.max(pxPerDay, ((e-s)/86400000||1)*pxPerDay); const bar=h('div',{class:'band-bar', style:`left:${left}px; width:${width}px`}); const wrap=h('div',{} , h('div',{class:'band-label'},label), bar); container.append(wrap);} pis.forEach(p=> placeBand(bandPI,p.start_date,p.end_date,p.name)); sprints.forEach(s=> placeBand(bandSprint,s.start_date,s.end_date,s.name));
+// the canvas is as wide as the whole program, but only the visible window (plus a screen either side) is fetched from /api/timeline
+const GANTT_PX={day:40, week:18, month:8}; const ganttView={px:18, span:null, lo:0, hi:-1, seq:0}; let ganttTimer=null;
+$('#refreshGantt')?.addEventListener('click',()=>renderGantt()); $('#ganttSearch')?.addEventListener('input',e=>searchTable('gantt','tasks',e.target.value,highlightGantt)); $('#ganttSearch')?.addEventListener('keydown',e=>{ if(e.key==='Enter') ganttJump(); }); $('#ganttZoom')?.addEventListener('change',()=>renderGantt());
+$('#ganttCanvas')?.addEventListener('scroll',()=>{ const canvas=$('#ganttCanvas'); [$('#band-pi'),$('#band-sprint')].forEach(b=>{ if(b) b.scrollLeft=canvas.scrollLeft; }); clearTimeout(ganttTimer); ganttTimer=setTimeout(()=>renderGantt(true),120); });
+// drag-to-pan confined to canvas
+$('#ganttCanvas')?.addEventListener('mousedown',evt=>{ const canvas=$('#ganttCanvas'); let startX=evt.clientX, scroll=canvas.scrollLeft; const move=(e)=>{ canvas.scrollLeft = scroll - (e.clientX-startX); }; const up=()=>{ window.removeEventListener('mousemove',move); window.removeEventListener('mouseup',up); }; window.addEventListener('mousemove',move); window.addEventListener('mouseup',up); });
+async function renderGantt(scrolled=false,pre=null){ const canvas=safe($('#ganttCanvas')); const zoom=$('#ganttZoom')?.value||'week'; const px=GANTT_PX[zoom]; const left=canvas.scrollLeft/ganttView.px; const screen=Math.ceil((canvas.clientWidth||1000)/px); if(scrolled && px===ganttView.px && left>=ganttView.lo && left+screen<=ganttView.hi) return; const first=Math.max(0,Math.floor(left)-screen); let q=`zoom=${zoom}`; if(ganttView.span) q+=`&from=${dayISO(ganttView.span.start,first)}&to=${dayISO(ganttView.span.start,first+3*screen)}`; const seq=++ganttView.seq; const data=pre && !ganttView.span && pre.zoom===zoom ? ganttRows(pre) : await api(`/api/timeline?${q}`); if(seq!==ganttView.seq) return; const rezoom=px!==ganttView.px; ganttView.px=px; ganttView.span=data.span; if(data.span){ const start=Date.parse(data.span.start); ganttView.lo=(Date.parse(data.window.from)-start)/86400000; ganttView.hi=(Date.parse(data.window.to)-start)/86400000; } drawGanttWindow(data,px); if(rezoom) canvas.scrollLeft=left*px; }
+// bootstrap timelines carry only ids and geometry; labels come from the store
+function ganttRows(data){ ['tasks','pis','sprints'].forEach(t=>{ data[t]=data[t].map(b=>({...store[t].get(b.id),...b})); }); return data; }
+function drawGanttWindow(data,px){ const canvas=safe($('#ganttCanvas')); const bandPI=safe($('#band-pi')); const bandSprint=safe($('#band-sprint')); if(!data.span){ canvas.textContent='No tasks yet'; bandPI.innerHTML=''; bandSprint.innerHTML=''; return;} let inner=canvas.firstElementChild; if(!inner){ canvas.innerHTML=''; inner=h('div',{style:'position:relative'}); canvas.append(inner);} const width=(data.span.days+7)*px; inner.style.width=`${width}px`; // time ticks
+ const parts=[]; data.ticks.forEach(t=> parts.push(h('div',{style:`position:absolute; left:${t.day*px}px; width:1px; height:24px; background:rgba(255,255,255,.15); top:0;`}), h('div',{style:`position:absolute; left:${t.day*px+4}px; top:4px; font-size:11px; color:#9ca3af;`}, t.date)));
  // rows
- tasks.forEach(t=>{ const row=h('div',{class:'gantt-row',style:'position:relative'}); const s=new Date(t.start_date||t.planned_start_date||t.due_date||min); const e=new Date(t.end_date||t.planned_end_date||t.due_date||s); const left=((s-min)/86400000)*pxPerDay; const width=Math.max(6, ((e-s)/86400000||1)*pxPerDay); const bar=h('div',{class:'gantt-bar',style:`position:absolute; left:${left}px; width:${width}px`}, h('span',{class:'label'},t.title)); row.dataset.title=(t.title||'').toLowerCase(); row.append(bar); inner.append(row); });
- // drag-to-pan confined to canvas
- canvas.addEventListener('mousedown',evt=>{ let startX=evt.clientX, scroll=canvas.scrollLeft; const move=(e)=>{ canvas.scrollLeft = scroll - (e.clientX-startX); }; const up=()=>{ window.removeEventListener('mousemove',move); window.removeEventListener('mouseup',up); }; window.addEventListener('mousemove',move); window.addEventListener('mouseup',up); }); }
-function addDays(date,days){ const d=new Date(date); d.setDate(d.getDate()+days); return d;} function toISO(d){ return new Date(d).toISOString().slice(0,10);} function highlightGantt(q){ const needle=(q||'').toLowerCase(); $$('#ganttCanvas .gantt-row').forEach(r=>{ r.style.outline = r.dataset.title?.includes(needle) && needle ? '2px solid var(--accent)' : 'none'; }); }
+ data.tasks.forEach(t=> parts.push(h('div',{class:'gantt-row',style:'position:relative','data-id':t.id}, h('div',{class:'gantt-bar',style:`position:absolute; left:${t.day*px}px; width:${Math.max(6,(t.days||1)*px)}px`}, h('span',{class:'label'},t.title))))); inner.replaceChildren(...parts);
+ // bands
+ [[bandPI,data.pis],[bandSprint,data.sprints]].forEach(([band,items])=>{ band.replaceChildren(h('div',{style:`position:relative; width:${width}px; height:100%`}, items.map(b=> h('div',{}, h('div',{class:'band-label',style:`left:${b.day*px}px`},b.name), h('div',{class:'band-bar',style:`left:${b.day*px}px; width:${Math.max(px,(b.days||1)*px)}px`}))))); band.scrollLeft=canvas.scrollLeft; }); highlightGantt(); }
+function dayISO(startISO,days){ return new Date(Date.parse(startISO)+days*86400000).toISOString().slice(0,10); }
+function highlightGantt(){ const hits=new Set(searchHits.gantt||[]); $$('#ganttCanvas .gantt-row').forEach(r=>{ r.style.outline = hits.has(Number(r.dataset.id)) ? '2px solid var(--accent)' : 'none'; }); }
+function ganttJump(){ const t=store.tasks.get((searchHits.gantt||[])[0]); const d=t && (t.planned_start_date||t.due_date||t.planned_end_date); if(!d||!ganttView.span) return; const canvas=safe($('#ganttCanvas')); canvas.scrollLeft=Math.max(0,(Date.parse(d)-Date.parse(ganttView.span.start))/86400000*ganttView.px-canvas.clientWidth/3); }
 // ------ Risks ------
-$('#addRiskBtn')?.addEventListener('click', async()=>{ const title=prompt('Risk title?'); if(!title) return; const impact=prompt('Impact (low/medium/high/severe)','medium'); const probability=prompt('Probability (low/medium/high)','low'); const review_date=prompt('Review date YYYY-MM-DD?'); await api('/api/risks',{method:'POST', body:JSON.stringify({title,impact,probability,review_date})}); loadRisks(); loadDashboard(); });
-async function loadRisks(){ const risks=await api('/api/risks'); const tbody=safe($('#riskTable')); tbody.innerHTML=''; risks.forEach(r=>{ const tr=h('tr',{}, h('td',{},r.title), h('td',{},r.impact||''), h('td',{},r.probability||''), h('td',{},r.status||''), h('td',{},r.review_date||''), h('td',{},r.mitigation||''), h('td',{}, h('button',{class:'link',onclick: async()=>{ const status=prompt('Status',r.status||'open')||r.status; const mitigation=prompt('Mitigation',r.mitigation||'')||r.mitigation; await api('/api/risks',{method:'PUT', body:JSON.stringify({id:r.id,status,mitigation})}); loadRisks(); loadDashboard(); }},'Edit')) ); tbody.append(tr); }); }
+$('#addRiskBtn')?.addEventListener('click', async()=>{ const title=prompt('Risk title?'); if(!title) return; const impact=prompt('Impact (low/medium/high/severe)','medium'); const probability=prompt('Probability (low/medium/high)','low'); const review_date=prompt('Review date YYYY-MM-DD?'); await api('/api/risks',{method:'POST', body:JSON.stringify({title,impact,probability,review_date})}); syncChanges(); });
+$('#riskSearch')?.addEventListener('input',e=>searchTable('risks','risks',e.target.value,renderRisks));
+function renderRisks(){ const risks=searchRows('risks','risks'); const tbody=safe($('#riskTable')); tbody.innerHTML=''; risks.forEach(r=>{ const tr=h('tr',{}, h('td',{},r.title), h('td',{},r.impact||''), h('td',{},r.probability||''), h('td',{},r.status||''), h('td',{},r.review_date||''), h('td',{},r.mitigation||''), h('td',{}, h('button',{class:'link',onclick: async()=>{ const status=prompt('Status',r.status||'open')||r.status; const mitigation=prompt('Mitigation',r.mitigation||'')||r.mitigation; await api('/api/risks',{method:'PUT', body:JSON.stringify({id:r.id,status,mitigation})}); syncChanges(); }},'Edit')) ); tbody.append(tr); }); }
 // ------ Automations ------
-async function loadAutomations(){ const items=await api('/api/automations'); const box=safe($('#automationList')); box.innerHTML=''; if(items.length===0){ box.textContent='Drop .py files into automations/'; return;} items.forEach(it=>{ box.append(h('button',{class:'primary',onclick:()=>runAutomation(it.name)},it.name)); box.append(' ');}); }
-async function runAutomation(name){ const out=safe($('#automationOutput')); out.textContent='Running...'; try{ const res=await api('/api/automations/run',{method:'POST', body:JSON.stringify({name})}); out.textContent=(res.stdout||'')+(res.stderr?'
-ERR:
-'+res.stderr:''); }catch(e){ out.textContent='Error: '+e.message; } }
+async function loadAutomations(){ renderAutomations(await api('/api/automations')); }
+function renderAutomations(items){ const box=safe($('#automationList')); box.innerHTML=''; if(items.length===0){ box.textContent='Drop .py files into automations/'; return;} items.forEach(it=>{ box.append(h('button',{class:'primary',onclick:()=>runAutomation(it.name)},it.name)); box.append(' ');}); }
+let currentJob=null;
+$('#cancelJobBtn')?.addEventListener('click',async()=>{ if(currentJob) await api('/api/jobs/cancel',{method:'POST', body:JSON.stringify({id:currentJob})}); });
+async function runAutomation(name){ const out=safe($('#automationOutput')); const cancel=$('#cancelJobBtn'); out.textContent='Queued...'; try{ const job=await api('/api/automations/run',{method:'POST', body:JSON.stringify({name})}); currentJob=job.job_id; cancel?.classList.remove('hidden'); const res=await fetch(`${WS}/api/jobs/stream?id=${job.job_id}`); out.textContent=''; const reader=res.body.getReader(); const dec=new TextDecoder(); for(;;){ const {done,value}=await reader.read(); if(done) break; out.textContent+=dec.decode(value,{stream:true}); out.scrollTop=out.scrollHeight; } const fin=await api(`/api/jobs?id=${job.job_id}`); out.textContent+=`\n[${fin.status}${fin.returncode!==null&&fin.returncode!==undefined?' · exit '+fin.returncode:''}]`; }catch(e){ out.textContent='Error: '+e.message; } finally { currentJob=null; cancel?.classList.add('hidden'); } }
 // ------ Seed/init ------
-$('#seedBtn')?.addEventListener('click', async()=>{ if(!confirm('This will replace existing sample rows. Continue?')) return; await api('/api/seed',{method:'POST'}); await Promise.all([loadDashboard(), loadBacklog(), loadPI(), loadRisks(), loadGantt(), loadAutomations()]); alert('Seeded!');});
-async function init(){ try{ modalEl()?.classList.add('hidden'); show('dashboard'); await Promise.all([loadDashboard(), loadBacklog(), loadPI(), loadRisks(), loadGantt(), loadAutomations()]); }catch(e){ console.error('init',e); } }
+$('#seedBtn')?.addEventListener('click', async()=>{ if(!confirm('This will replace existing sample rows. Continue?')) return; await api('/api/seed',{method:'POST'}); await Promise.all([syncChanges(), loadAutomations()]); alert('Seeded!');});
+// ------ Workspaces ------
+async function loadWorkspaces(){ const sel=$('#workspaceSel'); if(!sel) return; const {current,workspaces}=await api('/api/workspaces?summary=0'); sel.replaceChildren(...workspaces.map(w=>h('option',{value:w.name},w.name)), h('option',{value:''},'+ New workspace…')); sel.value=current; }
+$('#workspaceSel')?.addEventListener('change',async e=>{ let name=e.target.value; if(!name){ name=(prompt('Workspace name (lowercase letters, digits, - and _)')||'').trim(); if(!name){ loadWorkspaces(); return; } try{ await api('/api/workspaces',{method:'POST', body:JSON.stringify({name})}); }catch(err){ alert(err.message); loadWorkspaces(); return; } } location.href=name==='default'?'/':`/w/${name}/`; });
+async function init(){ try{ modalEl()?.classList.add('hidden'); show('dashboard'); await loadAll(); loadWorkspaces(); }catch(e){ console.error('init',e); } }
 document.addEventListener('DOMContentLoaded', init);
\ No newline at end of file